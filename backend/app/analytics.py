@@ -0,0 +1,102 @@
+"""
+Sales analytics: revenue and volume by month, salesperson, product type and material.
+
+Answers come from the sales_rollup_monthly table, which holds one row per
+(month, salesperson, product type, material) and is maintained incrementally
+by database triggers on quotation_items, quotations and products (see
+db_init/init.sql on PostgreSQL and database.py on SQLite). A query therefore
+reads at most a few rows per month, however many quotations have been made.
+
+build_history_query computes the same figures from the raw tables; it is the
+reference the rollup is checked against, not something the API serves.
+"""
+from datetime import date
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Date, Select, func, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import database, schemas
+
+Dimensions = Sequence[schemas.SalesDimension]
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def build_sales_query(group_by: Dimensions, start: Optional[date] = None, end: Optional[date] = None,
+                      user_id: Optional[int] = None, product_type: Optional[str] = None,
+                      material: Optional[str] = None) -> Select:
+    """
+    The rollup query grouped by `group_by`, for the months from `start` to `end`
+    inclusive (any day of a month selects the whole month).
+    """
+    rollup = database.SalesRollup
+    columns = {
+        schemas.SalesDimension.month: [rollup.month],
+        schemas.SalesDimension.salesperson: [rollup.user_id, database.User.username],
+        schemas.SalesDimension.product_type: [rollup.product_type],
+        schemas.SalesDimension.material: [rollup.material],
+    }
+    keys = [column for dimension in dict.fromkeys(group_by) for column in columns[dimension]]
+    query = select(
+        *keys,
+        func.round(func.sum(rollup.revenue), 2).label("revenue"),
+        func.sum(rollup.units).label("units"),
+        func.sum(rollup.line_items).label("line_items"),
+    )
+    if schemas.SalesDimension.salesperson in group_by:
+        query = query.outerjoin(database.User, database.User.id == rollup.user_id)
+
+    if start is not None:
+        query = query.where(rollup.month >= _month_start(start))
+    if end is not None:
+        query = query.where(rollup.month <= _month_start(end))
+    if user_id is not None:
+        query = query.where(rollup.user_id == user_id)
+    if product_type is not None:
+        query = query.where(rollup.product_type == product_type)
+    if material is not None:
+        query = query.where(rollup.material == material)
+    return query.group_by(*keys).order_by(*keys)
+
+
+def month_of(created_at, dialect_name: str):
+    """SQL for the first day of the UTC month of a timestamp column, as a Date."""
+    if dialect_name == "postgresql":
+        return func.date_trunc("month", func.timezone("UTC", created_at)).cast(Date)
+    return type_coerce(func.strftime("%Y-%m-01", created_at), Date)
+
+
+def build_history_query(group_by: Dimensions, dialect_name: str) -> Select:
+    """The figures of build_sales_query, aggregated from every quotation item."""
+    item, quotation, product = database.QuotationItem, database.Quotation, database.Product
+    month = month_of(quotation.created_at, dialect_name).label("month")
+    columns = {
+        schemas.SalesDimension.month: [month],
+        schemas.SalesDimension.salesperson: [quotation.user_id],
+        schemas.SalesDimension.product_type: [product.product_type],
+        schemas.SalesDimension.material: [product.material],
+    }
+    keys = [column for dimension in dict.fromkeys(group_by) for column in columns[dimension]]
+    return (
+        select(
+            *keys,
+            func.round(func.sum(item.price), 2).label("revenue"),
+            func.sum(item.quantity).label("units"),
+            func.count().label("line_items"),
+        )
+        .select_from(item)
+        .join(quotation, quotation.id == item.quotation_id)
+        .join(product, product.id == item.product_id)
+        .where(quotation.created_at.is_not(None))
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+
+
+async def sales_summary(db: AsyncSession, group_by: Dimensions, **filters) -> List[dict]:
+    """Rows of build_sales_query as dicts matching schemas.SalesAnalyticsRow."""
+    result = await db.execute(build_sales_query(group_by, **filters))
+    return [dict(row) for row in result.mappings()]
@@ -11,6 +11,86 @@ class Settings(BaseSettings):
     Pydantic will automatically read these from the environment.
     """
     DATABASE_URL: str
+    # Async-driver URL for the API; derived from DATABASE_URL when empty
+    # (postgresql:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite://).
+    DATABASE_ASYNC_URL: str = ""
+
+    # --- Connection pool (per engine, per worker process) ---
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    # Seconds a request waits for a free connection before failing.
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    # Test connections on checkout so restarts of the database are survived.
+    DB_POOL_PRE_PING: bool = True
+    # Replace connections older than this; -1 keeps them forever.
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+
+    # --- AI model artifacts ---
+    # Directory holding versioned artifacts written by train_model.py.
+    MODEL_DIR: str = "app/models"
+    # Unversioned artifact used when MODEL_DIR holds no versioned ones.
+    LEGACY_MODEL_PATH: str = "app/ml_model.joblib"
+    # Serve boosted trees from read-only memory-mapped .npy exports, shared by
+    # every worker on the host; false unpickles a private copy per worker.
+    MODEL_MEMORY_MAP: bool = True
+    # How often each worker checks MODEL_DIR for a newer artifact; 0 disables watching.
+    MODEL_WATCH_INTERVAL_SECONDS: float = 10.0
+
+    # --- Background training jobs ---
+    # Job state files and logs, shared by every worker on the host.
+    TRAINING_JOB_DIR: str = "training_jobs"
+    # Niceness added to the training process so request handling keeps the CPU.
+    TRAINING_JOB_NICE: int = 10
+    # Older jobs are deleted beyond this many.
+    TRAINING_JOB_MAX_KEPT: int = 50
+
+    # --- Prediction cache ---
+    # Large enough to hold the full Streamlit form grid (~144k inputs); 0 disables the cache.
+    PREDICTION_CACHE_MAX_ENTRIES: int = 200000
+    # 0 keeps entries until evicted or the model changes.
+    PREDICTION_CACHE_TTL_SECONDS: float = 0
+    # Precompute the whole form grid whenever a model is loaded.
+    PREDICTION_CACHE_WARMUP: bool = False
+
+    # --- Response cache ---
+    # Serialized customer and quotation GET responses kept per worker; 0 disables
+    # storing (ETags and 304 responses still work).
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Bounds how long writes made outside the API (scripts, psql, other hosts)
+    # can go unnoticed; 0 keeps entries until evicted or invalidated.
+    RESPONSE_CACHE_TTL_SECONDS: float = 60
+    # Invalidation counters shared by the workers on this host, so a write handled
+    # by one worker is seen by all of them at once. Empty uses a file in /dev/shm.
+    RESPONSE_CACHE_SHARED_PATH: str = ""
+
+    # --- Metrics and profiling ---
+    # Per-route latency, SQL and model timings published at /metrics.
+    METRICS_ENABLED: bool = True
+    # Requests slower than this dump the stacks sampled while they ran to
+    # PROFILE_DIR as flame-graph-ready .folded files; 0 disables the sampler.
+    PROFILE_SLOW_REQUESTS_MS: float = 0
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5
+    PROFILE_DIR: str = "profiles"
+    # Older dumps are deleted beyond this many.
+    PROFILE_MAX_FILES: int = 100
+
+    # --- Bulk customer import ---
+    # Rows validated and written per transaction.
+    CUSTOMER_IMPORT_CHUNK_ROWS: int = 5000
+    # Invalid/skipped rows listed individually in the import response.
+    CUSTOMER_IMPORT_MAX_REPORTED_ROWS: int = 1000
+
+    # --- Authentication ---
+    # Signs access tokens. Set it explicitly so tokens survive restarts and work
+    # across workers; when empty a random per-process key is used.
+    SECRET_KEY: str = ""
+    ACCESS_TOKEN_TTL_SECONDS: int = 900
+    # Threads available to bcrypt; extra logins queue instead of taking more CPU.
+    BCRYPT_MAX_WORKERS: int = 2
+    # Recently verified admin credentials skip bcrypt on the legacy parameters; 0 disables.
+    CREDENTIAL_CACHE_TTL_SECONDS: float = 300
+    CREDENTIAL_CACHE_MAX_ENTRIES: int = 1024
 
     # This tells Pydantic to look for a .env file if the variables aren't in the environment.
     # While Docker Compose provides them, this is good practice for local development.
@@ -0,0 +1,244 @@
+"""
+Bulk customer import from CSV or NDJSON uploads.
+
+The upload is read record by record and validated with schemas.CustomerCreate
+in fixed-size chunks, so memory use depends on the chunk size rather than the
+file size. Each chunk is written in one transaction: on PostgreSQL the rows
+are COPYed into a temporary staging table and merged with a single
+INSERT ... SELECT ... ON CONFLICT; other databases get one multi-row INSERT
+... ON CONFLICT. Rows whose email already exists are skipped or update the
+existing customer, depending on the conflict policy.
+"""
+import csv
+import io
+import itertools
+import json
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import Column, MetaData, Table, Text, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateTable
+from starlette.concurrency import run_in_threadpool
+
+from . import database, schemas
+
+IMPORT_COLUMNS = ("full_name", "email", "phone_number", "address")
+
+# Column sizes from db_init/init.sql; longer values would fail their whole chunk.
+MAX_LENGTHS = {"full_name": 100, "email": 100, "phone_number": 20}
+
+EXISTING_EMAIL = "A customer with this email already exists."
+
+DIALECT_INSERTS = {
+    "postgresql": postgresql_insert,
+    "sqlite": sqlite_insert,
+}
+
+# Per-transaction staging table for COPY; PostgreSQL drops it on commit.
+_staging_table = Table(
+    "customer_import_staging", MetaData(),
+    *(Column(name, Text) for name in IMPORT_COLUMNS),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+# (row number, validated customer or None, error message or None)
+ParsedRow = Tuple[int, Optional[schemas.CustomerCreate], Optional[str]]
+
+
+def _validate(row_number: int, record) -> ParsedRow:
+    if not isinstance(record, dict):
+        return row_number, None, "Expected an object with customer fields."
+    try:
+        customer = schemas.CustomerCreate.model_validate(record)
+    except ValidationError as e:
+        return row_number, None, schemas.format_validation_error(e, "row")
+    for name, max_length in MAX_LENGTHS.items():
+        value = getattr(customer, name)
+        if value is not None and len(value) > max_length:
+            return row_number, None, f"{name}: must be at most {max_length} characters"
+    return row_number, customer, None
+
+
+def iter_rows(stream: BinaryIO, import_format: schemas.ExportFormat) -> Iterator[ParsedRow]:
+    """
+    Parses and validates an upload one record at a time. Columns other than the
+    customer fields (such as the `id` of an export) are ignored, and empty CSV
+    cells count as missing. Raises ValueError if the upload is not UTF-8 or CSV.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    row_number = 0
+    try:
+        if import_format == schemas.ExportFormat.csv:
+            for row_number, record in enumerate(csv.DictReader(text), start=1):
+                yield _validate(row_number, {
+                    name: value for name, value in record.items() if name in IMPORT_COLUMNS and value != ""
+                })
+        else:
+            for row_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield row_number, None, f"Invalid JSON: {e}"
+                    continue
+                yield _validate(row_number, record)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f"Could not read the upload after row {row_number}: {e}") from e
+    finally:
+        text.detach()
+
+
+@dataclass
+class ImportTally:
+    max_reported_rows: int
+    total_rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    report: List[schemas.CustomerImportRowReport] = field(default_factory=list)
+    report_truncated: bool = False
+
+    def add(self, row: int, outcome: schemas.ImportRowOutcome, detail: str) -> None:
+        if outcome == schemas.ImportRowOutcome.invalid:
+            self.invalid += 1
+        else:
+            self.skipped += 1
+        if len(self.report) < self.max_reported_rows:
+            self.report.append(schemas.CustomerImportRowReport(row=row, outcome=outcome, detail=detail))
+        else:
+            self.report_truncated = True
+
+    def result(self) -> schemas.CustomerImportResult:
+        return schemas.CustomerImportResult(
+            total_rows=self.total_rows, inserted=self.inserted, updated=self.updated,
+            skipped=self.skipped, invalid=self.invalid,
+            report=sorted(self.report, key=lambda entry: entry.row), report_truncated=self.report_truncated,
+        )
+
+
+# (row number, outcome, detail) for a row that was not written
+RowReport = Tuple[int, schemas.ImportRowOutcome, str]
+
+
+@dataclass
+class ChunkOutcome:
+    inserted: int = 0
+    updated: int = 0
+    skipped: List[RowReport] = field(default_factory=list)
+
+
+def _dedupe(rows: List[Tuple[int, schemas.CustomerCreate]], policy: schemas.ImportConflictPolicy,
+            outcome: ChunkOutcome) -> Dict[str, Tuple[int, schemas.CustomerCreate]]:
+    """One row per email: the first one when skipping duplicates, the last one when updating."""
+    by_email: Dict[str, Tuple[int, schemas.CustomerCreate]] = {}
+    for row, customer in rows:
+        previous = by_email.get(customer.email)
+        if previous is None:
+            by_email[customer.email] = (row, customer)
+        elif policy == schemas.ImportConflictPolicy.skip:
+            outcome.skipped.append((row, schemas.ImportRowOutcome.skipped, f"Duplicate of row {previous[0]} in this upload."))
+        else:
+            outcome.skipped.append((previous[0], schemas.ImportRowOutcome.skipped, f"Superseded by row {row} with the same email."))
+            by_email[customer.email] = (row, customer)
+    return by_email
+
+
+async def _write_chunk(db: AsyncSession, rows: List[Tuple[int, schemas.CustomerCreate]],
+                       policy: schemas.ImportConflictPolicy) -> ChunkOutcome:
+    dialect = db.get_bind().dialect.name
+    if dialect not in DIALECT_INSERTS:
+        raise RuntimeError(f"Bulk import is not supported on {dialect}.")
+
+    outcome = ChunkOutcome()
+    by_email = _dedupe(rows, policy, outcome)
+    existing = set(await db.scalars(
+        select(database.Customer.email).where(database.Customer.email.in_(list(by_email)))
+    ))
+    if policy == schemas.ImportConflictPolicy.skip:
+        for email in existing:
+            outcome.skipped.append((by_email.pop(email)[0], schemas.ImportRowOutcome.skipped, EXISTING_EMAIL))
+    if not by_email:
+        return outcome
+
+    records = [tuple(getattr(customer, name) for name in IMPORT_COLUMNS) for _, customer in by_email.values()]
+    insert = DIALECT_INSERTS[dialect]
+    customers = database.Customer.__table__
+    if dialect == "postgresql":
+        await db.execute(CreateTable(_staging_table))
+        raw_connection = await (await db.connection()).get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            _staging_table.name, records=records, columns=list(IMPORT_COLUMNS)
+        )
+        statement = insert(customers).from_select(list(IMPORT_COLUMNS), select(*_staging_table.c))
+    else:
+        statement = insert(customers).values([dict(zip(IMPORT_COLUMNS, record)) for record in records])
+
+    if policy == schemas.ImportConflictPolicy.skip:
+        statement = statement.on_conflict_do_nothing(index_elements=["email"])
+    else:
+        statement = statement.on_conflict_do_update(
+            index_elements=["email"],
+            set_={name: getattr(statement.excluded, name) for name in IMPORT_COLUMNS if name != "email"},
+        )
+    written = set(await db.scalars(statement.returning(customers.c.email)))
+
+    for email, (row, _) in by_email.items():
+        if email not in written:
+            # Inserted by a concurrent request after the existence check.
+            outcome.skipped.append((row, schemas.ImportRowOutcome.skipped, EXISTING_EMAIL))
+        elif email in existing:
+            outcome.updated += 1
+        else:
+            outcome.inserted += 1
+    return outcome
+
+
+async def import_customers(db: AsyncSession, stream: BinaryIO, import_format: schemas.ExportFormat,
+                           policy: schemas.ImportConflictPolicy, chunk_rows: int,
+                           max_reported_rows: int) -> schemas.CustomerImportResult:
+    """
+    Imports every record of `stream`, committing after each chunk of `chunk_rows`.
+    A chunk the database rejects is rolled back and its rows reported as invalid;
+    the import then carries on with the next chunk.
+    """
+    rows = iter_rows(stream, import_format)
+    tally = ImportTally(max_reported_rows)
+    while True:
+        # Parsing and pydantic validation are CPU-bound; keep them off the event loop.
+        chunk = await run_in_threadpool(lambda: list(itertools.islice(rows, chunk_rows)))
+        if not chunk:
+            break
+        tally.total_rows += len(chunk)
+
+        valid = []
+        for row, customer, error in chunk:
+            if customer is None:
+                tally.add(row, schemas.ImportRowOutcome.invalid, error)
+            else:
+                valid.append((row, customer))
+        if not valid:
+            continue
+
+        try:
+            outcome = await _write_chunk(db, valid, policy)
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            message = f"Rejected by the database with the rest of its chunk: {getattr(e, 'orig', None) or e}"
+            for row, _ in valid:
+                tally.add(row, schemas.ImportRowOutcome.invalid, message)
+            continue
+
+        tally.inserted += outcome.inserted
+        tally.updated += outcome.updated
+        for row, row_outcome, detail in outcome.skipped:
+            tally.add(row, row_outcome, detail)
+    return tally.result()
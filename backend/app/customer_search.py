@@ -0,0 +1,52 @@
+"""
+Case-insensitive partial matching of customers on name, email and phone.
+
+On PostgreSQL every column is covered by a pg_trgm GIN index (see
+db_init/init.sql), so `ILIKE '%term%'` is answered from the indexes instead of a
+sequential scan, and matches are ranked by trigram word similarity. Other
+databases fall back to the same filter with a simpler prefix-first ranking.
+"""
+from typing import List
+
+from sqlalchemy import Select, case, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import database
+
+# Trigram indexes can only serve terms that contain at least one full trigram.
+MIN_SEARCH_LENGTH = 3
+MAX_SEARCH_LENGTH = 100
+SEARCH_COLUMNS = ("full_name", "email", "phone_number")
+
+
+def escape_like(term: str) -> str:
+    """Escapes LIKE wildcards so they match literally (use with escape="\\")."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search_query(term: str, limit: int, dialect_name: str) -> Select:
+    """The ranked, limited SELECT of customers matching `term` for the given SQL dialect."""
+    term = term.strip()
+    escaped = escape_like(term)
+    columns = [getattr(database.Customer, name) for name in SEARCH_COLUMNS]
+
+    # Names that start with the term always rank above matches elsewhere.
+    name_prefix = case((database.Customer.full_name.ilike(f"{escaped}%", escape="\\"), 0), else_=1)
+    if dialect_name == "postgresql":
+        term_literal = literal(term)
+        rank = func.greatest(*(func.word_similarity(term_literal, column) for column in columns)).desc()
+    else:
+        rank = func.length(database.Customer.full_name)
+
+    return (
+        select(database.Customer)
+        .where(or_(*(column.ilike(f"%{escaped}%", escape="\\") for column in columns)))
+        .order_by(name_prefix, rank, database.Customer.id)
+        .limit(limit)
+    )
+
+
+async def search_customers(db: AsyncSession, term: str, limit: int) -> List[database.Customer]:
+    """Returns at most `limit` customers matching `term`, best match first."""
+    query = build_search_query(term, limit, db.get_bind().dialect.name)
+    return (await db.scalars(query)).all()
@@ -1,4 +1,5 @@
 import enum
+import time
 from sqlalchemy import (
     create_engine,
     Column,
@@ -8,15 +9,83 @@ from sqlalchemy import (
     Float,
     Enum,
     DateTime, # NEW: Import DateTime
+    Date,
+    Index,
+    DDL,
+    event,
     func # NEW: Import func for server-side defaults
 )
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
+from . import metrics
 from .config import settings
 
+# Async drivers for the sync URLs used elsewhere (training script, psql, docker-compose).
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """The async-driver form of a sync DATABASE_URL, e.g. postgresql:// -> postgresql+asyncpg://."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.drivername == backend and backend in ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    return parsed.render_as_string(hide_password=False)
+
+class _TimedPoolMixin:
+    """Reports how long each checkout waited for a connection to /metrics."""
+    engine_name = ""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_wait(self.engine_name, time.perf_counter() - start)
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    engine_name = "sync"
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    engine_name = "async"
+
+def _pool_options(url: str, poolclass) -> dict:
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+    # In-memory SQLite uses a single static connection; there is no pool to size.
+    if make_url(url).database not in (None, "", ":memory:"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            poolclass=poolclass,
+        )
+    return options
+
 # --- Database Setup ---
-engine = create_engine(settings.DATABASE_URL)
+# The API serves requests through the async engine. The sync engine remains for
+# scripts, benchmarks and anything that must run outside the event loop.
+engine = create_engine(settings.DATABASE_URL, **_pool_options(settings.DATABASE_URL, TimedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+ASYNC_DATABASE_URL = settings.DATABASE_ASYNC_URL or async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL, TimedAsyncQueuePool))
+# Objects stay readable after commit, since response serialization happens
+# after the session has been used and lazy loads cannot run outside it.
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Statement counts, database time and pool usage for /metrics.
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine, TimedQueuePool.engine_name)
+    metrics.instrument_engine(async_engine.sync_engine, TimedAsyncQueuePool.engine_name)
+
 Base = declarative_base()
 
 # --- ORM Models ---
@@ -53,11 +122,19 @@ class Quotation(Base):
     total_price = Column(Float)
     status = Column(String, nullable=False, default='Draft')
     # CORRECTED: The created_at column is now defined in the ORM model
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Not nullable: history pages are keyed on (created_at, id).
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     
     customer = relationship("Customer", back_populates="quotations")
     items = relationship("QuotationItem", back_populates="quotation", cascade="all, delete-orphan")
 
+    # Same names as db_init/init.sql. The customer index covers history pages,
+    # which are ordered by (created_at, id).
+    __table_args__ = (
+        Index("idx_quotations_customer_id_created_at", "customer_id", "created_at", "id"),
+        Index("idx_quotations_user_id", "user_id"),
+    )
+
 class QuotationItem(Base):
     __tablename__ = "quotation_items"
     id = Column(Integer, primary_key=True, index=True)
@@ -70,3 +147,99 @@ class QuotationItem(Base):
     
     quotation = relationship("Quotation", back_populates="items")
 
+    __table_args__ = (
+        Index("idx_quotation_items_quotation_id", "quotation_id"),
+        Index("idx_quotation_items_product_id", "product_id"),
+    )
+
+class SalesRollup(Base):
+    """
+    Revenue and volume of quotation items per month, salesperson, product type
+    and material. Derived data: database triggers keep it in step with every
+    write to quotation_items, quotations and products (see analytics.py).
+    """
+    __tablename__ = "sales_rollup_monthly"
+    month = Column(Date, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    product_type = Column(String(20), primary_key=True)
+    material = Column(String(20), primary_key=True)
+    revenue = Column(Float, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    line_items = Column(Integer, nullable=False, default=0)
+
+# --- Sales Rollup Triggers ---
+# PostgreSQL uses the statement-level triggers in db_init/init.sql
+# (db_migrations/002_sales_rollups.sql for existing databases). SQLite has no
+# transition tables, so databases built with create_all get row-level triggers.
+# DDL text is %-formatted, hence the doubled % in strftime patterns.
+_SQLITE_ROLLUP_DELTA = """
+    INSERT INTO sales_rollup_monthly (month, user_id, product_type, material, revenue, units, line_items)
+    SELECT strftime('%%Y-%%m-01', {created_at}), {user_id}, {product_type}, {material},
+           {sign} * SUM({price}), {sign} * SUM({quantity}), {sign} * COUNT(*)
+    FROM {source} AND {created_at} IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (month, user_id, product_type, material) DO UPDATE SET
+        revenue = revenue + excluded.revenue,
+        units = units + excluded.units,
+        line_items = line_items + excluded.line_items;"""
+
+def _item_delta(sign: int, row: str) -> dict:
+    # One item row, priced into its quotation's month and salesperson.
+    return dict(
+        sign=sign, created_at="q.created_at", user_id="q.user_id", product_type="p.product_type",
+        material="p.material", price=f"{row}.price", quantity=f"{row}.quantity",
+        source=f"quotations AS q, products AS p WHERE q.id = {row}.quotation_id AND p.id = {row}.product_id",
+    )
+
+def _quotation_delta(sign: int, row: str) -> dict:
+    # Every item of one quotation, under that quotation row's month and salesperson.
+    return dict(
+        sign=sign, created_at=f"{row}.created_at", user_id=f"{row}.user_id", product_type="p.product_type",
+        material="p.material", price="i.price", quantity="i.quantity",
+        source=f"quotation_items AS i JOIN products AS p ON p.id = i.product_id WHERE i.quotation_id = {row}.id",
+    )
+
+def _product_delta(sign: int, row: str) -> dict:
+    # Every item of one product, under that product row's type and material.
+    return dict(
+        sign=sign, created_at="q.created_at", user_id="q.user_id", product_type=f"{row}.product_type",
+        material=f"{row}.material", price="i.price", quantity="i.quantity",
+        source=f"quotation_items AS i JOIN quotations AS q ON q.id = i.quotation_id WHERE i.product_id = {row}.id",
+    )
+
+def _sqlite_rollup_trigger(name: str, event_clause: str, *deltas: dict, when: str = "") -> DDL:
+    body = "".join(_SQLITE_ROLLUP_DELTA.format(**delta) for delta in deltas)
+    when_clause = f" WHEN {when}" if when else ""
+    return DDL(
+        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event_clause} FOR EACH ROW{when_clause} BEGIN{body}\n"
+        "    DELETE FROM sales_rollup_monthly WHERE line_items = 0;\nEND"
+    )
+
+_SQLITE_ROLLUP_TRIGGERS = [
+    _sqlite_rollup_trigger("sales_rollup_items_insert", "INSERT ON quotation_items", _item_delta(1, "NEW")),
+    _sqlite_rollup_trigger("sales_rollup_items_update", "UPDATE ON quotation_items",
+                           _item_delta(-1, "OLD"), _item_delta(1, "NEW")),
+    _sqlite_rollup_trigger("sales_rollup_items_delete", "DELETE ON quotation_items", _item_delta(-1, "OLD")),
+    _sqlite_rollup_trigger("sales_rollup_quotations_update", "UPDATE OF user_id, created_at ON quotations",
+                           _quotation_delta(-1, "OLD"), _quotation_delta(1, "NEW"),
+                           when="OLD.user_id IS NOT NEW.user_id OR OLD.created_at IS NOT NEW.created_at"),
+    _sqlite_rollup_trigger("sales_rollup_products_update", "UPDATE OF product_type, material ON products",
+                           _product_delta(-1, "OLD"), _product_delta(1, "NEW"),
+                           when="OLD.product_type IS NOT NEW.product_type OR OLD.material IS NOT NEW.material"),
+]
+
+# Fills the rollup from any history that predates the table, e.g. an existing dev database.
+_SQLITE_ROLLUP_BACKFILL = DDL("""
+    INSERT INTO sales_rollup_monthly (month, user_id, product_type, material, revenue, units, line_items)
+    SELECT strftime('%%Y-%%m-01', q.created_at), q.user_id, p.product_type, p.material,
+           SUM(i.price), SUM(i.quantity), COUNT(*)
+    FROM quotation_items AS i JOIN quotations AS q ON q.id = i.quotation_id JOIN products AS p ON p.id = i.product_id
+    WHERE q.created_at IS NOT NULL
+    GROUP BY 1, 2, 3, 4""")
+
+# Created after its source tables, which the triggers are defined on.
+for _source in (QuotationItem, Quotation, Product):
+    SalesRollup.__table__.add_is_dependent_on(_source.__table__)
+
+for _ddl in [*_SQLITE_ROLLUP_TRIGGERS, _SQLITE_ROLLUP_BACKFILL]:
+    event.listen(SalesRollup.__table__, "after_create", _ddl.execute_if(dialect="sqlite"))
@@ -0,0 +1,80 @@
+"""
+Precompiled feature encoder for the AI price predictor.
+Turns prediction requests straight into a NumPy matrix laid out exactly like
+the model's training columns, without building a pandas DataFrame per request.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import schemas
+
+# Request fields copied as-is into their training column.
+NUMERIC_FIELDS = ("width", "height", "quantity")
+
+# Request fields one-hot encoded by the training script as "<field>_<value>".
+CATEGORICAL_FIELDS = {
+    "product_type": schemas.ProductType,
+    "material": schemas.Material,
+}
+
+
+def training_feature_columns() -> List[str]:
+    """
+    The column layout pd.get_dummies produces for a full training set:
+    numeric fields first, then each categorical field's values in sorted order.
+    """
+    columns = list(NUMERIC_FIELDS)
+    for field, enum_cls in CATEGORICAL_FIELDS.items():
+        columns.extend(f"{field}_{value}" for value in sorted(member.value for member in enum_cls))
+    return columns
+
+
+class FeatureEncoder:
+    """
+    Maps QuotePredictionRequest objects onto the saved feature column list.
+    Produces the same matrix as pd.get_dummies followed by a reindex against
+    the training columns: unknown columns stay 0, unused categories are dropped.
+    """
+
+    def __init__(self, feature_cols: Sequence[str]):
+        self.feature_cols: List[str] = [str(col) for col in feature_cols]
+        self.n_features = len(self.feature_cols)
+        positions = {col: i for i, col in enumerate(self.feature_cols)}
+
+        self._numeric_cols = [
+            (field, positions[field]) for field in NUMERIC_FIELDS if field in positions
+        ]
+        # For each categorical field, the column index of every enum member (-1 if untrained).
+        self._category_cols: Dict[str, Dict[str, int]] = {
+            field: {
+                member: positions.get(f"{field}_{member.value}", -1)
+                for member in enum_cls
+            }
+            for field, enum_cls in CATEGORICAL_FIELDS.items()
+        }
+
+    def encode(self, rows: Sequence[schemas.QuotePredictionRequest], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encodes rows into a float64 matrix of shape (len(rows), n_features).
+        A preallocated buffer with at least len(rows) rows can be passed as `out`.
+        """
+        n_rows = len(rows)
+        if out is None:
+            matrix = np.zeros((n_rows, self.n_features), dtype=np.float64)
+        else:
+            matrix = out[:n_rows]
+            matrix.fill(0.0)
+        if n_rows == 0:
+            return matrix
+
+        for field, col in self._numeric_cols:
+            matrix[:, col] = [getattr(row, field) for row in rows]
+
+        row_index = np.arange(n_rows)
+        for field, lookup in self._category_cols.items():
+            cols = np.fromiter((lookup[getattr(row, field)] for row in rows), dtype=np.intp, count=n_rows)
+            known = cols >= 0
+            matrix[row_index[known], cols[known]] = 1.0
+
+        return matrix
@@ -2,15 +2,45 @@
 Main FastAPI application file.
 Defines all API endpoints for the ERP/CRM system.
 """
+import asyncio
+import csv
+import io
+import json
 import os
-import joblib
-import pandas as pd
-from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+import tempfile
+import time
+import warnings
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from datetime import date, datetime
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 # Local imports
-from . import database, schemas, security
+from . import database, metrics, schemas, security
+from .config import settings
+from .analytics import sales_summary
+from .customer_import import import_customers
+from .customer_search import MAX_SEARCH_LENGTH, MIN_SEARCH_LENGTH, search_customers
+from .model_registry import ModelBundle, ModelRegistry
+from .pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from .prediction_cache import PredictionCache, make_key
+from .profiler import SlowRequestProfiler
+from .projection import Projection, dump_json
+from .quotations import create_quotation
+from .response_cache import (
+    CacheKey, CachedResponse, ResponseCache, SharedGenerations, default_generations_path, etag_matches, make_etag,
+)
+from .training_jobs import SUCCEEDED, TrainingJobManager, TrainingJobRunning
+
+# Models that cannot be exported to a TreeEnsemble are served by sklearn directly.
+# They are fitted on a DataFrame but fed the encoder's NumPy matrix, whose columns
+# are already in training order, so sklearn's feature name check is moot.
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
 
 # --- App and Model State Setup ---
 app = FastAPI(
@@ -19,105 +49,307 @@ app = FastAPI(
     version="0.1.0"
 )
 
-app.state.ml_model = None
-app.state.ml_feature_cols = None
+# The registry owns the active model; requests read `model_registry.active` once
+# so the model and its feature columns always come from the same artifact.
+app.state.model_registry = ModelRegistry(settings.MODEL_DIR, settings.LEGACY_MODEL_PATH, settings.MODEL_MEMORY_MAP)
+app.state.model_loading = None  # the startup load, running in the background
+app.state.model_watcher = None
+app.state.prediction_cache = PredictionCache(
+    settings.PREDICTION_CACHE_MAX_ENTRIES, settings.PREDICTION_CACHE_TTL_SECONDS
+)
+app.state.response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_TTL_SECONDS,
+    shared=SharedGenerations(settings.RESPONSE_CACHE_SHARED_PATH or default_generations_path()),
+)
+
+def _on_model_swap(bundle: ModelBundle):
+    """Invalidates cached prices whenever a different model goes live."""
+    cache = app.state.prediction_cache
+    cache.reset(bundle.version)
+    if settings.PREDICTION_CACHE_WARMUP:
+        count = cache.warm(bundle)
+        print(f"INFO:     Prediction cache warmed with {count} entries for model {bundle.version}.")
+
+app.state.model_registry.add_listener(_on_model_swap)
+
+# Retraining runs in its own process; this worker follows the jobs it started.
+app.state.training_jobs = TrainingJobManager(
+    settings.TRAINING_JOB_DIR,
+    env={
+        "DATABASE_URL": settings.DATABASE_URL,
+        "MODEL_DIR": settings.MODEL_DIR,
+        "LEGACY_MODEL_PATH": settings.LEGACY_MODEL_PATH,
+    },
+    nice=settings.TRAINING_JOB_NICE,
+    max_jobs=settings.TRAINING_JOB_MAX_KEPT,
+)
+app.state.training_followers = set()
+
+# --- Instrumentation ---
+# Every request is measured for /metrics; the sampling profiler is opt-in.
+app.state.profiler = None
+if settings.PROFILE_SLOW_REQUESTS_MS > 0:
+    app.state.profiler = SlowRequestProfiler(
+        settings.PROFILE_SLOW_REQUESTS_MS / 1e3, settings.PROFILE_SAMPLE_INTERVAL_MS / 1e3,
+        settings.PROFILE_DIR, max_files=settings.PROFILE_MAX_FILES,
+    )
+if settings.METRICS_ENABLED or app.state.profiler is not None:
+    app.add_middleware(
+        metrics.MetricsMiddleware,
+        on_complete=app.state.profiler.on_request_complete if app.state.profiler else None,
+    )
 
 # --- FastAPI Startup Event ---
 @app.on_event("startup")
 async def startup_event():
     """
     This function runs once when the application starts.
-    It's the robust way to load the AI model.
+    It starts loading the newest AI model in the background, so the server
+    accepts requests straight away, and starts watching for retrained ones.
+    GET /readyz reports when the model is available.
     """
-    model_path = "app/ml_model.joblib"
-    if os.path.exists(model_path):
-        try:
-            loaded_model, loaded_cols = joblib.load(model_path)
-            
-            if not hasattr(loaded_model, 'predict'):
-                raise TypeError("Loaded object is not a valid model with a 'predict' method.")
-
-            app.state.ml_model = loaded_model
-            app.state.ml_feature_cols = loaded_cols
-            print("INFO:     AI model loaded successfully into app state.")
-        except Exception as e:
-            print(f"ERROR:    Could not load AI model: {e}")
-            app.state.ml_model = None
-            app.state.ml_feature_cols = None
-    else:
+    if app.state.profiler is not None:
+        app.state.profiler.start()
+
+    registry = app.state.model_registry
+    app.state.model_loading = asyncio.create_task(_load_model(registry))
+
+    if settings.MODEL_WATCH_INTERVAL_SECONDS > 0:
+        app.state.model_watcher = asyncio.create_task(
+            registry.watch(settings.MODEL_WATCH_INTERVAL_SECONDS)
+        )
+
+async def _load_model(registry: ModelRegistry) -> Optional[ModelBundle]:
+    bundle = await run_in_threadpool(registry.reload)
+    if bundle is None:
         print("WARNING:  AI model file not found at startup. Please train the model.")
-        print("          Run: docker-compose exec backend python train_model.py")
+        print("          Run: docker-compose exec backend python -m app.train_model")
+    return bundle
+
+def _model_loading(app_state) -> bool:
+    """Whether the startup load is still running (no model yet, but one may be on its way)."""
+    loading = app_state.model_loading
+    return loading is not None and not loading.done()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if _model_loading(app.state):
+        app.state.model_loading.cancel()
+    if app.state.model_watcher is not None:
+        app.state.model_watcher.cancel()
+    # Training processes outlive the worker; their models are found by the next start.
+    for follower in list(app.state.training_followers):
+        follower.cancel()
+    if app.state.profiler is not None:
+        app.state.profiler.stop()
+    await database.async_engine.dispose()
 
 
 # --- Database Dependency ---
-def get_db():
-    db = database.SessionLocal()
-    try:
+async def get_db():
+    async with database.AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# --- Response Cache ---
+# Tags name the data a cached response was built from; writes invalidate them.
+CUSTOMERS_TAG = "customers"  # every cached customer response
+CUSTOMER_LIST_TAG = "customers:list"  # every page of GET /customers/
+
+def customer_tag(customer_id: int) -> str:
+    return f"customer:{customer_id}"
+
+def customer_quotations_tag(customer_id: int) -> str:
+    return f"customer:{customer_id}:quotations"
+
+_customer_adapter = TypeAdapter(schemas.Customer)
+
+# List endpoints select these columns as rows and encode them with orjson
+# instead of validating ORM objects (see projection.py).
+_customer_projection = Projection(schemas.Customer, database.Customer)
+_user_projection = Projection(schemas.User, database.User)
+_quotation_projection = Projection(schemas.Quotation, database.Quotation, exclude=("items",))
+_quotation_item_projection = Projection(schemas.QuotationItem, database.QuotationItem)
+
+def _dump_json(adapter: TypeAdapter, value) -> bytes:
+    """Serializes ORM objects or rows through their response schema, as response_model would."""
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+# load() returns the body, extra headers and any tags known only after reading the data.
+ResponseLoader = Callable[[], Awaitable[Tuple[bytes, Dict[str, str], Set[str]]]]
+
+async def _cached_json(request: Request, key: CacheKey, tags: Set[str], load: ResponseLoader) -> Response:
+    """
+    Serves a JSON GET response from the response cache, or builds it with `load`
+    and caches it. Answers 304 Not Modified when If-None-Match has its ETag.
+    """
+    cache: ResponseCache = request.app.state.response_cache
+    cached = cache.get(key)
+    if cached is None:
+        generation = cache.generation
+        body, headers, loaded_tags = await load()
+        cached = CachedResponse(body, make_etag(body), headers)
+        cache.put(key, cached, tags | loaded_tags, generation)
+
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", **cached.headers}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        cache.record_not_modified()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
+# --- Authentication ---
+ADMIN_ROLE = "Human Resources Head"
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def _get_user_by_username(db: AsyncSession, username: str) -> Optional[database.User]:
+    return await db.scalar(select(database.User).where(database.User.username == username))
+
+async def _caller_role(db: AsyncSession, bearer: Optional[HTTPAuthorizationCredentials],
+                 admin_username: Optional[str], admin_password: Optional[str]) -> str:
+    """
+    Role of the caller. A Bearer token is checked from its signature alone, with
+    no database lookup or bcrypt; the deprecated username/password parameters are
+    verified through the credential cache.
+    """
+    if bearer is not None:
+        try:
+            return security.decode_access_token(bearer.credentials)["role"]
+        except security.InvalidTokenError as e:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=str(e),
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    if admin_username and admin_password:
+        admin_user = await _get_user_by_username(db, admin_username)
+        if admin_user and await security.credential_cache.verify_async(admin_username, admin_password, admin_user.hashed_password):
+            return admin_user.role
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid administrator credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+@app.post("/auth/login", response_model=schemas.Token, tags=["Users"])
+async def login(credentials: schemas.LoginRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Verify a username and password once and issue a short-lived access token.
+    Send it as `Authorization: Bearer <token>` to the admin endpoints.
+    """
+    user = await _get_user_by_username(db, credentials.username)
+    if user is None or not await security.verify_password_async(credentials.password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+        )
+    return schemas.Token(
+        access_token=security.create_access_token(user.username, user.role),
+        expires_in=settings.ACCESS_TOKEN_TTL_SECONDS,
+        role=user.role,
+    )
 
 # --- User Management Endpoints ---
 # --- NEW: Endpoint to get all users ---
 @app.get("/users/", response_model=List[schemas.User], tags=["Users"])
-def read_users(admin_username: str, admin_password: str, db: Session = Depends(get_db)):
+async def read_users(
+    admin_username: Optional[str] = Query(None, deprecated=True, description="Use a Bearer token from /auth/login instead."),
+    admin_password: Optional[str] = Query(None, deprecated=True, description="Use a Bearer token from /auth/login instead."),
+    bearer: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+):
     """
-    Retrieve a list of all users. Requires admin credentials.
+    Retrieve a list of all users. Requires an admin access token.
     """
     # Authenticate and authorize the admin user
-    admin_user = db.query(database.User).filter(database.User.username == admin_username).first()
-    if not admin_user or not security.verify_password(admin_password, admin_user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid administrator credentials",
-        )
-    if admin_user.role != "Human Resources Head":
+    if await _caller_role(db, bearer, admin_username, admin_password) != ADMIN_ROLE:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin privileges required to view user list.",
         )
     
     # If authorized, return all users
-    users = db.query(database.User).all()
-    return users
+    users = await db.execute(select(*_user_projection.columns))
+    return Response(dump_json(_user_projection.dicts(users)), media_type="application/json")
 
 @app.put("/users/update-role", response_model=schemas.User, tags=["Users"])
-def update_user_role(update_data: schemas.UserRoleUpdate, db: Session = Depends(get_db)):
-    admin_user = db.query(database.User).filter(database.User.username == update_data.admin_username).first()
-    if not admin_user or not security.verify_password(update_data.admin_password, admin_user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-        )
-
-    if admin_user.role != "Human Resources Head":
+async def update_user_role(
+    update_data: schemas.UserRoleUpdate,
+    bearer: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+):
+    if await _caller_role(db, bearer, update_data.admin_username, update_data.admin_password) != ADMIN_ROLE:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Human Resources Head privileges required to change user roles.",
         )
 
-    target_user = db.query(database.User).filter(database.User.id == update_data.target_user_id).first()
+    target_user = await db.get(database.User, update_data.target_user_id)
     if not target_user:
         raise HTTPException(status_code=404, detail=f"Target user with ID {update_data.target_user_id} not found.")
 
     target_user.role = update_data.new_role.value
-    db.commit()
-    db.refresh(target_user)
+    await db.commit()
     return target_user
 
 
 # --- Customer Endpoints ---
 @app.post("/customers/", response_model=schemas.Customer, status_code=status.HTTP_201_CREATED, tags=["Customers"])
-def create_customer(customer: schemas.CustomerCreate, db: Session = Depends(get_db)):
+async def create_customer(request: Request, customer: schemas.CustomerCreate, db: AsyncSession = Depends(get_db)):
     db_customer = database.Customer(**customer.dict())
     db.add(db_customer)
-    db.commit()
-    db.refresh(db_customer)
+    await db.commit()
+    await db.refresh(db_customer)
+    # A new customer can only change list pages; cached customers are unaffected.
+    request.app.state.response_cache.invalidate(CUSTOMER_LIST_TAG)
     return db_customer
 
+@app.post("/customers/import", response_model=schemas.CustomerImportResult, tags=["Customers"], openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {"text/csv": {"schema": {"type": "string"}}, "application/x-ndjson": {"schema": {"type": "string"}}},
+    }
+})
+async def import_customers_endpoint(
+    request: Request,
+    import_format: Optional[schemas.ExportFormat] = Query(
+        None, alias="format", description="Defaults to csv for a text/csv body, ndjson otherwise."
+    ),
+    on_conflict: schemas.ImportConflictPolicy = Query(
+        schemas.ImportConflictPolicy.skip, description="What to do with rows whose email already exists."
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Import customers from a CSV (with a header row) or NDJSON request body,
+    e.g. the output of /customers/export. Rows are validated and committed in
+    chunks; invalid and skipped rows are listed in the report with their row number.
+    """
+    if import_format is None:
+        content_type = request.headers.get("content-type", "")
+        import_format = schemas.ExportFormat.csv if content_type.startswith("text/csv") else schemas.ExportFormat.ndjson
+
+    # The body goes to a temporary file rather than memory, so upload size is not bounded by RAM.
+    with tempfile.TemporaryFile() as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        try:
+            return await import_customers(
+                db, upload, import_format, on_conflict,
+                settings.CUSTOMER_IMPORT_CHUNK_ROWS, settings.CUSTOMER_IMPORT_MAX_REPORTED_ROWS,
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e}. Rows before this point were imported.",
+            )
+        finally:
+            # Chunks commit independently, so even a failed import may have written rows.
+            request.app.state.response_cache.invalidate(CUSTOMERS_TAG)
+
 @app.put("/customers/{customer_id}", response_model=schemas.Customer, tags=["Customers"])
-def update_customer(customer_id: int, customer_update: schemas.CustomerUpdate, db: Session = Depends(get_db)):
-    db_customer = db.query(database.Customer).filter(database.Customer.id == customer_id).first()
+async def update_customer(request: Request, customer_id: int, customer_update: schemas.CustomerUpdate,
+                          db: AsyncSession = Depends(get_db)):
+    db_customer = await db.get(database.Customer, customer_id)
     if db_customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
     
@@ -125,47 +357,500 @@ def update_customer(customer_id: int, customer_update: schemas.CustomerUpdate, d
     for key, value in update_data.items():
         setattr(db_customer, key, value)
         
-    db.commit()
-    db.refresh(db_customer)
+    await db.commit()
+    await db.refresh(db_customer)
+    request.app.state.response_cache.invalidate(customer_tag(customer_id))
     return db_customer
 
 @app.get("/customers/", response_model=List[schemas.Customer], tags=["Customers"])
-def read_customers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    customers = db.query(database.Customer).offset(skip).limit(limit).all()
-    return customers
+async def read_customers(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging; use `cursor` instead."),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Retrieve a page of customers ordered by ID. Pass the X-Next-Cursor response
+    header back as `cursor` to fetch the next page. Pages carry an ETag and are
+    served from the response cache until a customer on them changes.
+    """
+    async def load():
+        query = select(*_customer_projection.columns).order_by(database.Customer.id)
+        if cursor:
+            try:
+                (last_id,) = decode_cursor(cursor, 1)
+                query = query.where(database.Customer.id > int(last_id))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+        elif skip:
+            query = query.offset(skip)
+
+        customers = (await db.execute(query.limit(limit + 1))).all()
+        headers = {}
+        if len(customers) > limit:
+            customers = customers[:limit]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor([customers[-1].id])
+        body = dump_json(_customer_projection.dicts(customers))
+        return body, headers, {customer_tag(customer.id) for customer in customers}
+
+    key = ("customers", cursor, limit, None if cursor else skip)
+    return await _cached_json(request, key, {CUSTOMERS_TAG, CUSTOMER_LIST_TAG}, load)
+
+@app.get("/customers/search", response_model=List[schemas.Customer], tags=["Customers"])
+async def search_customers_endpoint(
+    q: str = Query(..., min_length=MIN_SEARCH_LENGTH, max_length=MAX_SEARCH_LENGTH,
+                   description="Part of a customer's name, email or phone number."),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Case-insensitive partial search on name, email and phone number, served by
+    trigram indexes. Returns the best `limit` matches, names starting with `q` first.
+    """
+    return await search_customers(db, q, limit)
+
+EXPORT_BATCH_ROWS = 1000
+CUSTOMER_EXPORT_COLUMNS = ["id", "full_name", "email", "phone_number", "address"]
+
+async def _stream_customers(export_format: schemas.ExportFormat):
+    """
+    Yields every customer, EXPORT_BATCH_ROWS at a time, from a server-side cursor.
+    Runs with its own session because it outlives the request's dependencies.
+    """
+    async with database.AsyncSessionLocal() as db:
+        if export_format == schemas.ExportFormat.csv:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(CUSTOMER_EXPORT_COLUMNS)
+            yield buffer.getvalue()
+
+        columns = [getattr(database.Customer, name) for name in CUSTOMER_EXPORT_COLUMNS]
+        result = await db.stream(
+            select(*columns)
+            .order_by(database.Customer.id)
+            .execution_options(yield_per=EXPORT_BATCH_ROWS)
+        )
+        async for batch in result.partitions():
+            yield _format_customer_batch(batch, export_format)
+
+def _format_customer_batch(rows, export_format: schemas.ExportFormat) -> str:
+    if export_format == schemas.ExportFormat.csv:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return "".join(json.dumps(dict(zip(CUSTOMER_EXPORT_COLUMNS, row))) + "\n" for row in rows)
+
+@app.get("/customers/export", tags=["Customers"], response_class=StreamingResponse, responses={
+    200: {"content": {"application/x-ndjson": {}, "text/csv": {}}, "description": "Every customer, streamed."}
+})
+async def export_customers(export_format: schemas.ExportFormat = Query(schemas.ExportFormat.ndjson, alias="format")):
+    """
+    Stream every customer as NDJSON (one JSON object per line) or CSV.
+    Memory use stays flat regardless of table size.
+    """
+    media_type = "text/csv" if export_format == schemas.ExportFormat.csv else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_customers(export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="customers.{export_format.value}"'},
+    )
 
 @app.get("/customers/{customer_id}", response_model=schemas.Customer, tags=["Customers"])
-def read_customer(customer_id: int, db: Session = Depends(get_db)):
-    db_customer = db.query(database.Customer).filter(database.Customer.id == customer_id).first()
-    if db_customer is None:
-        raise HTTPException(status_code=404, detail="Customer not found")
-    return db_customer
+async def read_customer(request: Request, customer_id: int, db: AsyncSession = Depends(get_db)):
+    async def load():
+        db_customer = await db.get(database.Customer, customer_id)
+        if db_customer is None:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return _dump_json(_customer_adapter, db_customer), {}, set()
+
+    return await _cached_json(request, ("customer", customer_id), {CUSTOMERS_TAG, customer_tag(customer_id)}, load)
+
+# --- Quotation Endpoints ---
+@app.post("/quotations/", response_model=schemas.Quotation, status_code=status.HTTP_201_CREATED, tags=["Quotations"])
+async def create_quotation_endpoint(
+    request: Request,
+    response: Response,
+    data: schemas.QuotationCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Create a quotation and all its items in one transaction. Item prices and the
+    total are computed server-side: by the AI model in one batched prediction
+    (the X-Model-Version header names it), or from each product's base price
+    per square metre when no model is loaded.
+    """
+    if _model_loading(request.app.state):
+        # Price with the model rather than base prices during the first seconds after a restart.
+        await asyncio.shield(request.app.state.model_loading)
+    bundle = request.app.state.model_registry.active
+    predict = None
+    if bundle is not None:
+        response.headers["X-Model-Version"] = bundle.version
+        predict = lambda rows: _predict_prices(request, bundle, rows)
+
+    try:
+        quotation = await create_quotation(db, data, predict)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    request.app.state.response_cache.invalidate(customer_quotations_tag(data.customer_id))
+    return quotation
+
+# --- Quotation History Endpoints ---
+async def _paginate_quotations(db: AsyncSession, query, cursor: Optional[str],
+                               limit: int) -> Tuple[list, Dict[str, str]]:
+    """
+    Applies keyset pagination ordered by (created_at, id) to a query selecting
+    quotation columns. Returns at most `limit` rows and the next-page cursor header.
+    """
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor, 2)
+            after = (datetime.fromisoformat(created_at), int(last_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+        query = query.where(tuple_(database.Quotation.created_at, database.Quotation.id) > after)
+
+    result = await db.execute(query.order_by(database.Quotation.created_at, database.Quotation.id).limit(limit + 1))
+    rows = result.all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1].created_at, rows[-1].id])
+    return rows, headers
 
 @app.get("/customers/{customer_id}/quotations/", response_model=List[schemas.Quotation], tags=["Quotations"])
-def read_customer_quotations(customer_id: int, db: Session = Depends(get_db)):
-    quotations = db.query(database.Quotation).filter(database.Quotation.customer_id == customer_id).all()
-    return quotations
+async def read_customer_quotations(
+    request: Request,
+    customer_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Retrieve a page of a customer's quotations with their items, oldest first.
+    Items for the whole page are loaded in one extra query. Pass the
+    X-Next-Cursor response header back as `cursor` to fetch the next page.
+    Pages are cached until the customer gets a new quotation.
+    """
+    async def load():
+        query = select(*_quotation_projection.columns).where(database.Quotation.customer_id == customer_id)
+        rows, headers = await _paginate_quotations(db, query, cursor, limit)
+        quotations = _quotation_projection.dicts(rows)
+        for quotation in quotations:
+            quotation["items"] = []
+        items_by_quotation = {quotation["id"]: quotation["items"] for quotation in quotations}
+        if items_by_quotation:
+            keys = _quotation_item_projection.keys
+            items = await db.execute(
+                select(database.QuotationItem.quotation_id, *_quotation_item_projection.columns)
+                .where(database.QuotationItem.quotation_id.in_(list(items_by_quotation)))
+                .order_by(database.QuotationItem.id)
+            )
+            for quotation_id, *values in items:
+                items_by_quotation[quotation_id].append(dict(zip(keys, values)))
+        return dump_json(quotations), headers, set()
 
-# --- AI Prediction Endpoint ---
-@app.post("/predict_quote", response_model=schemas.QuotePredictionResponse, tags=["AI Features"])
-def predict_quote(request: Request, data: schemas.QuotePredictionRequest):
-    model = request.app.state.ml_model
-    feature_cols = request.app.state.ml_feature_cols
+    key = ("customer_quotations", customer_id, cursor, limit)
+    return await _cached_json(request, key, {customer_quotations_tag(customer_id)}, load)
+
+@app.get("/customers/{customer_id}/quotations/summary", response_model=List[schemas.QuotationSummary], tags=["Quotations"])
+async def read_customer_quotation_summaries(
+    request: Request,
+    customer_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Retrieve a page of quotation headers with their item counts, without the items.
+    Paginated and cached like the full history endpoint.
+    """
+    async def load():
+        item_count = (
+            select(func.count(database.QuotationItem.id))
+            .where(database.QuotationItem.quotation_id == database.Quotation.id)
+            .correlate(database.Quotation)
+            .scalar_subquery()
+            .label("item_count")
+        )
+        summary = Projection(schemas.QuotationSummary, database.Quotation, item_count=item_count)
+        query = select(*summary.columns).where(database.Quotation.customer_id == customer_id)
+        rows, headers = await _paginate_quotations(db, query, cursor, limit)
+        return dump_json(summary.dicts(rows)), headers, set()
+
+    key = ("customer_quotation_summaries", customer_id, cursor, limit)
+    return await _cached_json(request, key, {customer_quotations_tag(customer_id)}, load)
+
+@app.get("/quotations/{quotation_id}/items", response_model=List[schemas.QuotationItem], tags=["Quotations"])
+async def read_quotation_items(request: Request, quotation_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Retrieve the items of one quotation, so clients listing headers from the
+    summary endpoint can load a quotation's items only when it is opened.
+    """
+    async def load():
+        customer_id = await db.scalar(
+            select(database.Quotation.customer_id).where(database.Quotation.id == quotation_id)
+        )
+        if customer_id is None:
+            raise HTTPException(status_code=404, detail="Quotation not found")
+        items = await db.execute(
+            select(*_quotation_item_projection.columns)
+            .where(database.QuotationItem.quotation_id == quotation_id)
+            .order_by(database.QuotationItem.id)
+        )
+        body = dump_json(_quotation_item_projection.dicts(items))
+        return body, {}, {customer_quotations_tag(customer_id)}
+
+    return await _cached_json(request, ("quotation_items", quotation_id), set(), load)
+
+# --- Analytics Endpoints ---
+@app.get("/analytics/sales", response_model=List[schemas.SalesAnalyticsRow], tags=["Analytics"])
+async def read_sales_analytics(
+    group_by: List[schemas.SalesDimension] = Query([schemas.SalesDimension.month]),
+    start: Optional[date] = Query(None, description="First month included; any day of it."),
+    end: Optional[date] = Query(None, description="Last month included; any day of it."),
+    user_id: Optional[int] = None,
+    product_type: Optional[schemas.ProductType] = None,
+    material: Optional[schemas.Material] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Revenue, units and line items of all quotations, grouped by any of month,
+    salesperson, product type and material (repeat `group_by` to combine them).
+    Served from incrementally maintained monthly rollups, so the cost does not
+    grow with the number of quotations.
+    """
+    return await sales_summary(
+        db, group_by, start=start, end=end, user_id=user_id,
+        product_type=product_type.value if product_type else None,
+        material=material.value if material else None,
+    )
+
+# --- Response Cache Endpoints ---
+@app.get("/cache/status", response_model=schemas.ResponseCacheStats, tags=["Monitoring"])
+def response_cache_status(request: Request):
+    """Size and hit ratio of this worker's response cache, for tuning RESPONSE_CACHE_*."""
+    return request.app.state.response_cache.stats()
+
+# --- Health Endpoints ---
+@app.get("/healthz", response_model=schemas.HealthStatus, response_model_exclude_none=True, tags=["Monitoring"])
+def liveness():
+    """Liveness: the process is up and serving requests. Does not touch the database or the model."""
+    return {"status": "ok"}
 
-    if model is None or feature_cols is None:
+@app.get("/readyz", response_model=schemas.HealthStatus, response_model_exclude_none=True, tags=["Monitoring"],
+         responses={503: {"model": schemas.HealthStatus, "description": "The AI model is not loaded."}})
+def readiness(request: Request, response: Response):
+    """
+    Readiness: the AI model is loaded and predictions can be served. CRUD
+    endpoints work before this turns ready, so gate only prediction traffic on it.
+    """
+    registry = request.app.state.model_registry
+    bundle = registry.active
+    if bundle is not None:
+        return {"status": "ready", "model_version": bundle.version}
+    response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    if _model_loading(request.app.state):
+        return {"status": "loading"}
+    return {"status": "unavailable", "detail": registry.last_error}
+
+# --- Metrics Endpoint ---
+@app.get("/metrics", tags=["Monitoring"], response_class=Response)
+def read_metrics():
+    """Request, database, pool and model metrics of this worker in the Prometheus text format."""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+# --- AI Prediction Helpers ---
+def _get_model(request: Request, response: Response) -> ModelBundle:
+    bundle = request.app.state.model_registry.active
+
+    if bundle is None and _model_loading(request.app.state):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI model is still loading. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+    if bundle is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="AI model is not available. Please train the model first."
         )
+    response.headers["X-Model-Version"] = bundle.version
+    return bundle
+
+def _predict_prices(request: Request, bundle: ModelBundle, rows: List[schemas.QuotePredictionRequest]) -> List[float]:
+    """
+    Returns rounded prices for rows, serving repeats from the prediction cache
+    and scoring all misses with one vectorized model call.
+    """
+    cache = request.app.state.prediction_cache
+    keys = [make_key(row) for row in rows]
+    prices = cache.get_many(bundle.version, keys)
+    missing = [i for i, price in enumerate(prices) if price is None]
+    if missing:
+        start = time.perf_counter()
+        features = bundle.encoder.encode([rows[i] for i in missing])
+        encoded = time.perf_counter()
+        predicted = bundle.model.predict(features)
+        metrics.MODEL_ENCODE_SECONDS.observe(encoded - start)
+        metrics.MODEL_INFERENCE_SECONDS.observe(time.perf_counter() - encoded)
+        metrics.MODEL_ROWS.inc(amount=len(missing))
+        for i, prediction in zip(missing, predicted):
+            prices[i] = round(float(prediction), 2)
+        cache.put_many(bundle.version, [keys[i] for i in missing], [prices[i] for i in missing])
+    return prices
+
+# --- AI Prediction Endpoints ---
+@app.post("/predict_quote", response_model=schemas.QuotePredictionResponse, tags=["AI Features"])
+def predict_quote(request: Request, response: Response, data: schemas.QuotePredictionRequest):
+    bundle = _get_model(request, response)
 
     try:
-        input_df = pd.DataFrame([data.dict()])
-        input_encoded = pd.get_dummies(input_df)
-        input_aligned = input_encoded.reindex(columns=list(feature_cols), fill_value=0)
-        
-        prediction = model.predict(input_aligned)[0]
+        prediction = _predict_prices(request, bundle, [data])[0]
         
-        return {"predicted_price": round(prediction, 2)}
+        return {"predicted_price": prediction}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred during prediction: {str(e)}")
+
+@app.post("/predict_quote/batch", response_model=schemas.QuoteBatchPredictionResponse, tags=["AI Features"])
+def predict_quote_batch(request: Request, response: Response, batch: schemas.QuoteBatchPredictionRequest):
+    """
+    Predict prices for many quotation items with a single vectorized model call.
+    Items that fail validation are reported individually; the rest are still priced.
+    """
+    bundle = _get_model(request, response)
+
+    results = [schemas.QuoteBatchItemResult(index=i) for i in range(len(batch.items))]
+    valid_rows = []
+    valid_indices = []
+    for i, raw_item in enumerate(batch.items):
+        try:
+            valid_rows.append(schemas.QuotePredictionRequest.model_validate(raw_item))
+            valid_indices.append(i)
+        except ValidationError as e:
+            results[i].error = schemas.format_validation_error(e, "item")
+
+    total_price = 0.0
+    if valid_rows:
+        try:
+            predictions = _predict_prices(request, bundle, valid_rows)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"An error occurred during prediction: {str(e)}")
+
+        for i, prediction in zip(valid_indices, predictions):
+            results[i].predicted_price = prediction
+            total_price += prediction
+
+    return {
+        "results": results,
+        "total_price": round(total_price, 2),
+        "predicted_count": len(valid_rows),
+        "error_count": len(results) - len(valid_rows),
+    }
+
+# --- AI Model Management Endpoints ---
+def _model_status(registry: ModelRegistry) -> dict:
+    bundle = registry.active
+    return {
+        "loaded": bundle is not None,
+        "version": bundle.version if bundle else None,
+        "artifact_path": bundle.path if bundle else None,
+        "loaded_at": bundle.loaded_at if bundle else None,
+        "memory_mapped": bundle.memory_mapped if bundle else False,
+        "available_versions": registry.available_versions(),
+        "worker_pid": os.getpid(),
+        "last_error": registry.last_error,
+        "prediction_cache": app.state.prediction_cache.stats(),
+    }
+
+@app.get("/model/status", response_model=schemas.ModelStatus, tags=["AI Features"])
+def read_model_status(request: Request):
+    """
+    Report the model version this worker is serving, when it was loaded,
+    and the hit/miss/eviction counters of its prediction cache.
+    """
+    return _model_status(request.app.state.model_registry)
+
+@app.post("/model/reload", response_model=schemas.ModelStatus, tags=["AI Features"])
+async def reload_model(
+    request: Request,
+    credentials: Optional[schemas.AdminCredentials] = None,
+    bearer: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Load the newest model artifact into this worker now. Requires an admin access token.
+    Other workers pick the artifact up on their next watch interval.
+    """
+    credentials = credentials or schemas.AdminCredentials()
+    if await _caller_role(db, bearer, credentials.admin_username, credentials.admin_password) != ADMIN_ROLE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required to reload the AI model.",
+        )
+
+    registry = request.app.state.model_registry
+    await run_in_threadpool(registry.reload, force=True)
+    return _model_status(registry)
+
+async def _follow_training_job(registry: ModelRegistry, manager: TrainingJobManager, job_id: str, process) -> None:
+    """Waits for a training process started by this worker and serves its model as soon as it succeeds."""
+    while process.poll() is None:
+        await asyncio.sleep(1.0)
+    job = await run_in_threadpool(manager.get, job_id)
+    if job is None or job["status"] != SUCCEEDED:
+        print(f"WARNING:  Training job {job_id} failed: {job['error'] if job else 'job file missing'}")
+    elif job["artifact_path"] is None:
+        print(f"INFO:     Training job {job_id} found no new quotation items; the model is unchanged.")
+    else:
+        bundle = await run_in_threadpool(registry.reload)
+        print(f"INFO:     Training job {job_id} finished; serving model {bundle.version if bundle else None}.")
+
+@app.post("/model/train", response_model=schemas.TrainingJob, status_code=status.HTTP_202_ACCEPTED,
+          tags=["AI Features"])
+async def start_training_job(
+    request: Request,
+    options: Optional[schemas.TrainingJobRequest] = None,
+    bearer: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Retrain the model in a background process. Requires an admin access token.
+    Returns the queued job straight away; follow it at GET /model/train/jobs/{job_id}.
+    Only one job runs at a time. When it succeeds this worker serves the new
+    model immediately and the others on their next watch interval.
+    """
+    options = options or schemas.TrainingJobRequest()
+    if await _caller_role(db, bearer, options.admin_username, options.admin_password) != ADMIN_ROLE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required to retrain the AI model.",
+        )
+
+    manager: TrainingJobManager = request.app.state.training_jobs
+    try:
+        job, process = await run_in_threadpool(manager.start, full=options.full, warm_start=options.warm_start)
+    except TrainingJobRunning as e:
+        running = f" ({e.job['id']})" if e.job else ""
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f"A training job is already running{running}.")
+    follower = asyncio.create_task(
+        _follow_training_job(request.app.state.model_registry, manager, job["id"], process)
+    )
+    request.app.state.training_followers.add(follower)
+    follower.add_done_callback(request.app.state.training_followers.discard)
+    return job
+
+@app.get("/model/train/jobs", response_model=List[schemas.TrainingJob], tags=["AI Features"])
+def read_training_jobs(request: Request, limit: int = Query(10, ge=1, le=100)):
+    """The most recent training jobs, newest first."""
+    return request.app.state.training_jobs.recent(limit)
+
+@app.get("/model/train/jobs/{job_id}", response_model=schemas.TrainingJob, tags=["AI Features"])
+def read_training_job(request: Request, job_id: str):
+    """Status of a training job and the progress of each pipeline stage it has reached."""
+    job = request.app.state.training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job
@@ -0,0 +1,264 @@
+"""
+Request instrumentation published in the Prometheus text format at /metrics.
+
+MetricsMiddleware times every request under its route template. While a
+request runs, a RequestStats in a context variable collects the SQL
+statements it executes and the time it spends in the database and waiting for
+a pooled connection. The SQLAlchemy hooks from `instrument_engine` and the
+timed pools in database.py write to it. Context variables follow the request
+into SQLAlchemy's async greenlets and into threadpool endpoints, so the
+counts are per request even under concurrency.
+
+Metrics are kept per worker process; with several workers each scrape sees
+the worker that answered it. There is no dependency on prometheus_client:
+the few metric types needed are implemented here.
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Route label for requests that matched no route, so 404 scans cannot create unbounded series.
+UNMATCHED_ROUTE = "<unmatched>"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, with +Inf last; sum)
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    bucket = _labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(total[0])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """A gauge whose samples are read from a callback at scrape time."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[LabelValues, float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")))
+REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body.", ("method", "route")))
+REQUEST_STATEMENTS = registry.register(Histogram(
+    "http_request_db_statements", "SQL statements executed per request.", ("method", "route"), COUNT_BUCKETS))
+REQUEST_DB_SECONDS = registry.register(Histogram(
+    "http_request_db_seconds", "Time per request spent executing SQL statements.", ("method", "route")))
+REQUEST_POOL_WAIT_SECONDS = registry.register(Histogram(
+    "http_request_db_pool_wait_seconds", "Time per request spent waiting for a pooled connection.",
+    ("method", "route")))
+POOL_WAIT_SECONDS = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time to get a connection from the pool, including opening a new one.",
+    ("engine",)))
+MODEL_ENCODE_SECONDS = registry.register(Histogram(
+    "model_encode_seconds", "Feature encoding time per batch of prediction inputs."))
+MODEL_INFERENCE_SECONDS = registry.register(Histogram(
+    "model_inference_seconds", "Model evaluation time per batch of prediction inputs."))
+MODEL_ROWS = registry.register(Counter(
+    "model_predicted_rows_total", "Inputs scored by the model (prediction cache misses)."))
+
+
+# --- Per-request statistics ---
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None)
+
+
+def observe_pool_wait(engine_name: str, seconds: float) -> None:
+    POOL_WAIT_SECONDS.observe(seconds, engine_name)
+    stats = current_request.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+def instrument_engine(engine, engine_name: str) -> None:
+    """Counts and times every statement run on `engine` (a sync Engine) and exports its pool usage."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_statement_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_statement_start"].pop()
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # A failed statement never reaches after_cursor_execute.
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_statement_start"):
+            conn.info["metrics_statement_start"].pop()
+
+    pool = engine.pool
+    if all(hasattr(pool, name) for name in ("checkedout", "checkedin", "overflow")):
+        _pools[engine_name] = pool
+
+
+_pools: Dict[str, object] = {}
+
+
+def _pool_samples() -> List[Tuple[LabelValues, float]]:
+    samples = []
+    for engine_name, pool in sorted(_pools.items()):
+        samples += [((engine_name, "checked_out"), pool.checkedout()), ((engine_name, "idle"), pool.checkedin()),
+                    ((engine_name, "overflow"), max(pool.overflow(), 0))]
+    return samples
+
+
+registry.register(Gauge(
+    "db_pool_connections", "Pooled database connections by engine and state.", ("engine", "state"), _pool_samples))
+
+
+# --- ASGI Middleware ---
+class MetricsMiddleware:
+    """
+    Records latency, status and database usage of every HTTP request, and adds
+    a Server-Timing header with the database time spent before the response started.
+    `on_complete(scope, start, seconds)` (perf_counter times) runs after each request, e.g. for the slow-request profiler.
+    """
+
+    def __init__(self, app, on_complete: Optional[Callable[[dict, float, float], None]] = None):
+        self.app = app
+        self.on_complete = on_complete
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = [500]
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+                timing = f"db;dur={stats.db_seconds * 1e3:.2f};desc=\"{stats.statements} statements\""
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+            REQUESTS.inc(*labels, str(status_code[0]))
+            REQUEST_SECONDS.observe(elapsed, *labels)
+            REQUEST_STATEMENTS.observe(stats.statements, *labels)
+            REQUEST_DB_SECONDS.observe(stats.db_seconds, *labels)
+            REQUEST_POOL_WAIT_SECONDS.observe(stats.pool_wait_seconds, *labels)
+            if self.on_complete is not None:
+                self.on_complete(scope, start, elapsed)
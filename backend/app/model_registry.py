@@ -0,0 +1,293 @@
+"""
+Versioned AI model artifacts and the registry that serves them.
+
+Training writes immutable artifacts named `ml_model-<version>.joblib` into the
+model directory. The registry loads the newest one off the request path and
+publishes it as a single ModelBundle, so the model, its feature columns and
+its encoder are always swapped together in one reference assignment.
+
+joblib, NumPy and (through unpickling) scikit-learn are imported on the first
+load rather than with this module, so importing the API stays fast and the
+model can load in the background after the server has started.
+
+Next to each artifact, `ml_model-<version>.trees/` holds the exported tree
+ensemble as plain .npy arrays plus a meta.json. Workers memory-map these
+read-only instead of unpickling the artifact. Every uvicorn worker on the host
+then shares one page-cache copy of the trees, and none of them imports
+scikit-learn. The .joblib file stays the source of truth (warm starts, models
+that cannot be exported). A missing or stale .trees directory is rebuilt from
+it on load.
+"""
+import asyncio
+import glob
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+if TYPE_CHECKING:
+    from .feature_encoder import FeatureEncoder
+
+ARTIFACT_PREFIX = "ml_model-"
+ARTIFACT_SUFFIX = ".joblib"
+SERVED_SUFFIX = ".trees"
+SERVED_FORMAT = 1
+
+
+def artifact_path(model_dir: str, version: str) -> str:
+    return os.path.join(model_dir, f"{ARTIFACT_PREFIX}{version}{ARTIFACT_SUFFIX}")
+
+
+def served_path(path: str) -> str:
+    """The memory-mappable export of the artifact at `path`."""
+    root, ext = os.path.splitext(path)
+    return (root if ext == ARTIFACT_SUFFIX else path) + SERVED_SUFFIX
+
+
+def new_version() -> str:
+    """A sortable version string for a freshly trained artifact."""
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def save_artifact(model, feature_cols, model_dir: str, version: Optional[str] = None) -> str:
+    """
+    Writes a versioned artifact atomically: the file only appears under its final
+    name once it is complete, so a watching registry never loads a partial file.
+    """
+    import joblib
+
+    from .tree_ensemble import TreeEnsemble
+
+    version = version or new_version()
+    os.makedirs(model_dir, exist_ok=True)
+    final_path = artifact_path(model_dir, version)
+    tmp_path = os.path.join(model_dir, f".{ARTIFACT_PREFIX}{version}.tmp")
+    joblib.dump((model, list(feature_cols)), tmp_path)
+    try:
+        # Written first, so workers that see the new artifact can map it straight away.
+        save_served_arrays(TreeEnsemble.from_sklearn(model), feature_cols, served_path(final_path),
+                           _fingerprint(tmp_path)[1:])
+    except TypeError:
+        pass  # Not exportable; workers serve it through scikit-learn.
+    os.replace(tmp_path, final_path)
+    return final_path
+
+
+def save_served_arrays(ensemble, feature_cols, path: str, source: Tuple[int, int]) -> None:
+    """
+    Writes `ensemble` as a directory of .npy files. `source` is the (mtime_ns,
+    size) of the artifact it was exported from, so a rewritten artifact is
+    noticed. The directory appears under its final name only once complete.
+    If another process got there first, its copy is kept.
+    """
+    import numpy as np
+
+    arrays = ensemble.to_arrays()
+    meta = {
+        "format": SERVED_FORMAT,
+        "source": list(source),
+        "feature_cols": [str(col) for col in feature_cols],
+        "scalars": {name: value for name, value in arrays.items() if not isinstance(value, np.ndarray)},
+    }
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.makedirs(tmp_path)
+    try:
+        for name, value in arrays.items():
+            if isinstance(value, np.ndarray):
+                np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(value))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)  # stale export of a rewritten artifact
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load_served_arrays(path: str, source: Tuple[int, int]):
+    """
+    Memory-maps an export written by save_served_arrays, read-only. Returns
+    (TreeEnsemble, feature columns), or None when it is missing, stale or unreadable.
+    """
+    import numpy as np
+
+    from .tree_ensemble import TreeEnsemble
+
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != SERVED_FORMAT or tuple(meta.get("source", ())) != tuple(source):
+            return None
+        arrays = {
+            name[:-len(".npy")]: np.asarray(np.load(os.path.join(path, name), mmap_mode="r"))
+            for name in os.listdir(path) if name.endswith(".npy")
+        }
+        return TreeEnsemble(**arrays, **meta["scalars"]), meta["feature_cols"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """Everything a prediction needs, loaded from one artifact."""
+    version: str
+    path: str
+    model: Any
+    feature_cols: List[str]
+    encoder: "FeatureEncoder"
+    loaded_at: datetime
+    fingerprint: Tuple[str, int, int]
+    # The trees are memory-mapped from the .trees export rather than unpickled.
+    memory_mapped: bool = False
+
+
+def _fingerprint(path: str) -> Tuple[str, int, int]:
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def _version_from_path(path: str) -> str:
+    name = os.path.basename(path)
+    if name.startswith(ARTIFACT_PREFIX) and name.endswith(ARTIFACT_SUFFIX):
+        return name[len(ARTIFACT_PREFIX):-len(ARTIFACT_SUFFIX)]
+    # Unversioned legacy artifact: identify it by its modification time.
+    mtime = datetime.fromtimestamp(os.stat(path).st_mtime, timezone.utc)
+    return f"legacy-{mtime.strftime('%Y%m%dT%H%M%SZ')}"
+
+
+def load_bundle(path: str, memory_map: bool = True) -> ModelBundle:
+    """
+    Loads and validates an artifact. Raises if the file is not a usable model.
+    With `memory_map`, the trees are mapped from the artifact's .trees export,
+    which is written first if it is missing or stale.
+    """
+    from .feature_encoder import FeatureEncoder
+
+    fingerprint = _fingerprint(path)
+    served = load_served_arrays(served_path(path), fingerprint[1:]) if memory_map else None
+    if served is None:
+        loaded_model, feature_cols = _unpickle(path)
+        if memory_map and hasattr(loaded_model, "tree_offsets"):
+            try:
+                save_served_arrays(loaded_model, feature_cols, served_path(path), fingerprint[1:])
+                print(f"INFO:     Exported {path} to {served_path(path)} for memory-mapped serving.")
+                served = load_served_arrays(served_path(path), fingerprint[1:])
+            except OSError as e:
+                print(f"WARNING:  Could not export {path} for memory-mapped serving: {e}")
+    if served is not None:
+        loaded_model, feature_cols = served
+
+    return ModelBundle(
+        version=_version_from_path(path),
+        path=path,
+        model=loaded_model,
+        feature_cols=feature_cols,
+        encoder=FeatureEncoder(feature_cols),
+        loaded_at=datetime.now(timezone.utc),
+        fingerprint=fingerprint,
+        memory_mapped=served is not None,
+    )
+
+
+def _unpickle(path: str) -> Tuple[Any, List[str]]:
+    """Loads a .joblib artifact, exporting boosted trees to a TreeEnsemble when possible."""
+    import joblib
+
+    from .tree_ensemble import TreeEnsemble
+
+    loaded_model, loaded_cols = joblib.load(path)
+
+    if not hasattr(loaded_model, 'predict'):
+        raise TypeError("Loaded object is not a valid model with a 'predict' method.")
+
+    try:
+        # Serve from flat NumPy arrays so requests never go through sklearn.
+        loaded_model = TreeEnsemble.from_sklearn(loaded_model)
+    except TypeError as e:
+        print(f"WARNING:  Serving the model through scikit-learn: {e}")
+
+    return loaded_model, [str(col) for col in loaded_cols]
+
+
+class ModelRegistry:
+    """
+    Holds the active ModelBundle and replaces it when a newer artifact appears.
+    Readers take `registry.active` once per request and use only that bundle.
+    """
+
+    def __init__(self, model_dir: str, legacy_path: Optional[str] = None, memory_map: bool = True):
+        self.model_dir = model_dir
+        self.legacy_path = legacy_path
+        self.memory_map = memory_map
+        self.last_error: Optional[str] = None
+        self._active: Optional[ModelBundle] = None
+        self._load_lock = threading.Lock()
+        self._listeners: List[Callable[[ModelBundle], None]] = []
+
+    @property
+    def active(self) -> Optional[ModelBundle]:
+        return self._active
+
+    def add_listener(self, callback: Callable[[ModelBundle], None]) -> None:
+        """Registers a callback run in the loading thread after every model swap."""
+        self._listeners.append(callback)
+
+    def available_versions(self) -> List[str]:
+        pattern = os.path.join(self.model_dir, f"{ARTIFACT_PREFIX}*{ARTIFACT_SUFFIX}")
+        return sorted(_version_from_path(path) for path in glob.glob(pattern))
+
+    def latest_artifact(self) -> Optional[str]:
+        """The newest versioned artifact, falling back to the legacy single file."""
+        versions = self.available_versions()
+        if versions:
+            return artifact_path(self.model_dir, versions[-1])
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            return self.legacy_path
+        return None
+
+    def reload(self, force: bool = False) -> Optional[ModelBundle]:
+        """
+        Loads the latest artifact if it differs from the active one (or `force`).
+        Blocking; call it from a worker thread, never from the event loop.
+        On failure the previously active bundle keeps serving.
+        """
+        with self._load_lock:
+            path = self.latest_artifact()
+            if path is None:
+                self.last_error = "No model artifact found."
+                return self._active
+
+            active = self._active
+            try:
+                if not force and active is not None and active.fingerprint == _fingerprint(path):
+                    return active
+                bundle = load_bundle(path, self.memory_map)
+            except Exception as e:
+                self.last_error = f"Could not load {path}: {e}"
+                print(f"ERROR:    {self.last_error}")
+                return active
+
+            self._active = bundle
+            self.last_error = None
+            print(f"INFO:     AI model version {bundle.version} loaded from {path}.")
+            for callback in self._listeners:
+                try:
+                    callback(bundle)
+                except Exception as e:
+                    print(f"ERROR:    Model swap listener failed: {e}")
+            return bundle
+
+    async def watch(self, interval_seconds: float) -> None:
+        """Polls the model directory and hot-swaps new artifacts until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await run_in_threadpool(self.reload)
@@ -0,0 +1,167 @@
+"""
+Parallel, cross-validated hyperparameter search for the price predictor.
+
+Every (candidate, fold) fit runs in a process pool. The training matrix is
+written once to .npy files and memory-mapped read-only by each worker, so the
+dataset is never pickled per task; workers derive their fold indices from the
+same seeded KFold. Each candidate is scored on R², fit time and the single-row
+latency of the flattened evaluator the API serves it with.
+"""
+import csv
+import itertools
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold
+
+from .tree_ensemble import TreeEnsemble
+
+DEFAULT_GRID: Dict[str, List[Any]] = {
+    "n_estimators": [100, 200, 400],
+    "max_depth": [2, 3, 4],
+    "learning_rate": [0.05, 0.1],
+}
+
+# Single-row predictions timed per fold model when measuring serving latency.
+LATENCY_SAMPLES = 200
+
+
+@dataclass
+class SearchOptions:
+    grid: Dict[str, List[Any]]
+    folds: int = 5
+    workers: Optional[int] = None
+    select_by: str = "r2"
+    min_r2: Optional[float] = None
+    max_predict_us: Optional[float] = None
+
+
+@dataclass
+class CandidateResult:
+    params: Dict[str, Any]
+    r2_mean: float
+    r2_std: float
+    fit_seconds: float
+    predict_us: float
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+# --- Worker Process ---
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(x_path: str, y_path: str, folds: int, random_state: int) -> None:
+    _worker["X"] = np.load(x_path, mmap_mode="r")
+    _worker["y"] = np.load(y_path, mmap_mode="r")
+    _worker["splits"] = list(KFold(folds, shuffle=True, random_state=random_state).split(_worker["X"]))
+
+
+def _evaluate_fold(params: Dict[str, Any], fold: int, random_state: int) -> Tuple[float, float, float]:
+    X, y = _worker["X"], _worker["y"]
+    train_idx, test_idx = _worker["splits"][fold]
+
+    model = GradientBoostingRegressor(random_state=random_state, **params)
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    score = r2_score(y[test_idx], model.predict(X[test_idx]))
+
+    ensemble = TreeEnsemble.from_sklearn(model)
+    row = np.asarray(X[test_idx[:1]])
+    timings = []
+    for _ in range(LATENCY_SAMPLES):
+        start = time.perf_counter()
+        ensemble.predict(row)
+        timings.append(time.perf_counter() - start)
+    return score, fit_seconds, statistics.median(timings) * 1e6
+
+
+# --- Search ---
+def run_search(X: np.ndarray, y: np.ndarray, grid: Dict[str, List[Any]], folds: int = 5,
+               workers: Optional[int] = None, random_state: int = 42) -> List[CandidateResult]:
+    """Cross-validates every grid candidate; results are sorted by mean R², best first."""
+    candidates = expand_grid(grid)
+    workers = workers or os.cpu_count() or 1
+    print(f"Searching {len(candidates)} candidates x {folds} folds on {workers} worker processes...")
+
+    with tempfile.TemporaryDirectory(prefix="model-search-") as shared_dir:
+        x_path = os.path.join(shared_dir, "X.npy")
+        y_path = os.path.join(shared_dir, "y.npy")
+        np.save(x_path, np.ascontiguousarray(X, dtype=np.float64))
+        np.save(y_path, np.ascontiguousarray(y, dtype=np.float64))
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(x_path, y_path, folds, random_state)) as pool:
+            futures = {
+                (i, fold): pool.submit(_evaluate_fold, params, fold, random_state)
+                for i, params in enumerate(candidates)
+                for fold in range(folds)
+            }
+            fold_results = {key: future.result() for key, future in futures.items()}
+
+    results = []
+    for i, params in enumerate(candidates):
+        scores, fit_times, latencies = zip(*(fold_results[(i, fold)] for fold in range(folds)))
+        results.append(CandidateResult(
+            params=params,
+            r2_mean=float(np.mean(scores)),
+            r2_std=float(np.std(scores)),
+            fit_seconds=float(np.mean(fit_times)),
+            predict_us=float(np.median(latencies)),
+        ))
+    results.sort(key=lambda result: result.r2_mean, reverse=True)
+    return results
+
+
+def select_best(results: List[CandidateResult], select_by: str = "r2", min_r2: Optional[float] = None,
+                max_predict_us: Optional[float] = None) -> CandidateResult:
+    """
+    Picks the best candidate among those meeting both constraints: the highest
+    R² when select_by is "r2", the lowest single-row latency when it is "latency".
+    """
+    eligible = [
+        result for result in results
+        if (min_r2 is None or result.r2_mean >= min_r2)
+        and (max_predict_us is None or result.predict_us <= max_predict_us)
+    ]
+    if not eligible:
+        raise ValueError("No candidate satisfies the R² and latency constraints.")
+    if select_by == "latency":
+        return min(eligible, key=lambda result: (result.predict_us, -result.r2_mean))
+    if select_by == "r2":
+        return max(eligible, key=lambda result: (result.r2_mean, -result.predict_us))
+    raise ValueError(f"Unknown selection criterion: {select_by}")
+
+
+def write_leaderboard(results: List[CandidateResult], path: str) -> None:
+    """Writes the leaderboard as JSON, plus a CSV with the same name for spreadsheets."""
+    rows = [asdict(result) for result in results]
+    with open(path, "w") as f:
+        json.dump(rows, f, indent=2)
+    with open(os.path.splitext(path)[0] + ".csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "params", "r2_mean", "r2_std", "fit_seconds", "predict_us"])
+        for rank, row in enumerate(rows, start=1):
+            writer.writerow([rank, json.dumps(row["params"], sort_keys=True), f"{row['r2_mean']:.4f}",
+                             f"{row['r2_std']:.4f}", f"{row['fit_seconds']:.3f}", f"{row['predict_us']:.1f}"])
+
+
+def print_leaderboard(results: List[CandidateResult], limit: int = 10) -> None:
+    print(f"\n{'rank':<6}{'R² mean':>9}{'R² std':>9}{'fit (s)':>9}{'predict (us)':>14}  params")
+    for rank, result in enumerate(results[:limit], start=1):
+        print(f"{rank:<6}{result.r2_mean:>9.4f}{result.r2_std:>9.4f}{result.fit_seconds:>9.3f}"
+              f"{result.predict_us:>14.1f}  {json.dumps(result.params, sort_keys=True)}")
@@ -0,0 +1,33 @@
+"""
+Opaque cursor tokens for keyset pagination.
+A cursor carries the sort key of the last row of a page; the next page starts
+strictly after it. Paginated list endpoints return the next cursor in the
+X-Next-Cursor response header, which is absent on the last page.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Sequence
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """
+    Returns the raw sort key values of a cursor.
+    Raises ValueError if the token is malformed or holds the wrong number of values.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed pagination cursor.") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Malformed pagination cursor.")
+    return values
@@ -0,0 +1,155 @@
+"""
+Bounded LRU/TTL cache for AI price predictions.
+
+Entries belong to exactly one model version. The model registry calls `reset`
+whenever it swaps in a different artifact, which drops every cached price, and
+lookups made with any other version simply miss, so a stale price is never served.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from . import schemas
+
+CacheKey = Tuple[float, float, int, str, str]
+
+# Input grid of the Streamlit prediction form: 0.1 m steps and quantity 1-20.
+GRID_WIDTHS = [round(0.5 + 0.1 * i, 1) for i in range(46)]  # 0.5 - 5.0
+GRID_HEIGHTS = [round(0.5 + 0.1 * i, 1) for i in range(26)]  # 0.5 - 3.0
+GRID_QUANTITIES = range(1, 21)
+
+
+def make_key(row: schemas.QuotePredictionRequest) -> CacheKey:
+    """
+    Normalizes a request into a cache key. Sizes are rounded to 6 decimals so
+    float noise from the client (1.2000000000000002) still hits the same entry.
+    """
+    return (
+        round(row.width, 6),
+        round(row.height, 6),
+        int(row.quantity),
+        schemas.ProductType(row.product_type).value,
+        schemas.Material(row.material).value,
+    )
+
+
+class GridRow(NamedTuple):
+    """A prediction input with the same fields as QuotePredictionRequest, minus validation."""
+    width: float
+    height: float
+    quantity: int
+    product_type: schemas.ProductType
+    material: schemas.Material
+
+
+def grid_requests() -> List[GridRow]:
+    """Every input the Streamlit prediction form can submit."""
+    return [
+        GridRow(width, height, quantity, product_type, material)
+        for width, height, quantity, product_type, material in itertools.product(
+            GRID_WIDTHS, GRID_HEIGHTS, GRID_QUANTITIES,
+            schemas.ProductType, schemas.Material,
+        )
+    ]
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predicted prices with an optional TTL.
+    A ttl_seconds of 0 keeps entries until they are evicted or invalidated.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, float]]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def reset(self, version: str) -> None:
+        """Drops every entry and starts caching for `version`."""
+        with self._lock:
+            if self._version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get_many(self, version: str, keys: Sequence[CacheKey]) -> List[Optional[float]]:
+        """Returns the cached price for each key, or None on a miss."""
+        if not self.enabled:
+            return [None] * len(keys)
+
+        now = time.monotonic()
+        results: List[Optional[float]] = []
+        with self._lock:
+            if version != self._version:
+                self.misses += len(keys)
+                return [None] * len(keys)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                elif entry[1] and entry[1] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[0])
+        return results
+
+    def put_many(self, version: str, keys: Sequence[CacheKey], prices: Sequence[float]) -> None:
+        """Stores prices computed by `version`; ignored if that model is no longer active."""
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            if version != self._version:
+                return
+            for key, price in zip(keys, prices):
+                self._entries[key] = (float(price), expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def warm(self, bundle) -> int:
+        """Precomputes the full form input grid with one batched prediction."""
+        if not self.enabled:
+            return 0
+        rows = grid_requests()[:self.max_entries]
+        prices = [round(float(price), 2) for price in bundle.model.predict(bundle.encoder.encode(rows))]
+        keys = [(row.width, row.height, row.quantity, row.product_type.value, row.material.value) for row in rows]
+        self.put_many(bundle.version, keys, prices)
+        return len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,122 @@
+"""
+Opt-in sampling profiler that keeps the stacks of slow requests.
+
+A daemon thread snapshots the stack of every other thread in the process
+every few milliseconds (sys._current_frames) and keeps the last half minute of
+samples in memory. When a request takes longer than the threshold, the samples
+taken while it ran are written to PROFILE_DIR in the "folded" format
+(`frame;frame;frame count` per line). flamegraph.pl, speedscope and inferno
+all read this format.
+
+Samples are not attributed to individual requests: a dump holds everything
+the process ran during the slow request, including overlapping requests and
+background work. Stacks of threads that are only waiting (the idle event loop
+and threadpool workers) are skipped. Sampling costs one stack walk per thread
+per interval, so the profiler stays off unless PROFILE_SLOW_REQUESTS_MS is set.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Optional, Tuple
+
+# Leaf functions of threads blocked waiting for work rather than doing any.
+IDLE_FUNCTIONS = {"select", "poll", "wait", "_wait_for_tstate_lock", "accept"}
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SlowRequestProfiler:
+    def __init__(self, threshold_seconds: float, interval_seconds: float, output_dir: str,
+                 window_seconds: float = 30.0, max_files: int = 100):
+        self.threshold_seconds = threshold_seconds
+        self.interval_seconds = interval_seconds
+        self.output_dir = output_dir
+        self.window_seconds = window_seconds
+        self.max_files = max_files
+        # (perf_counter time, folded stack), oldest first
+        self._samples: Deque[Tuple[float, str]] = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Frame labels by code object, and one shared copy of each distinct stack,
+        # so the buffer holds references rather than thousands of equal strings.
+        self._names: Dict[object, str] = {}
+        self._stacks: Dict[str, str] = {}
+        self.dumps = 0
+
+    def start(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+        print(f"INFO:     Profiling requests slower than {self.threshold_seconds * 1e3:.0f} ms "
+              f"into {self.output_dir}.")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _fold(self, frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            name = self._names.get(code)
+            if name is None:
+                name = self._names[code] = _frame_name(code)
+            names.append(name)
+            frame = frame.f_back
+        stack = ";".join(reversed(names))
+        return self._stacks.setdefault(stack, stack)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            now = time.perf_counter()
+            stacks = [
+                self._fold(frame) for thread_id, frame in sys._current_frames().items()
+                if thread_id != own_id and frame.f_code.co_name not in IDLE_FUNCTIONS
+            ]
+            with self._lock:
+                self._samples.extend((now, stack) for stack in stacks)
+                while self._samples and self._samples[0][0] < now - self.window_seconds:
+                    self._samples.popleft()
+
+    def on_request_complete(self, scope: dict, start: float, seconds: float) -> None:
+        """MetricsMiddleware callback: dumps the samples taken during a slow request."""
+        if seconds < self.threshold_seconds:
+            return
+        end = start + seconds
+        with self._lock:
+            stacks = Counter(stack for taken_at, stack in self._samples if start <= taken_at <= end)
+        if not stacks:
+            return
+        route = getattr(scope.get("route"), "path", scope["path"])
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{slug}-{seconds * 1e3:.0f}ms.folded"
+        path = os.path.join(self.output_dir, name)
+        try:
+            with open(path, "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+            self.dumps += 1
+            self._prune()
+        except OSError as e:
+            print(f"WARNING:  Could not write profile {path}: {e}")
+            return
+        print(f"INFO:     {scope['method']} {route} took {seconds * 1e3:.0f} ms; "
+              f"{sum(stacks.values())} stack samples written to {path}")
+
+    def _prune(self) -> None:
+        """Keeps only the newest max_files dumps."""
+        dumps = sorted(
+            (entry for entry in os.scandir(self.output_dir) if entry.name.endswith(".folded")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in dumps[:max(len(dumps) - self.max_files, 0)]:
+            os.remove(entry.path)
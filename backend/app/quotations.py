@@ -0,0 +1,96 @@
+"""
+Quotation creation with server-side pricing.
+
+A quotation and all of its items are written in one transaction with a fixed
+number of statements, whatever the number of lines: one lookup for the
+customer and user, one for every product involved, one INSERT for the
+quotation, one batched INSERT for its items and one SELECT reading the items
+back with their IDs. Item prices come from one batched model prediction, or
+from the product's base price per square metre when no model is loaded.
+"""
+from typing import Callable, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import run_in_threadpool
+
+from . import database, schemas
+
+# Prices every row of a batch with a single model call.
+BatchPredictor = Callable[[List[schemas.QuotePredictionRequest]], List[float]]
+
+
+def base_price(product: database.Product, item: schemas.QuotationItemCreate) -> float:
+    """The list price of a line: base price per square metre times area times quantity."""
+    return round(product.base_price * item.width * item.height * item.quantity, 2)
+
+
+async def create_quotation(db: AsyncSession, data: schemas.QuotationCreate,
+                           predict: Optional[BatchPredictor]) -> database.Quotation:
+    """
+    Prices and stores a quotation with its items, then commits. Items are
+    priced with `predict` when given, from base prices otherwise.
+    Raises LookupError if the customer, user or a product does not exist.
+    """
+    owners = (await db.execute(
+        select(
+            select(database.Customer.id).where(database.Customer.id == data.customer_id).exists(),
+            select(database.User.id).where(database.User.id == data.user_id).exists(),
+        )
+    )).one()
+    if not owners[0]:
+        raise LookupError(f"Customer with ID {data.customer_id} not found.")
+    if not owners[1]:
+        raise LookupError(f"User with ID {data.user_id} not found.")
+
+    product_ids = {item.product_id for item in data.items}
+    products = {
+        product.id: product
+        for product in await db.scalars(select(database.Product).where(database.Product.id.in_(product_ids)))
+    }
+    missing = sorted(product_ids - products.keys())
+    if missing:
+        raise LookupError(f"Product(s) not found: {', '.join(str(product_id) for product_id in missing)}.")
+
+    if predict is not None:
+        rows = [
+            schemas.QuotePredictionRequest(
+                width=item.width, height=item.height, quantity=item.quantity,
+                product_type=products[item.product_id].product_type,
+                material=products[item.product_id].material,
+            )
+            for item in data.items
+        ]
+        # Encoding and tree evaluation are CPU-bound; keep them off the event loop.
+        prices = await run_in_threadpool(predict, rows)
+    else:
+        prices = [base_price(products[item.product_id], item) for item in data.items]
+
+    quotation = database.Quotation(
+        customer_id=data.customer_id,
+        user_id=data.user_id,
+        status=data.status,
+        total_price=round(sum(prices), 2),
+    )
+    db.add(quotation)
+    await db.flush()
+
+    # Core executemany needs no per-row RETURNING, so the driver sends the items
+    # as one batch on every backend; the ORM would fall back to row-by-row
+    # INSERTs wherever it cannot match returned keys to objects.
+    await db.execute(insert(database.QuotationItem), [
+        {
+            "quotation_id": quotation.id, "product_id": item.product_id, "width": item.width,
+            "height": item.height, "quantity": item.quantity, "price": price,
+        }
+        for item, price in zip(data.items, prices)
+    ])
+    items = (await db.scalars(
+        select(database.QuotationItem)
+        .where(database.QuotationItem.quotation_id == quotation.id)
+        .order_by(database.QuotationItem.id)
+    )).all()
+    set_committed_value(quotation, "items", items)
+    await db.commit()
+    return quotation
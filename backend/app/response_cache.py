@@ -0,0 +1,235 @@
+"""
+Bounded in-process cache of serialized GET responses, with ETags.
+
+Entries are JSON bodies tagged with the data they were built from, e.g.
+"customer:42" or "customer:42:quotations". Endpoints that write invalidate
+exactly the tags they touch once their transaction has committed. A read that
+overlaps an invalidation is served but not stored, so a body read before a
+write can never be cached after it.
+
+Each worker process has its own cache. So that a write handled by one
+worker also invalidates the others, invalidations are counted in a small
+file of counters that every worker on the host memory-maps
+(SharedGenerations). An entry remembers the counters of its tags, and a hit
+is served only while they are unchanged, which costs a few memory reads.
+Writes made outside the API (scripts, psql, other hosts) are only picked up
+when the TTL expires.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, NamedTuple, Optional, Set, Tuple
+
+CacheKey = Tuple[Hashable, ...]
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+def make_etag(body: bytes) -> str:
+    """A strong ETag derived from the body, so equal bodies always share one."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers `etag` (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def default_generations_path() -> str:
+    """A file in shared memory (/dev/shm) where available, else in the temp directory."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "reliant-response-cache-generations")
+
+
+class SharedGenerations:
+    """
+    Invalidation counters shared by every process that maps the same file.
+
+    Tags hash into a fixed number of 8-byte slots, so unrelated tags can share a
+    slot; a collision only costs an extra miss. Slot 0 counts every
+    invalidation. Counters only ever grow, so processes (or deployments) that
+    share the file by accident at worst invalidate each other's entries.
+    """
+
+    _SLOT = struct.Struct("<Q")
+
+    def __init__(self, path: str, slots: int = 65536):
+        self.slots = slots
+        size = slots * self._SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def slots_of(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(sorted({
+            1 + int.from_bytes(hashlib.blake2b(tag.encode(), digest_size=8).digest(), "little") % (self.slots - 1)
+            for tag in tags
+        }))
+
+    def read(self, slots: Iterable[int]) -> Tuple[int, ...]:
+        unpack, size, data = self._SLOT.unpack_from, self._SLOT.size, self._map
+        return tuple(unpack(data, slot * size)[0] for slot in slots)
+
+    @property
+    def total(self) -> int:
+        return self.read((0,))[0]
+
+    def bump(self, tags: Iterable[str]) -> None:
+        """
+        Counts an invalidation of `tags`. The total goes first: a reader that
+        still sees the old total read the tags' slots before this started.
+        """
+        size = self._SLOT.size
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            for slot in (0, *self.slots_of(tags)):
+                self._SLOT.pack_into(self._map, slot * size, self.read((slot,))[0] + 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of responses bounded by entry count and total body
+    bytes, with an optional TTL. A max_entries of 0 disables storing. With
+    `shared`, invalidations made by other processes mapping the same
+    SharedGenerations file are honoured as well.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float = 0,
+                 shared: Optional[SharedGenerations] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        # key -> (response, tags, expires_at, (shared slots, their counters at load time))
+        self._entries: "OrderedDict[CacheKey, Tuple[CachedResponse, Set[str], float, Tuple]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[CacheKey]] = {}
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @property
+    def generation(self) -> Tuple[int, int]:
+        """Changes on every invalidation; take it before reading the data to cache."""
+        return self._generation, self.shared.total if self.shared is not None else 0
+
+    def get(self, key: CacheKey) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] and entry[2] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            slots, counters = entry[3]
+            if slots and self.shared.read(slots) != counters:
+                self._remove(key)
+                self.remote_invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: CacheKey, response: CachedResponse, tags: Iterable[str],
+            generation: Tuple[int, int]) -> None:
+        """Stores a response built from data read at `generation`; dropped if anything was invalidated since."""
+        size = len(response.body)
+        if not self.enabled or size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else 0.0
+        tags = set(tags)
+        shared = ((), ())
+        if self.shared is not None:
+            slots = self.shared.slots_of(tags)
+            # Read before checking the total, so they are the counters from before the load.
+            shared = (slots, self.shared.read(slots))
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, tags, expires_at, shared)
+            self._bytes += size
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags: str) -> int:
+        """Drops every entry carrying any of `tags`; returns how many were dropped."""
+        if self.shared is not None:
+            self.shared.bump(tags)
+        with self._lock:
+            self._generation += 1
+            keys = set().union(*(self._keys_by_tag.get(tag, ()) for tag in tags))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def _remove(self, key: CacheKey) -> None:
+        response, tags, _, _ = self._entries.pop(key)
+        self._bytes -= len(response.body)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "remote_invalidations": self.remote_invalidations,
+            }
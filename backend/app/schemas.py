@@ -1,9 +1,25 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 # NEW: Import the datetime type
-from datetime import datetime
-from pydantic import BaseModel
+from datetime import date, datetime
+from pydantic import BaseModel, Field, ValidationError
 from enum import Enum
 
+# Upper bound on the number of items accepted by the batch prediction endpoint.
+MAX_PREDICTION_BATCH_SIZE = 10000
+# Upper bound on the number of items in one quotation.
+MAX_QUOTATION_ITEMS = 1000
+
+def format_validation_error(error: ValidationError, subject: str) -> str:
+    """
+    One line per failed field ("width: Input should be ..."), for the per-row
+    errors of batch prediction and customer import. `subject` names errors
+    that concern the whole row or item rather than a field.
+    """
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or subject}: {err['msg']}"
+        for err in error.errors()
+    )
+
 # --- Enums for API validation ---
 class UserRole(str, Enum):
     Manager = "Manager"
@@ -22,6 +38,26 @@ class Material(str, Enum):
     Aluminium = "Aluminium"
     Timber = "Timber"
 
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+class ImportConflictPolicy(str, Enum):
+    # What a bulk import does with a row whose email already exists.
+    skip = "skip"
+    update = "update"
+
+class ImportRowOutcome(str, Enum):
+    invalid = "invalid"
+    skipped = "skipped"
+
+class SalesDimension(str, Enum):
+    # What GET /analytics/sales can group revenue and volume by.
+    month = "month"
+    salesperson = "salesperson"
+    product_type = "product_type"
+    material = "material"
+
 
 # --- Base Schemas ---
 class CustomerBase(BaseModel):
@@ -40,12 +76,37 @@ class CustomerUpdate(BaseModel):
     phone_number: Optional[str] = None
     address: Optional[str] = None
 
-class UserRoleUpdate(BaseModel):
-    admin_username: str
-    admin_password: str
+class QuotationItemCreate(BaseModel):
+    product_id: int
+    width: float = Field(..., gt=0)
+    height: float = Field(..., gt=0)
+    quantity: int = Field(1, ge=1)
+
+class QuotationCreate(BaseModel):
+    customer_id: int
+    user_id: int
+    status: str = Field("Draft", max_length=20)
+    items: List[QuotationItemCreate] = Field(..., min_length=1, max_length=MAX_QUOTATION_ITEMS)
+
+class AdminCredentials(BaseModel):
+    # Deprecated: send an access token from /auth/login as a Bearer header instead.
+    admin_username: Optional[str] = None
+    admin_password: Optional[str] = None
+
+class UserRoleUpdate(AdminCredentials):
     target_user_id: int
     new_role: UserRole
 
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+    role: str
+
 # --- Schemas for API Responses ---
 class Customer(CustomerBase):
     id: int
@@ -85,6 +146,18 @@ class Quotation(BaseModel):
     class Config:
         from_attributes = True
 
+class QuotationSummary(BaseModel):
+    id: int
+    customer_id: int
+    user_id: int
+    total_price: Optional[float] = None
+    status: str
+    created_at: datetime
+    item_count: int
+
+    class Config:
+        from_attributes = True
+
 # --- Schemas for AI Features ---
 class QuotePredictionRequest(BaseModel):
     width: float
@@ -96,6 +169,131 @@ class QuotePredictionRequest(BaseModel):
 class QuotePredictionResponse(BaseModel):
     predicted_price: float
 
+class QuoteBatchPredictionRequest(BaseModel):
+    # Items are kept raw here and validated one by one in the endpoint,
+    # so a single malformed item is reported instead of rejecting the batch.
+    items: List[Any] = Field(..., min_length=1, max_length=MAX_PREDICTION_BATCH_SIZE)
+
+class QuoteBatchItemResult(BaseModel):
+    index: int
+    predicted_price: Optional[float] = None
+    error: Optional[str] = None
+
+class QuoteBatchPredictionResponse(BaseModel):
+    results: List[QuoteBatchItemResult]
+    total_price: float
+    predicted_count: int
+    error_count: int
+
+class CustomerImportRowReport(BaseModel):
+    row: int  # 1-based position of the record in the upload, header excluded
+    outcome: ImportRowOutcome
+    detail: str
+
+class CustomerImportResult(BaseModel):
+    total_rows: int
+    inserted: int
+    updated: int
+    skipped: int
+    invalid: int
+    # Invalid and skipped rows, capped at CUSTOMER_IMPORT_MAX_REPORTED_ROWS.
+    report: List[CustomerImportRowReport]
+    report_truncated: bool
+
+class SalesAnalyticsRow(BaseModel):
+    # Dimensions that were not grouped by are null.
+    month: Optional[date] = None
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    product_type: Optional[str] = None
+    material: Optional[str] = None
+    revenue: float
+    units: int  # sum of item quantities
+    line_items: int
+
+class PredictionCacheStats(BaseModel):
+    version: Optional[str] = None
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
+    invalidations: int
+
+class ResponseCacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    bytes: int
+    max_bytes: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_ratio: float
+    not_modified: int  # 304 responses, cached or not
+    evictions: int
+    expirations: int
+    invalidations: int
+    remote_invalidations: int  # entries found invalidated by another worker's write
+
+class ModelStatus(BaseModel):
+    loaded: bool
+    version: Optional[str] = None
+    artifact_path: Optional[str] = None
+    loaded_at: Optional[datetime] = None
+    memory_mapped: bool = False
+    available_versions: List[str] = []
+    worker_pid: int
+    last_error: Optional[str] = None
+    prediction_cache: PredictionCacheStats
+
+# --- Schemas for Training Jobs ---
+class TrainingJobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class TrainingJobRequest(AdminCredentials):
+    # Discard the feature cache and re-read every quotation item.
+    full: bool = False
+    # Add this many trees to the latest model instead of refitting from scratch.
+    warm_start: int = Field(0, ge=0, le=1000)
+
+class TrainingStage(BaseModel):
+    name: str  # load, assemble, fit, evaluate or save
+    status: str  # running, done or failed
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    wall_seconds: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+    # Rows read so far while loading (total unknown), trees built while fitting.
+    done: Optional[int] = None
+    total: Optional[int] = None
+
+class TrainingJob(BaseModel):
+    id: str
+    status: TrainingJobStatus
+    full: bool
+    warm_start: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    pid: Optional[int] = None
+    stage: Optional[str] = None
+    stages: List[TrainingStage] = []
+    # new_rows, cached_rows, r2 and version, as the stages produce them.
+    result: Dict[str, Any] = {}
+    artifact_path: Optional[str] = None
+    error: Optional[str] = None
+
+class HealthStatus(BaseModel):
+    status: str
+    model_version: Optional[str] = None
+    detail: Optional[str] = None
+
 # --- Schemas for Debugging ---
 class UserDebug(User):
     hashed_password: str
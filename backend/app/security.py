@@ -1,11 +1,65 @@
 """
-Handles security-related functions like password hashing and verification.
+Handles security-related functions like password hashing and verification,
+and the signed access tokens issued by the login endpoint.
 """
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
 from passlib.context import CryptContext
 
+from .config import settings
+
 # Use bcrypt for password hashing, which is a standard and secure choice.
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow; running it on a small dedicated pool caps how much
+# CPU login bursts can take from the rest of the API.
+_bcrypt_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
+
+def _server_workers() -> int:
+    """
+    Worker processes the server runs, from WEB_CONCURRENCY or the --workers/-w
+    option of the parent process (uvicorn or gunicorn supervising this worker).
+    """
+    workers = int(os.getenv("WEB_CONCURRENCY") or 1)
+    try:
+        with open(f"/proc/{os.getppid()}/cmdline", "rb") as f:
+            args = f.read().decode(errors="replace").split("\0")
+    except OSError:
+        return workers
+    for i, arg in enumerate(args):
+        if arg.startswith("--workers="):
+            value = arg.split("=", 1)[1]
+        elif arg in ("--workers", "-w") and i + 1 < len(args):
+            value = args[i + 1]
+        else:
+            continue
+        if value.isdigit():
+            workers = max(workers, int(value))
+    return workers
+
+if settings.SECRET_KEY:
+    _secret_key = settings.SECRET_KEY.encode()
+elif _server_workers() > 1:
+    # Each worker would sign with its own random key and reject the others' tokens.
+    raise RuntimeError(
+        "SECRET_KEY is not set but the server runs several workers; set SECRET_KEY so they share one signing key."
+    )
+else:
+    _secret_key = secrets.token_bytes(32)
+    print("WARNING:  SECRET_KEY is not set; access tokens are only valid in this process until it restarts.")
+    print("          Set SECRET_KEY before running more than one worker or any shared deployment.")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifies a plain-text password against a hashed one.
@@ -17,3 +71,101 @@ def get_password_hash(password: str) -> str:
     Hashes a plain-text password.
     """
     return pwd_context.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifies a password on the bounded bcrypt pool without blocking the event loop.
+    """
+    future = _bcrypt_executor.submit(verify_password, plain_password, hashed_password)
+    return await asyncio.wrap_future(future)
+
+# --- Verified-Credential Cache ---
+class CredentialCache:
+    """
+    Remembers recently verified (username, password, hash) triples so the legacy
+    credential parameters do not pay for bcrypt on every call. Only keyed HMAC
+    digests are stored; a password change alters the hash and misses the cache.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, username: str, password: str, hashed_password: str) -> bytes:
+        message = "\0".join((username, password, hashed_password)).encode()
+        return hmac.new(_secret_key, message, hashlib.sha256).digest()
+
+    def _is_cached(self, key: bytes) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(key)
+            return expires_at is not None and expires_at > time.monotonic()
+
+    def _remember(self, key: bytes) -> None:
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    async def verify_async(self, username: str, password: str, hashed_password: str) -> bool:
+        """Checks the password with bcrypt, awaited on the bounded pool, unless it was verified recently."""
+        key = self._key(username, password, hashed_password)
+        if self.enabled and self._is_cached(key):
+            return True
+        if not await verify_password_async(password, hashed_password):
+            return False
+        if self.enabled:
+            self._remember(key)
+        return True
+
+credential_cache = CredentialCache(settings.CREDENTIAL_CACHE_MAX_ENTRIES, settings.CREDENTIAL_CACHE_TTL_SECONDS)
+
+# --- Access Tokens ---
+class InvalidTokenError(ValueError):
+    pass
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+_TOKEN_HEADER = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+
+def create_access_token(username: str, role: str) -> str:
+    """
+    Issues an HS256 JWT carrying the username and role, valid for
+    ACCESS_TOKEN_TTL_SECONDS.
+    """
+    claims = {"sub": username, "role": role, "exp": int(time.time() + settings.ACCESS_TOKEN_TTL_SECONDS)}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    signing_input = f"{_TOKEN_HEADER}.{payload}".encode()
+    signature = _b64encode(hmac.new(_secret_key, signing_input, hashlib.sha256).digest())
+    return f"{_TOKEN_HEADER}.{payload}.{signature}"
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Returns the claims of a valid token. Only the signature and expiry are
+    checked; no database lookup or password hash is involved.
+    Raises InvalidTokenError otherwise.
+    """
+    try:
+        header, payload, signature = token.split(".")
+        signature_bytes = _b64decode(signature)
+    except ValueError as e:
+        raise InvalidTokenError("Malformed token.") from e
+
+    expected = hmac.new(_secret_key, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    if header != _TOKEN_HEADER or not hmac.compare_digest(signature_bytes, expected):
+        raise InvalidTokenError("Invalid token signature.")
+
+    claims = json.loads(_b64decode(payload))
+    if claims.get("exp", 0) < time.time():
+        raise InvalidTokenError("Token has expired.")
+    return claims
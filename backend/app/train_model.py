@@ -1,47 +1,349 @@
-import pandas as pd
-from sqlalchemy import create_engine
+"""
+Training pipeline for the AI price predictor.
+
+Quotation items are streamed out of the database already joined with their
+product features, in chunks through a server-side cursor, and appended to an
+on-disk feature cache as encoded NumPy shards. A high-watermark on
+quotation_items.id records how far the cache reaches, so later runs only read
+rows added since then. A second watermark records how far the last saved model
+reaches, so rows cached by a run that failed before saving are still trained on. Every stage reports its wall time and peak RSS, and
+run_training() can pass stage events to a progress callback (the API's
+background training jobs use it to publish progress).
+
+Run from the backend directory:
+    python -m app.train_model                   # read new rows, refit on the whole cache
+    python -m app.train_model --warm-start 50   # read new rows, add 50 trees to the latest model
+    python -m app.train_model --full            # rebuild the cache from scratch, then refit
+    python -m app.train_model --search          # cross-validated grid search on all cores
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from sqlalchemy import create_engine, text
 from sklearn.model_selection import train_test_split
 # CORRECTED: Import a more robust model
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import r2_score
-import joblib
-import os
 
-# --- Database Connection ---
+from app.feature_encoder import FeatureEncoder, training_feature_columns
+from app.model_registry import ModelRegistry, new_version, save_artifact
+from app.model_search import (
+    DEFAULT_GRID, SearchOptions, print_leaderboard, run_search, select_best, write_leaderboard,
+)
+
+# --- Configuration ---
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://myuser:mypassword@db/erp_crm_db")
-engine = create_engine(DATABASE_URL)
+MODEL_DIR = os.getenv("MODEL_DIR", "app/models")
+LEGACY_MODEL_PATH = os.getenv("LEGACY_MODEL_PATH", "app/ml_model.joblib")
+TRAINING_CACHE_DIR = os.getenv("TRAINING_CACHE_DIR", os.path.join(MODEL_DIR, "training_cache"))
+CHUNK_ROWS = int(os.getenv("TRAINING_CHUNK_ROWS", "50000"))
+
+# The join and projection run in the database; only the model inputs cross the wire.
+TRAINING_QUERY = text("""
+    SELECT qi.id,
+           CAST(qi.width AS DOUBLE PRECISION) AS width,
+           CAST(qi.height AS DOUBLE PRECISION) AS height,
+           qi.quantity,
+           CAST(p.product_type AS TEXT) AS product_type,
+           CAST(p.material AS TEXT) AS material,
+           CAST(qi.price AS DOUBLE PRECISION) AS price
+    FROM quotation_items qi
+    JOIN products p ON p.id = qi.product_id
+    WHERE qi.id > :watermark
+    ORDER BY qi.id
+""")
+
+
+# progress(stage, event, **details), event being "started", "progress"
+# (details: done, total) or "finished" (details: the stage's report entry).
+ProgressCallback = Callable[..., None]
+
+
+# --- Stage Instrumentation ---
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in KB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def stage(name: str, report: List[Dict], progress: Optional[ProgressCallback] = None):
+    """
+    Times a pipeline stage and records the RSS high-water mark reached by its end.
+    Yields a dict for results of the stage (row counts, scores) to add to its entry.
+    """
+    print(f"[{name}] started")
+    if progress is not None:
+        progress(name, "started")
+    start = time.perf_counter()
+    rss_before = _rss_mb()
+    details: Dict = {}
+    yield details
+    entry = {
+        "stage": name,
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "rss_delta_mb": round(_rss_mb() - rss_before, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        **details,
+    }
+    report.append(entry)
+    print(f"[{name}] done in {entry['wall_seconds']}s, peak RSS {entry['peak_rss_mb']} MB")
+    if progress is not None:
+        progress(name, "finished", **{key: value for key, value in entry.items() if key != "stage"})
+
+
+def print_report(report: List[Dict]) -> None:
+    print(f"\n{'stage':<16}{'wall (s)':>10}{'RSS delta (MB)':>16}{'peak RSS (MB)':>15}")
+    for entry in report:
+        print(f"{entry['stage']:<16}{entry['wall_seconds']:>10}{entry['rss_delta_mb']:>16}{entry['peak_rss_mb']:>15}")
+
+
+# --- Feature Cache ---
+class FeatureCache:
+    """
+    Encoded training rows stored as NumPy shards plus a small JSON state file
+    holding the high-watermark of cached rows and that of the last saved model.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.state_path = os.path.join(directory, "state.json")
+        self.state = self._load_state()
+        self._discard_uncommitted()
+
+    def _discard_uncommitted(self) -> None:
+        """Removes shards written by a run that died before committing its watermark."""
+        for path in glob.glob(os.path.join(self.directory, "[Xy]-*.npy")):
+            first_id = int(os.path.basename(path)[2:].split("-")[0])
+            if first_id > self.watermark:
+                os.remove(path)
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state.get("feature_columns") == training_feature_columns():
+                return state
+            print("WARNING:  Feature layout changed since the cache was built; rebuilding it.")
+            shutil.rmtree(self.directory, ignore_errors=True)
+        return {"watermark": 0, "trained_watermark": 0, "n_rows": 0, "feature_columns": training_feature_columns()}
+
+    @property
+    def watermark(self) -> int:
+        return self.state["watermark"]
+
+    @property
+    def trained_watermark(self) -> int:
+        """Highest row id the last saved model was trained on."""
+        return self.state.get("trained_watermark", 0)
+
+    def reset(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.state = self._load_state()
+
+    def append(self, ids: np.ndarray, X: np.ndarray, y: np.ndarray) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        shard = f"{int(ids[0]):012d}-{int(ids[-1]):012d}"
+        np.save(os.path.join(self.directory, f"X-{shard}.npy"), X)
+        np.save(os.path.join(self.directory, f"y-{shard}.npy"), y)
+        self.state["watermark"] = int(ids[-1])
+        self.state["n_rows"] += len(ids)
+
+    def commit(self) -> None:
+        """Persists the watermark only after every shard it covers is on disk."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def load(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All cached rows; shards are memory-mapped and concatenated once."""
+        x_paths = sorted(glob.glob(os.path.join(self.directory, "X-*.npy")))
+        n_features = len(self.state["feature_columns"])
+        if not x_paths:
+            return np.empty((0, n_features)), np.empty(0)
+        X = np.concatenate([np.load(path, mmap_mode="r") for path in x_paths])
+        y = np.concatenate([np.load(path.replace("X-", "y-", 1), mmap_mode="r") for path in x_paths])
+        return X, y
+
+
+# --- Pipeline Stages ---
+def stream_new_rows(engine, cache: FeatureCache, chunk_rows: int,
+                    progress: Optional[ProgressCallback] = None) -> int:
+    """Reads rows above the watermark chunk by chunk and appends them to the cache."""
+    encoder = FeatureEncoder(cache.state["feature_columns"])
+    n_new = 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(
+            TRAINING_QUERY, {"watermark": cache.watermark}
+        )
+        for rows in result.partitions(chunk_rows):
+            ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+            y = np.fromiter((row.price for row in rows), dtype=np.float64, count=len(rows))
+            cache.append(ids, encoder.encode(rows), y)
+            n_new += len(rows)
+            print(f"  cached {n_new} new rows (watermark {cache.watermark})")
+            if progress is not None:
+                progress("load", "progress", done=n_new, total=None)
+    return n_new
+
+
+def latest_sklearn_model() -> Tuple[Optional[GradientBoostingRegressor], List[str]]:
+    """The latest saved model and the feature columns it was trained on."""
+    path = ModelRegistry(MODEL_DIR, LEGACY_MODEL_PATH).latest_artifact()
+    if path is None:
+        return None, []
+    model, feature_cols = joblib.load(path)
+    return model, list(feature_cols)
+
+
+def _fit_monitor(progress: ProgressCallback, model: GradientBoostingRegressor):
+    """A GradientBoostingRegressor.fit monitor reporting each tree added."""
+    def monitor(i, estimator, _locals) -> bool:
+        progress("fit", "progress", done=i + 1, total=model.n_estimators)
+        return False  # never stop early
+    return monitor
+
+
+def run_training(full: bool = False, warm_start: int = 0, chunk_rows: int = CHUNK_ROWS,
+                 search: Optional[SearchOptions] = None,
+                 progress: Optional[ProgressCallback] = None) -> Optional[str]:
+    """
+    Runs the pipeline and returns the saved artifact path, or None when there
+    was nothing new to train on.
+    """
+    if search is not None and warm_start:
+        raise ValueError("A hyperparameter search always fits from scratch; drop --warm-start.")
+    version = new_version()
+    report: List[Dict] = []
+    cache = FeatureCache(TRAINING_CACHE_DIR)
+    if full:
+        cache.reset()
+
+    print("Connecting to the database...")
+    engine = create_engine(DATABASE_URL)
+
+    # --- Data Loading and Preparation ---
+    with stage("load", report, progress) as details:
+        n_new = stream_new_rows(engine, cache, chunk_rows, progress)
+        cache.commit()
+        details.update(new_rows=n_new, cached_rows=cache.state["n_rows"])
+    print(f"Read {n_new} new records; the feature cache now holds {cache.state['n_rows']}.")
+    if cache.watermark == cache.trained_watermark and not full:
+        print("No new quotation items since the last run; the current model is up to date.")
+        print_report(report)
+        return None
+
+    with stage("assemble", report, progress):
+        X, y = cache.load()
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # --- Model Selection ---
+    params: Dict = {}
+    if search is not None:
+        with stage("search", report, progress):
+            results = run_search(X_train, y_train, search.grid, folds=search.folds, workers=search.workers)
+            os.makedirs(MODEL_DIR, exist_ok=True)
+            leaderboard_path = os.path.join(MODEL_DIR, f"leaderboard-{version}.json")
+            write_leaderboard(results, leaderboard_path)
+        print_leaderboard(results)
+        best = select_best(results, search.select_by, search.min_r2, search.max_predict_us)
+        params = best.params
+        print(f"Selected {params} (R² {best.r2_mean:.4f}, {best.predict_us:.1f} us/row); "
+              f"leaderboard saved to {leaderboard_path}")
 
-print("Connecting to the database...")
+    # --- Model Training ---
+    with stage("fit", report, progress):
+        model, model_columns = latest_sklearn_model() if warm_start else (None, [])
+        if model is not None and model_columns != cache.state["feature_columns"]:
+            print("WARNING:  The latest model was trained on different feature columns; fitting from scratch.")
+            model = None
+        if model is not None:
+            print(f"Warm-starting: adding {warm_start} trees to the latest model's {model.n_estimators}.")
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + warm_start)
+        else:
+            print("Training the Gradient Boosting Regressor model...")
+            # CORRECTED: Use the more powerful GradientBoostingRegressor model.
+            # This model is much less likely to produce negative predictions on this type of data.
+            model = GradientBoostingRegressor(random_state=42, **params)
+        model.fit(X_train, y_train, monitor=_fit_monitor(progress, model) if progress else None)
 
-# --- Data Loading and Preparation ---
-items_df = pd.read_sql("SELECT * FROM quotation_items", engine)
-products_df = pd.read_sql("SELECT id, product_type, material FROM products", engine)
+    # --- Model Evaluation ---
+    with stage("evaluate", report, progress) as details:
+        score = r2_score(y_test, model.predict(X_test))
+        details["r2"] = round(float(score), 4)
+    print(f"Model training complete. R-squared score on test data: {score:.2f}")
 
-df = pd.merge(items_df, products_df, left_on='product_id', right_on='id', how='left')
-print(f"Successfully loaded {len(df)} records from the database.")
+    # --- Save the Model ---
+    # Each run writes a new versioned artifact; running backends pick it up automatically.
+    with stage("save", report, progress) as details:
+        artifact = save_artifact(model, cache.state["feature_columns"], MODEL_DIR, version)
+        details["version"] = version
+        # Only now are the cached rows covered by a saved model.
+        cache.state["trained_watermark"] = cache.watermark
+        cache.commit()
+    print(f"Model and feature columns saved to {artifact}")
 
-# --- Feature Engineering ---
-df_encoded = pd.get_dummies(df, columns=['product_type', 'material'])
+    print_report(report)
+    return artifact
 
-y = df_encoded['price']
-X = df_encoded.drop(columns=['price', 'id_x', 'id_y', 'quotation_id', 'product_id'], errors='ignore')
 
-# --- Model Training ---
-print("Training the Gradient Boosting Regressor model...")
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Train the quotation price predictor.")
+    parser.add_argument("--full", action="store_true",
+                        help="discard the feature cache and re-read every quotation item")
+    parser.add_argument("--warm-start", type=int, default=0, metavar="N",
+                        help="add N trees to the latest model instead of refitting from scratch")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="rows fetched per server-side cursor round trip")
 
-# CORRECTED: Use the more powerful GradientBoostingRegressor model.
-# This model is much less likely to produce negative predictions on this type of data.
-model = GradientBoostingRegressor(random_state=42)
-model.fit(X_train, y_train)
+    search_group = parser.add_argument_group("model selection")
+    search_group.add_argument("--search", action="store_true",
+                              help="cross-validate a hyperparameter grid in parallel before fitting")
+    search_group.add_argument("--grid", metavar="JSON",
+                              help="grid as inline JSON or a path to a JSON file "
+                                   f"(default: {json.dumps(DEFAULT_GRID)})")
+    search_group.add_argument("--folds", type=int, default=5)
+    search_group.add_argument("--workers", type=int, default=None,
+                              help="worker processes (default: all cores)")
+    search_group.add_argument("--select-by", choices=["r2", "latency"], default="r2",
+                              help="pick the highest R² or the fastest single-row prediction")
+    search_group.add_argument("--min-r2", type=float, default=None,
+                              help="only consider candidates with at least this mean R²")
+    search_group.add_argument("--max-predict-us", type=float, default=None,
+                              help="only consider candidates at or below this single-row latency")
+    args = parser.parse_args(argv)
 
-# --- Model Evaluation ---
-y_pred = model.predict(X_test)
-score = r2_score(y_test, y_pred)
-print(f"Model training complete. R-squared score on test data: {score:.2f}")
+    search = None
+    if args.search:
+        grid = DEFAULT_GRID
+        if args.grid:
+            if os.path.exists(args.grid):
+                with open(args.grid) as f:
+                    grid = json.load(f)
+            else:
+                grid = json.loads(args.grid)
+        search = SearchOptions(grid=grid, folds=args.folds, workers=args.workers, select_by=args.select_by,
+                               min_r2=args.min_r2, max_predict_us=args.max_predict_us)
 
-# --- Save the Model ---
-joblib.dump((model, X_train.columns), 'app/ml_model.joblib')
-print(f"Model and feature columns saved to app/ml_model.joblib")
+    run_training(full=args.full, warm_start=args.warm_start, chunk_rows=args.chunk_rows, search=search)
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Background retraining jobs started from the API.
+
+Each job runs app.train_model in its own Python process, with its niceness
+raised by TRAINING_JOB_NICE, so fitting gets whatever CPU the API workers
+leave over instead of competing with them (or blocking an event loop). The
+job's state is a JSON file in TRAINING_JOB_DIR that the training process
+rewrites atomically as it moves through the pipeline stages, so every worker
+reports the same progress.
+
+One job runs at a time across all workers: the worker starting a job takes an
+exclusive flock on TRAINING_JOB_DIR/train.lock and hands the locked file to
+the training process, which holds it until it exits. A job still marked
+queued or running while nobody holds the lock has died, and is reported as
+failed.
+
+The training side of a job runs as:
+    python -m app.training_jobs <job file> [--nice N]
+"""
+import argparse
+import fcntl
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import traceback
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+ACTIVE = (QUEUED, RUNNING)
+LOCK_FILE = "train.lock"
+JOB_ID = re.compile(r"\d{8}T\d{6}Z-[0-9a-f]{6}")
+
+
+class TrainingJobRunning(Exception):
+    """A job was requested while another one holds the training lock."""
+
+    def __init__(self, job: Optional[Dict]):
+        super().__init__("A training job is already running.")
+        self.job = job
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _read_job(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_job(path: str, job: Dict) -> None:
+    """Replaces the job file in one step, so readers never see a partial one."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(job, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# --- API side ---
+class TrainingJobManager:
+    def __init__(self, job_dir: str, env: Dict[str, str], nice: int = 10, max_jobs: int = 50):
+        """
+        `env` is added to the training process's environment; it carries the
+        settings app.train_model reads (DATABASE_URL, MODEL_DIR, ...).
+        """
+        self.job_dir = job_dir
+        self.env = env
+        self.nice = nice
+        self.max_jobs = max_jobs
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _try_lock(self) -> Optional[int]:
+        """A descriptor holding the training lock, or None while a job holds it."""
+        os.makedirs(self.job_dir, exist_ok=True)
+        fd = os.open(os.path.join(self.job_dir, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def start(self, full: bool = False, warm_start: int = 0) -> Tuple[Dict, subprocess.Popen]:
+        """
+        Queues a job and starts its training process. Raises TrainingJobRunning
+        while another job is in progress.
+        """
+        fd = self._try_lock()
+        if fd is None:
+            raise TrainingJobRunning(self.current())
+        try:
+            self._prune()
+            job_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:6]}"
+            job = {
+                "id": job_id, "status": QUEUED, "full": full, "warm_start": warm_start,
+                "created_at": _now(), "started_at": None, "finished_at": None, "pid": None,
+                "stage": None, "stages": [], "result": {}, "artifact_path": None, "error": None,
+            }
+            path = self._path(job_id)
+            _write_job(path, job)
+            try:
+                with open(os.path.join(self.job_dir, f"{job_id}.log"), "wb") as log:
+                    # A session of its own keeps Ctrl+C on the server from killing a run halfway.
+                    process = subprocess.Popen(
+                        [sys.executable, "-m", "app.training_jobs", path, "--nice", str(self.nice)],
+                        env={**os.environ, **self.env}, stdout=log, stderr=subprocess.STDOUT,
+                        pass_fds=(fd,), start_new_session=True,
+                    )
+            except OSError as e:
+                job.update(status=FAILED, finished_at=_now(), error=f"Could not start training: {e}")
+                _write_job(path, job)
+                raise
+        finally:
+            # The training process has its own reference to the lock now.
+            os.close(fd)
+        print(f"INFO:     Training job {job_id} started (pid {process.pid}).")
+        return job, process
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        if not JOB_ID.fullmatch(job_id):
+            return None
+        path = self._path(job_id)
+        job = _read_job(path)
+        if job is None or job["status"] not in ACTIVE:
+            return job
+        fd = self._try_lock()
+        if fd is None:
+            return job
+        try:
+            # Re-read: the process writes its final state before releasing the lock.
+            job = _read_job(path)
+            if job is not None and job["status"] in ACTIVE:
+                job.update(status=FAILED, finished_at=_now(),
+                           error="The training process exited unexpectedly; see its log.")
+                for entry in job["stages"]:
+                    if entry["status"] == RUNNING:
+                        entry.update(status=FAILED, finished_at=job["finished_at"])
+                _write_job(path, job)
+        finally:
+            os.close(fd)
+        return job
+
+    def _job_ids(self) -> List[str]:
+        """Newest first; ids sort by creation time."""
+        names = (os.path.basename(path)[:-len(".json")] for path in glob.glob(os.path.join(self.job_dir, "*.json")))
+        return sorted((name for name in names if JOB_ID.fullmatch(name)), reverse=True)
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        jobs = (self.get(job_id) for job_id in self._job_ids()[:limit])
+        return [job for job in jobs if job is not None]
+
+    def current(self) -> Optional[Dict]:
+        """The job in progress, if any."""
+        for job_id in self._job_ids():
+            job = self.get(job_id)
+            if job is not None and job["status"] in ACTIVE:
+                return job
+        return None
+
+    def _prune(self) -> None:
+        for job_id in self._job_ids()[self.max_jobs - 1:]:
+            for suffix in (".json", ".log"):
+                try:
+                    os.remove(os.path.join(self.job_dir, job_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+# --- Training side ---
+class JobRecorder:
+    """Publishes a running job's stages to its file; passed to run_training as `progress`."""
+
+    def __init__(self, path: str, job: Dict, min_interval_seconds: float = 0.5):
+        self.path = path
+        self.job = job
+        # In-stage progress (rows read, trees built) is written at most this often.
+        self.min_interval_seconds = min_interval_seconds
+        self._written_at = 0.0
+
+    def update(self, **fields) -> None:
+        self.job.update(fields)
+        self._write()
+
+    def _write(self) -> None:
+        _write_job(self.path, self.job)
+        self._written_at = time.monotonic()
+
+    def __call__(self, stage: str, event: str, **details) -> None:
+        stages = self.job["stages"]
+        if event == "started":
+            stages.append({"name": stage, "status": RUNNING, "started_at": _now(), "finished_at": None,
+                           "wall_seconds": None, "peak_rss_mb": None, "done": None, "total": None})
+            self.job["stage"] = stage
+            self._write()
+        elif event == "progress":
+            stages[-1].update(done=details["done"], total=details["total"])
+            if time.monotonic() - self._written_at >= self.min_interval_seconds:
+                self._write()
+        elif event == "finished":
+            stages[-1].update(status="done", finished_at=_now(), wall_seconds=details.pop("wall_seconds"),
+                              peak_rss_mb=details.pop("peak_rss_mb"))
+            details.pop("rss_delta_mb", None)
+            self.job["result"].update(details)
+            self._write()
+
+    def fail(self, error: str) -> None:
+        for entry in self.job["stages"]:
+            if entry["status"] == RUNNING:
+                entry.update(status=FAILED, finished_at=_now())
+        self.update(status=FAILED, finished_at=_now(), error=error)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run one queued training job.")
+    parser.add_argument("job_file")
+    parser.add_argument("--nice", type=int, default=10, help="niceness added to this process")
+    args = parser.parse_args(argv)
+
+    os.nice(args.nice)
+    job = _read_job(args.job_file)
+    recorder = JobRecorder(args.job_file, job)
+    recorder.update(status=RUNNING, pid=os.getpid(), started_at=_now())
+    try:
+        # Imported here so the job shows as running while sklearn loads.
+        from app.train_model import run_training
+
+        artifact = run_training(full=job["full"], warm_start=job["warm_start"], progress=recorder)
+    except BaseException as e:
+        traceback.print_exc()
+        recorder.fail(f"{type(e).__name__}: {e}")
+        return 1
+    recorder.update(status=SUCCEEDED, finished_at=_now(), stage=None, artifact_path=artifact)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Flattened, array-based evaluator for gradient boosted regression trees.
+A trained scikit-learn GradientBoostingRegressor is exported once into plain
+NumPy arrays, and predictions are computed by walking every tree over the
+whole batch at the same time, with no scikit-learn code on the request path.
+"""
+from typing import Any, Dict
+
+import numpy as np
+
+# Marker sklearn uses for "no child" in tree_.children_left/right.
+_SKLEARN_LEAF = -1
+
+
+class TreeEnsemble:
+    """
+    All trees of a boosted ensemble packed into flat node arrays.
+
+    Node `i` of tree `t` lives at index `tree_offsets[t] + i`. Child pointers
+    are global indices, and every leaf points back to itself, so a batch can
+    advance through all trees in lockstep for `max_depth` steps.
+    """
+
+    # Rows are evaluated in chunks so the (rows x trees) node matrix stays cache sized.
+    CHUNK_ROWS = 1024
+
+    def __init__(self, feature, threshold, children_left, children_right, value,
+                 tree_offsets, baseline: float, learning_rate: float, max_depth: int,
+                 n_features: int, children=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.tree_offsets = tree_offsets
+        self.baseline = float(baseline)
+        self.learning_rate = float(learning_rate)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        # Interleaved [left, right] pairs so one gather picks the next node. Saved
+        # artifacts carry it precomputed, so memory-mapped arrays are used as is.
+        if children is None:
+            children = np.stack([children_left, children_right], axis=1).ravel().astype(np.int32)
+        self._children = children
+        self._roots = np.asarray(tree_offsets, dtype=np.int32)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.tree_offsets)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "TreeEnsemble":
+        """
+        Exports a fitted single-output GradientBoostingRegressor.
+        """
+        if not hasattr(model, "estimators_"):
+            raise TypeError("Only fitted GradientBoostingRegressor models can be exported.")
+        if model.estimators_.shape[1] != 1:
+            raise TypeError("Only single-output regression ensembles can be exported.")
+
+        n_features = model.n_features_in_
+        if model.init_ == "zero":
+            baseline = 0.0
+        else:
+            # The default init estimator predicts a constant (the training mean).
+            probe = np.zeros((2, n_features))
+            init_pred = np.ravel(model.init_.predict(probe))
+            if init_pred[0] != init_pred[1]:
+                raise TypeError("Only constant init estimators can be exported.")
+            baseline = float(init_pred[0])
+
+        features, thresholds, lefts, rights, values, offsets = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_[:, 0]:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.int32)
+            is_leaf = tree.children_left == _SKLEARN_LEAF
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+            lefts.append((np.where(is_leaf, node_ids, tree.children_left) + offset).astype(np.int32))
+            rights.append((np.where(is_leaf, node_ids, tree.children_right) + offset).astype(np.int32))
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+            offsets.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children_left=np.concatenate(lefts),
+            children_right=np.concatenate(rights),
+            value=np.concatenate(values),
+            tree_offsets=np.asarray(offsets, dtype=np.int32),
+            baseline=baseline,
+            learning_rate=model.learning_rate,
+            max_depth=max_depth,
+            n_features=n_features,
+        )
+
+    def to_arrays(self) -> Dict[str, Any]:
+        """Returns the exported arrays and scalars, e.g. for np.savez."""
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children_left": self.children_left,
+            "children_right": self.children_right,
+            "value": self.value,
+            "tree_offsets": self.tree_offsets,
+            "children": self._children,
+            "baseline": self.baseline,
+            "learning_rate": self.learning_rate,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+        }
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predicts a batch of rows shaped (n_rows, n_features).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n_rows, {self.n_features}), got {X.shape}.")
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        # so that values sitting exactly on a split go down the same branch.
+        X = X.astype(np.float32).astype(np.float64)
+
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], self.CHUNK_ROWS):
+            chunk = X[start:start + self.CHUNK_ROWS]
+            out[start:start + len(chunk)] = self._predict_chunk(chunk)
+        return out
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        n_rows = X.shape[0]
+        flat_X = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.intp) * self.n_features)[:, None]
+        nodes = np.broadcast_to(self._roots, (n_rows, self.n_trees))
+        for _ in range(self.max_depth):
+            x = flat_X.take(row_base + self.feature.take(nodes))
+            go_right = x > self.threshold.take(nodes)
+            nodes = self._children.take(2 * nodes + go_right)
+        return self.baseline + self.learning_rate * self.value.take(nodes).sum(axis=1)
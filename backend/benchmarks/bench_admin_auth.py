@@ -0,0 +1,166 @@
+"""
+Load test for the admin endpoints: GET /users/ throughput per way of authenticating.
+
+Starts the API with uvicorn against DATABASE_URL (a scratch database; a
+temporary admin user is created and removed again) and drives it from
+concurrent keep-alive clients for a fixed duration per scenario:
+
+  credentials, no cache  - the old behaviour: bcrypt on every request
+  credentials, cached    - deprecated parameters through the credential cache
+  bearer token           - token from /auth/login, signature check only
+
+Run from the backend directory:
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.bench_admin_auth
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from typing import Dict, List, Optional
+
+from app import database, security
+
+BENCH_USERNAME = "bench_admin"
+BENCH_PASSWORD = "bench-password"
+ADMIN_ROLE = "Human Resources Head"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, extra_env: Dict[str, str]) -> subprocess.Popen:
+    env = dict(os.environ, SECRET_KEY="bench-secret", MODEL_WATCH_INTERVAL_SECONDS="0", **extra_env)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start within 30s")
+
+
+def login(port: int) -> str:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("POST", "/auth/login", json.dumps({"username": BENCH_USERNAME, "password": BENCH_PASSWORD}),
+                 {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    body = json.loads(response.read())
+    conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"Login failed: {body}")
+    return body["access_token"]
+
+
+def run_load(port: int, path: str, headers: Dict[str, str], clients: int, seconds: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        local, failed = [], 0
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            local.append(time.perf_counter() - start)
+            failed += response.status != 200
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / seconds,
+        "p50_ms": latencies[len(latencies) // 2] * 1e3 if latencies else 0.0,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1e3 if latencies else 0.0,
+    }
+
+
+def scenario(label: str, extra_env: Dict[str, str], use_token: bool, clients: int, seconds: float) -> None:
+    port = free_port()
+    server = start_server(port, extra_env)
+    try:
+        headers: Dict[str, str] = {}
+        path = "/users/"
+        if use_token:
+            headers["Authorization"] = f"Bearer {login(port)}"
+        else:
+            path += "?" + urllib.parse.urlencode({"admin_username": BENCH_USERNAME, "admin_password": BENCH_PASSWORD})
+        run_load(port, path, headers, clients, min(seconds, 1.0))  # warm-up
+        stats = run_load(port, path, headers, clients, seconds)
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"{label:<24}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>10.1f}"
+          f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}")
+
+
+def create_bench_user() -> Optional[int]:
+    database.Base.metadata.create_all(bind=database.engine, tables=[database.User.__table__])
+    with database.SessionLocal() as db:
+        if db.query(database.User).filter(database.User.username == BENCH_USERNAME).first():
+            return None
+        user = database.User(username=BENCH_USERNAME, hashed_password=security.get_password_hash(BENCH_PASSWORD),
+                             role=ADMIN_ROLE)
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+def delete_bench_user(user_id: int) -> None:
+    with database.SessionLocal() as db:
+        db.query(database.User).filter(database.User.id == user_id).delete()
+        db.commit()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent keep-alive clients.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Measured duration per scenario.")
+    args = parser.parse_args(argv)
+
+    user_id = create_bench_user()
+    try:
+        print(f"GET /users/ with {args.clients} concurrent clients, {args.seconds:.0f}s per scenario\n")
+        print(f"{'scenario':<24}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+        # Without the cache every request hashes; give bcrypt every core, as the old handlers had.
+        scenario("credentials, no cache", {"CREDENTIAL_CACHE_TTL_SECONDS": "0",
+                                           "BCRYPT_MAX_WORKERS": str(os.cpu_count() or 1)},
+                 False, args.clients, args.seconds)
+        scenario("credentials, cached", {}, False, args.clients, args.seconds)
+        scenario("bearer token", {}, True, args.clients, args.seconds)
+    finally:
+        if user_id is not None:
+            delete_bench_user(user_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
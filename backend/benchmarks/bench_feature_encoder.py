@@ -0,0 +1,85 @@
+"""
+Parity check and latency benchmark for the precompiled feature encoder.
+Compares app.feature_encoder.FeatureEncoder with the original per-request
+pandas path (get_dummies + reindex) on every ProductType/Material combination.
+
+Run from the backend directory:
+    python -m benchmarks.bench_feature_encoder
+"""
+import itertools
+import sys
+import timeit
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app import schemas
+from app.feature_encoder import FeatureEncoder
+
+MODEL_PATH = "app/ml_model.joblib"
+
+
+def pandas_encode(rows, feature_cols) -> pd.DataFrame:
+    """
+    The encoding path predict_quote used before the precompiled encoder.
+    Enum fields are dumped as plain strings so the dummy column names match the
+    training columns on every Python version (3.11+ formats str enums by name).
+    """
+    input_df = pd.DataFrame([row.model_dump(mode="json") for row in rows])
+    input_encoded = pd.get_dummies(input_df)
+    return input_encoded.reindex(columns=list(feature_cols), fill_value=0)
+
+
+def all_combinations():
+    for product_type, material in itertools.product(schemas.ProductType, schemas.Material):
+        for width, height, quantity in [(0.5, 0.5, 1), (1.2, 1.5, 2), (4.9, 2.9, 20)]:
+            yield schemas.QuotePredictionRequest(
+                width=width, height=height, quantity=quantity,
+                product_type=product_type, material=material,
+            )
+
+
+def check_parity(encoder: FeatureEncoder, feature_cols) -> bool:
+    rows = list(all_combinations())
+    ok = True
+    for row in rows:
+        expected = pandas_encode([row], feature_cols).to_numpy(dtype=np.float64)
+        actual = encoder.encode([row])
+        if not np.array_equal(expected, actual):
+            print(f"MISMATCH for {row!r}:\n  pandas:  {expected}\n  encoder: {actual}")
+            ok = False
+    # Encoding a mixed batch must match row-by-row encoding too.
+    if not np.array_equal(pandas_encode(rows, feature_cols).to_numpy(dtype=np.float64), encoder.encode(rows)):
+        print("MISMATCH for the mixed batch of all combinations")
+        ok = False
+    print(f"Parity: {'OK' if ok else 'FAILED'} ({len(rows)} rows, {len(feature_cols)} columns)")
+    return ok
+
+
+def bench(label: str, fn, number: int) -> None:
+    per_call = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"{label:<40} {per_call * 1e6:>12.1f} us/call")
+
+
+def main() -> int:
+    _, feature_cols = joblib.load(MODEL_PATH)
+    encoder = FeatureEncoder(feature_cols)
+
+    if not check_parity(encoder, feature_cols):
+        return 1
+
+    single = [next(all_combinations())]
+    batch = list(itertools.islice(itertools.cycle(all_combinations()), 1000))
+    buffer = np.empty((len(batch), encoder.n_features))
+
+    bench("pandas get_dummies/reindex, 1 row", lambda: pandas_encode(single, feature_cols), 200)
+    bench("FeatureEncoder, 1 row", lambda: encoder.encode(single), 20000)
+    bench("pandas get_dummies/reindex, 1000 rows", lambda: pandas_encode(batch, feature_cols), 20)
+    bench("FeatureEncoder, 1000 rows", lambda: encoder.encode(batch), 200)
+    bench("FeatureEncoder, 1000 rows, preallocated", lambda: encoder.encode(batch, out=buffer), 200)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
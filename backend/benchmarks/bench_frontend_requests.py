@@ -0,0 +1,138 @@
+"""
+Backend requests and TCP connections caused by one Streamlit user session.
+
+Starts the API with uvicorn against DATABASE_URL (a scratch database;
+customers and quotations are only generated into empty tables) and drives
+frontend/app.py headlessly with streamlit.testing's AppTest through a
+scripted session: open the app, look a customer up by ID, open and save the
+edit form, page the customer list forwards and back, fetch a quotation
+history twice, switch to and run a name search and ask for a price
+prediction. Every step is
+one script rerun, as a click is in the browser.
+
+Requests are counted by the API itself (http_requests_total on /metrics, less
+the /metrics scrapes); connections are the TCP connects made by urllib3 in
+this process. Several sessions run one after another in the same process, as
+browser sessions share one Streamlit server, so later sessions show the
+shared read cache.
+
+Needs the frontend requirements (streamlit) installed. To measure an older
+app.py, point --app at a copy of it.
+
+Run from the backend directory:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.bench_frontend_requests
+"""
+import argparse
+import http.client
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+import urllib3.connection
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.bench_response_cache import free_port, seed, start_server
+
+APP_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "app.py")
+
+
+def backend_requests(port: int) -> int:
+    """Requests the API has answered so far, not counting /metrics itself."""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", "/metrics")
+    body = conn.getresponse().read().decode()
+    conn.close()
+    return sum(int(float(count)) for route, count in
+               re.findall(r'^http_requests_total\{[^}]*route="([^"]*)"[^}]*\} (\S+)$', body, re.MULTILINE)
+               if route != "/metrics")
+
+
+def _button(at: AppTest, label: str):
+    return next(button for button in at.button if button.label == label)
+
+
+def session_steps(customer_id: int) -> List[Tuple[str, Callable[[AppTest], None]]]:
+    def search_by_id(at):
+        at.number_input(key="search_id_input").set_value(customer_id)
+        _button(at, "Search by ID").click()
+
+    def find_to_edit(at):
+        at.number_input(key="update_id_input").set_value(customer_id)
+        _button(at, "Find Customer to Edit").click()
+
+    def fetch_history(at):
+        at.number_input(key="history_customer_id").set_value(customer_id)
+        _button(at, "Fetch Quotation History").click()
+
+    def search_by_name(at):
+        at.text_input(key="search_name_input").set_value("Customer 1")
+        _button(at, "Search by Name").click()
+
+    return [
+        ("open the app", lambda at: None),
+        ("search by ID", search_by_id),
+        ("find customer to edit", find_to_edit),
+        ("save the edit form", lambda at: _button(at, "Save Changes").click()),
+        ("next customer page", lambda at: at.button(key="customers_next_page").click()),
+        ("previous customer page", lambda at: at.button(key="customers_prev_page").click()),
+        ("fetch quotation history", fetch_history),
+        ("fetch it again", lambda at: _button(at, "Fetch Quotation History").click()),
+        ("switch to name search", lambda at: at.radio(key="search_method").set_value("Full Name")),
+        ("search by name", search_by_name),
+        ("predict a price", lambda at: _button(at, "Predict Price").click()),
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", default=APP_PATH, help="Streamlit script to drive.")
+    parser.add_argument("--sessions", type=int, default=3, help="User sessions to run one after another.")
+    args = parser.parse_args(argv)
+
+    connects = [0]
+    connect = urllib3.connection.HTTPConnection.connect
+
+    def counting_connect(self):
+        connects[0] += 1
+        return connect(self)
+
+    urllib3.connection.HTTPConnection.connect = counting_connect
+
+    # `streamlit run` puts the script's directory on sys.path; AppTest does not.
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.app)))
+    customer_ids = seed()
+    port = free_port()
+    os.environ["BACKEND_URL"] = f"http://127.0.0.1:{port}"
+    server = start_server(port, {})
+    try:
+        print(f"Driving {os.path.relpath(args.app)} against {os.environ['BACKEND_URL']}\n")
+        print(f"{'session':<9}{'step':<26}{'requests':>10}{'connects':>10}{'rerun (ms)':>12}")
+        totals: List[Dict[str, float]] = []
+        for number in range(1, args.sessions + 1):
+            at = AppTest.from_file(args.app, default_timeout=60)
+            requests_before, connects_before = backend_requests(port), connects[0]
+            for label, step in session_steps(customer_ids[0]):
+                before, connected = backend_requests(port), connects[0]
+                step(at)
+                start = time.perf_counter()
+                at.run()
+                elapsed = time.perf_counter() - start
+                if at.exception:
+                    raise RuntimeError(f"{label}: {at.exception[0].message}")
+                print(f"{number:<9}{label:<26}{backend_requests(port) - before:>10}"
+                      f"{connects[0] - connected:>10}{elapsed * 1e3:>12.0f}")
+            totals.append({"requests": backend_requests(port) - requests_before,
+                           "connects": connects[0] - connects_before})
+        print()
+        for number, total in enumerate(totals, 1):
+            print(f"session {number}: {total['requests']} backend requests over {total['connects']} connection(s)")
+    finally:
+        server.terminate()
+        server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
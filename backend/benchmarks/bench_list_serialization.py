@@ -0,0 +1,119 @@
+"""
+Rows per second served by the list endpoints, with the response cache off.
+
+Drives the app in-process (httpx ASGI transport, one client) so only query,
+row handling and JSON encoding are measured:
+
+  customers    GET /customers/?limit=N from a random cursor position
+  users        GET /users/ (every user, with an admin token)
+  quotations   GET /customers/{id}/quotations/?limit=N, quotations with items
+
+DATABASE_URL should be a scratch database filled by benchmarks.datagen; this
+script tops it up to --rows users and adds one customer with --rows
+quotations (3 items each) the first time, so every page is full.
+
+Run from the backend directory:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.bench_list_serialization
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import sys
+import time
+from typing import Dict
+
+import httpx
+from sqlalchemy import func, insert, select
+
+from app import database, security
+from app.config import settings
+from app.pagination import encode_cursor
+
+HISTORY_EMAIL = "list.bench@example.com"
+
+
+def seed(rows: int) -> Dict[str, int]:
+    """Users up to `rows`, plus a customer with `rows` quotations; returns the ids to query."""
+    with database.SessionLocal() as db:
+        users = db.scalar(select(func.count(database.User.id)))
+        if users < rows:
+            db.execute(insert(database.User), [
+                {"username": f"list_bench_{i}", "hashed_password": "-", "role": "Sales"}
+                for i in range(users, rows)
+            ])
+        customer_id = db.scalar(select(database.Customer.id).where(database.Customer.email == HISTORY_EMAIL))
+        if customer_id is None:
+            customer = database.Customer(full_name="List Bench", email=HISTORY_EMAIL, phone_number="07000000000")
+            db.add(customer)
+            db.flush()
+            customer_id = customer.id
+            user_id = db.scalar(select(func.min(database.User.id)))
+            product_id = db.scalar(select(func.min(database.Product.id)))
+            epoch = datetime.datetime(2024, 1, 1)
+            quotation_ids = db.scalars(insert(database.Quotation).returning(database.Quotation.id), [
+                {"customer_id": customer_id, "user_id": user_id, "status": "Sent", "total_price": 900.0,
+                 "created_at": epoch + datetime.timedelta(minutes=i)}
+                for i in range(rows)
+            ]).all()
+            db.execute(insert(database.QuotationItem), [
+                {"quotation_id": quotation_id, "product_id": product_id, "width": 1.2, "height": 1.5,
+                 "quantity": 1 + i, "price": 300.0}
+                for quotation_id in quotation_ids for i in range(3)
+            ])
+        db.commit()
+        return {"customer_id": customer_id, "max_customer_id": db.scalar(select(func.max(database.Customer.id)))}
+
+
+async def run(args, ids: Dict[str, int]) -> None:
+    settings.RESPONSE_CACHE_MAX_ENTRIES = 0
+    settings.MODEL_WATCH_INTERVAL_SECONDS = 0
+    from app.main import app
+
+    token = security.create_access_token("list_bench", "Human Resources Head")
+    rng = random.Random(42)
+
+    def customers_path() -> str:
+        start = rng.randrange(max(ids["max_customer_id"] - args.rows, 1))
+        return f"/customers/?limit={args.rows}&cursor={encode_cursor([start])}"
+
+    scenarios = (
+        ("customers", customers_path),
+        ("users", lambda: "/users/"),
+        ("quotations", lambda: f"/customers/{ids['customer_id']}/quotations/?limit={args.rows}"),
+    )
+    print(f"{'endpoint':<12}{'requests':>10}{'rows/req':>10}{'req/s':>9}{'rows/s':>11}{'p50 (ms)':>10}")
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60,
+                                     headers={"Authorization": f"Bearer {token}"}) as client:
+            for name, path in scenarios:
+                await client.get(path())  # warm-up
+                latencies, rows = [], 0
+                stop_at = time.perf_counter() + args.seconds
+                while time.perf_counter() < stop_at:
+                    start = time.perf_counter()
+                    response = await client.get(path())
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                    rows += len(response.json())
+                elapsed = sum(latencies)
+                latencies.sort()
+                print(f"{name:<12}{len(latencies):>10}{rows / len(latencies):>10.0f}{len(latencies) / elapsed:>9.1f}"
+                      f"{rows / elapsed:>11.0f}{latencies[len(latencies) // 2] * 1e3:>10.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per page (the endpoints allow up to 1000).")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Measured duration per endpoint.")
+    args = parser.parse_args(argv)
+
+    ids = seed(args.rows)
+    print(f"{args.rows} rows per page, {args.seconds:.0f}s per endpoint, on {database.engine.dialect.name}\n")
+    asyncio.run(run(args, ids))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+SQL statements per page of a customer's quotation history, for customers
+with 1, 10, 100 and 1000 quotations.
+
+Adds one customer per history size to DATABASE_URL (a scratch database; the
+customers are only added once), then pages through
+
+  quotations   GET /customers/{id}/quotations/         expected 2 per page
+  summary      GET /customers/{id}/quotations/summary  expected 1 per page
+
+in-process (httpx ASGI transport) with the response cache off, counting
+statements with a before_cursor_execute listener on the API's engine. The
+exit status is 1 when any page runs a different number of statements, i.e.
+when the count grows with the history instead of staying constant.
+
+Run from the backend directory:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.bench_quotation_history_queries
+"""
+import argparse
+import asyncio
+import datetime
+import sys
+from typing import Dict, List
+
+import httpx
+from sqlalchemy import event, func, insert, select
+
+from app import database
+from app.config import settings
+from app.pagination import NEXT_CURSOR_HEADER
+
+HISTORY_SIZES = (1, 10, 100, 1000)
+ITEMS_PER_QUOTATION = 3
+EXPECTED_STATEMENTS = {"quotations": 2, "summary": 1}
+
+
+def seed(sizes: List[int]) -> Dict[int, int]:
+    """Customer id by history size, adding the customers that are missing."""
+    database.Base.metadata.create_all(bind=database.engine)
+    customer_ids = {}
+    with database.SessionLocal() as db:
+        user_id = db.scalar(select(func.min(database.User.id)))
+        product_id = db.scalar(select(func.min(database.Product.id)))
+        if user_id is None:
+            user = database.User(username="history_queries", hashed_password="-", role="Sales")
+            db.add(user)
+            db.flush()
+            user_id = user.id
+        if product_id is None:
+            product = database.Product(name="History Queries Door", product_type="Door", material="uPVC",
+                                       base_price=250.0)
+            db.add(product)
+            db.flush()
+            product_id = product.id
+        epoch = datetime.datetime(2024, 1, 1)
+        for size in sizes:
+            email = f"history.queries.{size}@example.com"
+            customer_id = db.scalar(select(database.Customer.id).where(database.Customer.email == email))
+            if customer_id is None:
+                customer = database.Customer(full_name=f"History Queries {size}", email=email,
+                                             phone_number="07000000000")
+                db.add(customer)
+                db.flush()
+                customer_id = customer.id
+                quotation_ids = db.scalars(insert(database.Quotation).returning(database.Quotation.id), [
+                    {"customer_id": customer_id, "user_id": user_id, "status": "Sent", "total_price": 750.0,
+                     "created_at": epoch + datetime.timedelta(hours=i)}
+                    for i in range(size)
+                ]).all()
+                db.execute(insert(database.QuotationItem), [
+                    {"quotation_id": quotation_id, "product_id": product_id, "width": 1.0, "height": 2.0,
+                     "quantity": 1 + i, "price": 250.0}
+                    for quotation_id in quotation_ids for i in range(ITEMS_PER_QUOTATION)
+                ])
+            customer_ids[size] = customer_id
+        db.commit()
+    return customer_ids
+
+
+async def run(customer_ids: Dict[int, int], limit: int) -> List[str]:
+    settings.RESPONSE_CACHE_MAX_ENTRIES = 0
+    settings.MODEL_WATCH_INTERVAL_SECONDS = 0
+    from app.main import app
+
+    statements = [0]
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", count)
+    failures = []
+    print(f"{'quotations':>10}  {'endpoint':<12}{'pages':>7}{'rows':>7}{'stmts/page':>12}")
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for size, customer_id in customer_ids.items():
+                for name, path in (("quotations", f"/customers/{customer_id}/quotations/"),
+                                   ("summary", f"/customers/{customer_id}/quotations/summary")):
+                    per_page, rows, cursor = [], 0, None
+                    while True:
+                        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+                        statements[0] = 0
+                        response = await client.get(path, params=params)
+                        response.raise_for_status()
+                        per_page.append(statements[0])
+                        rows += len(response.json())
+                        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+                        if cursor is None:
+                            break
+                    counts = sorted(set(per_page))
+                    print(f"{size:>10}  {name:<12}{len(per_page):>7}{rows:>7}"
+                          f"{'/'.join(map(str, counts)):>12}")
+                    if rows != size:
+                        failures.append(f"{name} returned {rows} of {size} quotations")
+                    if counts != [EXPECTED_STATEMENTS[name]]:
+                        failures.append(f"{name} ran {counts} statements per page for {size} quotations, "
+                                        f"expected {EXPECTED_STATEMENTS[name]}")
+    event.remove(database.async_engine.sync_engine, "before_cursor_execute", count)
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, default=100, help="Page size requested.")
+    args = parser.parse_args(argv)
+
+    customer_ids = seed(list(HISTORY_SIZES))
+    print(f"Pages of {args.limit} on {database.engine.dialect.name}\n")
+    failures = asyncio.run(run(customer_ids, args.limit))
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Payload and render cost of the Streamlit quotation history tab for a customer
+with a long history.
+
+Adds one customer with --quotations quotations of 1-7 items each to
+DATABASE_URL (a scratch database; the customer is only added once), starts
+the API with uvicorn and drives frontend/app.py headlessly with AppTest:
+fetch the customer's history, then, where the app offers them, open one
+quotation's items and go to the next page. For each step it reports the
+bytes downloaded from the API, the elements Streamlit had to draw
+(expanders and dataframes) and the script run time.
+
+Needs the frontend requirements (streamlit) installed. To measure an older
+app.py, point --app at a copy of it.
+
+Run from the backend directory:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.bench_quotation_history_view
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import requests
+from sqlalchemy import insert, select
+from streamlit.testing.v1 import AppTest
+
+from app import database
+from benchmarks.bench_frontend_requests import APP_PATH, _button
+from benchmarks.bench_response_cache import free_port, start_server
+
+CUSTOMER_EMAIL = "history.bench@example.com"
+
+
+def seed_history(quotations: int) -> int:
+    """Id of the bench customer, adding it and its quotations if missing."""
+    database.Base.metadata.create_all(bind=database.engine)
+    with database.SessionLocal() as db:
+        customer_id = db.scalar(select(database.Customer.id).where(database.Customer.email == CUSTOMER_EMAIL))
+        if customer_id is not None:
+            return customer_id
+        rng = random.Random(42)
+        customer = database.Customer(full_name="History Bench", email=CUSTOMER_EMAIL, phone_number="07000000000")
+        user = database.User(username="history_bench", hashed_password="-", role="Sales")
+        product = database.Product(name="History Bench Window", product_type="Window", material="uPVC", base_price=180.0)
+        db.add_all([customer, user, product])
+        db.flush()
+        epoch = datetime.datetime(2023, 1, 1)
+        quotation_ids = db.scalars(insert(database.Quotation).returning(database.Quotation.id), [
+            {"customer_id": customer.id, "user_id": user.id, "status": "Sent", "total_price": 900.0,
+             "created_at": epoch + datetime.timedelta(hours=i)}
+            for i in range(quotations)
+        ]).all()
+        db.execute(insert(database.QuotationItem), [
+            {"quotation_id": quotation_id, "product_id": product.id, "width": 1.2, "height": 1.5,
+             "quantity": 1, "price": 300.0}
+            for quotation_id in quotation_ids for _ in range(rng.randint(1, 7))
+        ])
+        db.commit()
+        return customer.id
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", default=APP_PATH, help="Streamlit script to drive.")
+    parser.add_argument("--quotations", type=int, default=5_000, help="Quotations of the bench customer.")
+    args = parser.parse_args(argv)
+
+    downloaded = [0]
+    send = requests.Session.send
+
+    def counting_send(self, request, **kwargs):
+        response = send(self, request, **kwargs)
+        downloaded[0] += len(response.content)
+        return response
+
+    requests.Session.send = counting_send
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.app)))
+    customer_id = seed_history(args.quotations)
+    port = free_port()
+    os.environ["BACKEND_URL"] = f"http://127.0.0.1:{port}"
+    server = start_server(port, {})
+    try:
+        at = AppTest.from_file(args.app, default_timeout=120)
+        at.run()
+
+        def fetch(at):
+            at.number_input(key="history_customer_id").set_value(customer_id)
+            _button(at, "Fetch Quotation History").click()
+
+        def open_items(at):
+            box = next((box for box in at.selectbox if box.label == "Show the items of quotation"), None)
+            if box is None:
+                return False
+            box.set_value(int(box.options[0]))
+            return True
+
+        def next_page(at):
+            buttons = [button for button in at.button if button.key == "quotations_next_page"]
+            if not buttons:
+                return False
+            buttons[0].click()
+            return True
+
+        print(f"Driving {os.path.relpath(args.app)}; customer {customer_id} has {args.quotations:,} quotations\n")
+        print(f"{'step':<22}{'downloaded (KiB)':>18}{'expanders':>11}{'dataframes':>12}{'run (ms)':>10}")
+        for label, step in (("fetch history", fetch), ("open one quotation", open_items), ("next page", next_page)):
+            if step(at) is False:
+                print(f"{label:<22}{'(not offered)':>18}")
+                continue
+            before = downloaded[0]
+            start = time.perf_counter()
+            at.run()
+            elapsed = time.perf_counter() - start
+            if at.exception:
+                raise RuntimeError(f"{label}: {at.exception[0].message}")
+            print(f"{label:<22}{(downloaded[0] - before) / 1024:>18.1f}{len(at.expander):>11}"
+                  f"{len(at.dataframe):>12}{elapsed * 1e3:>10.0f}")
+    finally:
+        server.terminate()
+        server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Request latency while the model retrains in the background.
+
+Starts the API with uvicorn, then sends a steady stream of single-row
+POST /predict_quote (random inputs) and GET /customers/{id} (random ids)
+requests, one at a time, with the prediction and response caches off:
+
+  idle       for --seconds, no training running
+  training   after POST /model/train, until the job finishes
+
+and reports p50/p95/max latency per endpoint and phase. It then checks that
+the job succeeded, that the server now serves the version it wrote, and that
+the p95 of both endpoints during training stayed within --budget-ms; the exit
+status is 1 otherwise, so the script doubles as a regression check.
+
+Models and the feature cache go to a temporary MODEL_DIR, so every run reads
+all quotation items. DATABASE_URL should be a scratch database filled by
+benchmarks.datagen, large enough that training takes a while. --nice 0 runs
+the training process at the workers' priority for comparison.
+
+Run from the backend directory:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.bench_training_isolation
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Tokens signed here must verify in the server started below.
+os.environ.setdefault("SECRET_KEY", "training-bench")
+
+import requests  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app import database, security  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.schemas import Material, ProductType  # noqa: E402
+from benchmarks.bench_response_cache import free_port, start_server  # noqa: E402
+
+
+def _percentile(latencies: List[float], fraction: float) -> float:
+    return sorted(latencies)[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1e3
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0, help="Length of the idle phase.")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="Highest p95 latency allowed for either endpoint while training.")
+    parser.add_argument("--nice", type=int, default=settings.TRAINING_JOB_NICE,
+                        help="Niceness of the training process.")
+    args = parser.parse_args(argv)
+
+    with database.SessionLocal() as db:
+        max_customer_id = db.scalar(select(func.max(database.Customer.id)))
+        items = db.scalar(select(func.count(database.QuotationItem.id)))
+    token = security.create_access_token("training_bench", "Human Resources Head")
+    rng = random.Random(42)
+
+    model_dir = tempfile.mkdtemp(prefix="training-bench-")
+    port = free_port()
+    server = start_server(port, {
+        "MODEL_DIR": model_dir,
+        "TRAINING_JOB_DIR": os.path.join(model_dir, "jobs"),
+        "TRAINING_JOB_NICE": str(args.nice),
+        "PREDICTION_CACHE_MAX_ENTRIES": "0",
+        "RESPONSE_CACHE_MAX_ENTRIES": "0",
+    })
+    base = f"http://127.0.0.1:{port}"
+    session = requests.Session()
+    try:
+        while not session.get(f"{base}/readyz").ok:
+            time.sleep(0.2)
+        served_before = session.get(f"{base}/model/status").json()["version"]
+
+        def predict() -> requests.Response:
+            return session.post(f"{base}/predict_quote", json={
+                "width": round(rng.uniform(0.5, 3.0), 2), "height": round(rng.uniform(0.5, 2.5), 2),
+                "quantity": rng.randint(1, 10), "product_type": rng.choice(list(ProductType)).value,
+                "material": rng.choice(list(Material)).value,
+            })
+
+        def read_customer() -> requests.Response:
+            return session.get(f"{base}/customers/{rng.randint(1, max_customer_id)}")
+
+        def measure(until) -> Dict[str, List[float]]:
+            latencies: Dict[str, List[float]] = {"predict_quote": [], "read_customer": []}
+            while not until():
+                for name, send in (("predict_quote", predict), ("read_customer", read_customer)):
+                    start = time.perf_counter()
+                    response = send()
+                    latencies[name].append(time.perf_counter() - start)
+                    if response.status_code not in (200, 404):
+                        raise RuntimeError(f"{name}: {response.status_code} {response.text}")
+            return latencies
+
+        print(f"{items:,} quotation items on {database.engine.dialect.name}; training at nice {args.nice}, "
+              f"p95 budget {args.budget_ms:.0f} ms\n")
+        idle_until = time.monotonic() + args.seconds
+        phases = {"idle": measure(lambda: time.monotonic() > idle_until)}
+
+        response = session.post(f"{base}/model/train", json={"full": True},
+                                headers={"Authorization": f"Bearer {token}"})
+        response.raise_for_status()
+        job = response.json()
+        polled_at = [0.0]
+
+        def job_done() -> bool:
+            if time.monotonic() - polled_at[0] < 1.0:
+                return False
+            polled_at[0] = time.monotonic()
+            job.update(session.get(f"{base}/model/train/jobs/{job['id']}").json())
+            return job["status"] not in ("queued", "running")
+
+        started = time.monotonic()
+        phases["training"] = measure(job_done)
+        elapsed = time.monotonic() - started
+        # The worker swaps models within a second of the job finishing.
+        time.sleep(1.5)
+        served_after = session.get(f"{base}/model/status").json()["version"]
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{'phase':<10}{'endpoint':<16}{'requests':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'max (ms)':>10}")
+    for phase, latencies in phases.items():
+        for name, values in latencies.items():
+            print(f"{phase:<10}{name:<16}{len(values):>10}{_percentile(values, 0.5):>10.2f}"
+                  f"{_percentile(values, 0.95):>10.2f}{max(values) * 1e3:>10.2f}")
+
+    print(f"\nJob {job['id']} {job['status']} in {elapsed:.1f}s; stages: "
+          + ", ".join(f"{entry['name']} {entry['wall_seconds']}s" for entry in job["stages"]))
+    print(f"Served model: {served_before} before, {served_after} after (job wrote {job['result'].get('version')})")
+
+    failures = []
+    if job["status"] != "succeeded":
+        failures.append(f"training job {job['status']}: {job['error']}")
+    elif served_after != job["result"].get("version"):
+        failures.append("the server did not switch to the new model")
+    for name, values in phases["training"].items():
+        if _percentile(values, 0.95) > args.budget_ms:
+            failures.append(f"{name} p95 {_percentile(values, 0.95):.1f} ms exceeds {args.budget_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
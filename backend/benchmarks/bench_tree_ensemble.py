@@ -0,0 +1,60 @@
+"""
+Parity check and latency benchmark for the flattened tree evaluator.
+Compares app.tree_ensemble.TreeEnsemble with the scikit-learn model it was
+exported from, for a single row and for a 10k-row batch.
+
+Run from the backend directory:
+    python -m benchmarks.bench_tree_ensemble
+"""
+import sys
+import timeit
+
+import joblib
+import numpy as np
+
+from app.tree_ensemble import TreeEnsemble
+
+MODEL_PATH = "app/ml_model.joblib"
+
+
+def random_inputs(n_rows: int, n_features: int, seed: int = 0) -> np.ndarray:
+    """Rows in the ranges the Streamlit form allows, with random one-hot flags."""
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_rows, n_features))
+    X[:, 0] = np.round(rng.uniform(0.5, 5.0, n_rows), 1)
+    X[:, 1] = np.round(rng.uniform(0.5, 3.0, n_rows), 1)
+    X[:, 2] = rng.integers(1, 21, n_rows)
+    X[:, 3:] = rng.integers(0, 2, (n_rows, n_features - 3))
+    return X
+
+
+def bench(label: str, fn, number: int) -> None:
+    per_call = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"{label:<40} {per_call * 1e6:>12.1f} us/call")
+
+
+def main() -> int:
+    model, feature_cols = joblib.load(MODEL_PATH)
+    ensemble = TreeEnsemble.from_sklearn(model)
+    print(f"Exported {ensemble.n_trees} trees, {len(ensemble.value)} nodes, max depth {ensemble.max_depth}")
+
+    single = random_inputs(1, len(feature_cols))
+    batch = random_inputs(10000, len(feature_cols), seed=1)
+
+    expected = model.predict(batch)
+    actual = ensemble.predict(batch)
+    max_error = float(np.max(np.abs(expected - actual)))
+    ok = np.allclose(expected, actual, rtol=1e-9, atol=1e-6)
+    print(f"Parity: {'OK' if ok else 'FAILED'} (max abs error {max_error:.3g} over {len(batch)} rows)")
+    if not ok:
+        return 1
+
+    bench("sklearn predict, 1 row", lambda: model.predict(single), 500)
+    bench("TreeEnsemble predict, 1 row", lambda: ensemble.predict(single), 5000)
+    bench("sklearn predict, 10k rows", lambda: model.predict(batch), 10)
+    bench("TreeEnsemble predict, 10k rows", lambda: ensemble.predict(batch), 10)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
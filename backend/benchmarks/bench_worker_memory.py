@@ -0,0 +1,146 @@
+"""
+Per-worker memory of the API with pickled and memory-mapped model serving.
+
+Trains a deliberately large GradientBoostingRegressor on synthetic quotation
+features (--trees trees of depth --depth) into a temporary MODEL_DIR, then
+starts `uvicorn --workers N` for each N in --workers, twice:
+
+  unpickled  - MODEL_MEMORY_MAP=false: every worker unpickles the .joblib
+               artifact and keeps its own copy of the trees
+  mmap       - every worker maps the .trees export read-only, so the trees
+               sit once in the page cache for all of them
+
+Once every worker reports the model as loaded (GET /model/status), each
+worker's memory is read from /proc:
+  RSS      - resident pages, counting shared pages in full for every worker
+  PSS      - resident pages with shared ones split between the processes
+             mapping them; summed over workers, the memory they really cost
+  private  - pages no other process uses
+
+Linux only (/proc/<pid>/smaps_rollup). DATABASE_URL must be set but is not
+queried.
+
+Run from the backend directory:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.bench_worker_memory
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+from app.feature_encoder import training_feature_columns
+from app.model_registry import save_artifact, served_path
+from benchmarks.bench_response_cache import free_port
+
+
+def train_large_model(model_dir: str, trees: int, depth: int, rows: int) -> str:
+    columns = training_feature_columns()
+    rng = np.random.default_rng(42)
+    X = rng.random((rows, len(columns)))
+    y = X @ rng.random(len(columns)) * 1000 + rng.normal(0, 10, rows)
+    model = GradientBoostingRegressor(n_estimators=trees, max_depth=depth, random_state=42).fit(X, y)
+    return save_artifact(model, columns, model_dir)
+
+
+def _get_json(port: int, path: str) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def wait_for_loaded_workers(port: int, workers: int, timeout: float) -> List[int]:
+    """Polls /model/status on fresh connections until `workers` distinct pids report a loaded model."""
+    loaded = set()
+    deadline = time.monotonic() + timeout
+    while len(loaded) < workers and time.monotonic() < deadline:
+        try:
+            status = _get_json(port, "/model/status")
+            if status["loaded"]:
+                loaded.add(status["worker_pid"])
+        except (OSError, ValueError):
+            time.sleep(0.2)
+    if len(loaded) < workers:
+        raise RuntimeError(f"Only {len(loaded)} of {workers} workers loaded the model within {timeout:.0f}s")
+    return sorted(loaded)
+
+
+def memory_kib(pid: int) -> Dict[str, int]:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss": values["Rss"], "pss": values["Pss"],
+            "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def measure(workers: int, extra_env: Dict[str, str], timeout: float) -> Dict[str, float]:
+    port = free_port()
+    env = dict(os.environ, MODEL_WATCH_INTERVAL_SECONDS="0", **extra_env)
+    env.setdefault("SECRET_KEY", "worker-memory-bench")  # required with several workers
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        pids = wait_for_loaded_workers(port, workers, timeout)
+        ready = time.perf_counter() - start
+        usage = [memory_kib(pid) for pid in pids]
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "ready_s": ready,
+        "rss_mib": sum(u["rss"] for u in usage) / len(usage) / 1024,
+        "pss_mib": sum(u["pss"] for u in usage) / len(usage) / 1024,
+        "private_mib": sum(u["private"] for u in usage) / len(usage) / 1024,
+        "total_pss_mib": sum(u["pss"] for u in usage) / 1024,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--trees", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=20_000, help="Synthetic training rows.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for all workers.")
+    args = parser.parse_args(argv)
+
+    model_dir = tempfile.mkdtemp(prefix="bench-models-")
+    try:
+        start = time.perf_counter()
+        artifact = train_large_model(model_dir, args.trees, args.depth, args.rows)
+        served_bytes = sum(entry.stat().st_size for entry in os.scandir(served_path(artifact)))
+        print(f"Model: {args.trees} trees of depth {args.depth}, trained in {time.perf_counter() - start:.0f}s; "
+              f".joblib {os.path.getsize(artifact) / 2**20:.1f} MiB, .trees {served_bytes / 2**20:.1f} MiB\n")
+        print(f"{'serving':<11}{'workers':>8}{'ready (s)':>11}{'RSS/worker':>12}{'PSS/worker':>12}"
+              f"{'private/worker':>16}{'total PSS':>11}   (MiB)")
+        common = {"MODEL_DIR": model_dir, "LEGACY_MODEL_PATH": ""}
+        for workers in args.workers:
+            for label, extra_env in (("unpickled", {"MODEL_MEMORY_MAP": "false"}), ("mmap", {})):
+                stats = measure(workers, dict(common, **extra_env), args.timeout)
+                print(f"{label:<11}{workers:>8}{stats['ready_s']:>11.1f}{stats['rss_mib']:>12.1f}"
+                      f"{stats['pss_mib']:>12.1f}{stats['private_mib']:>16.1f}{stats['total_pss_mib']:>11.1f}")
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+Benchmark suite for the API's hot paths, with JSON results for comparing commits.
+
+Each scenario runs closed-loop for --seconds with --concurrency clients:
+
+  predict_single      POST /predict_quote with a random form input
+  predict_batch       POST /predict_quote/batch with --batch-size random inputs
+  customer_create     POST /customers/ (adds customers named "Suite <run> <n>")
+  customer_read       GET /customers/{id} for a random customer
+  customer_update     PUT /customers/{id} with a new phone number
+  customer_list       GET /customers/?limit=100 from a random cursor position
+  customer_paginate   the first page of GET /customers/ and the next four via X-Next-Cursor
+  quotation_history   GET /customers/{id}/quotations/ (quotations with their items)
+  quotation_summary   GET /customers/{id}/quotations/summary
+
+By default the app is driven in-process through httpx's ASGI transport, with
+its startup and shutdown hooks, so only the application and database are
+measured. Clients and app share one event loop there, which makes the numbers
+a per-core figure. With --url a running server (e.g. uvicorn) is driven over
+HTTP instead. Both modes read the customer id range from DATABASE_URL, so fill
+it first with benchmarks.datagen; customer_create and customer_update write
+to it.
+
+The results file records throughput, error count and p50/p95/p99 latency per
+scenario, plus the commit, database size and settings of the run. Pass an
+earlier results file to --compare to print the change per scenario.
+
+Run from the backend directory:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.datagen --scale 10k --reset
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.suite --output before.json
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.suite --url http://127.0.0.1:8000 --compare before.json
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import func, select
+
+from app import database
+from app.config import settings
+from app.pagination import encode_cursor
+
+PRODUCT_TYPES = ("Window", "Door")
+MATERIALS = ("uPVC", "Aluminium", "Timber")
+PAGINATE_PAGES = 5
+
+
+class SuiteContext:
+    """What scenarios need to build requests: the customer id range and a per-run tag."""
+
+    def __init__(self, first_customer: int, last_customer: int, batch_size: int):
+        self.first_customer = first_customer
+        self.last_customer = last_customer
+        self.batch_size = batch_size
+        self.run_tag = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        self.created = 0
+
+    def customer_id(self, rng: random.Random) -> int:
+        return rng.randint(self.first_customer, self.last_customer)
+
+
+# --- Scenarios ---
+# Each takes (client, context, rng), makes one operation's requests and returns
+# the last response; any response other than 2xx counts as an error.
+Scenario = Callable[[httpx.AsyncClient, SuiteContext, random.Random], Awaitable[httpx.Response]]
+
+
+def _prediction_input(rng: random.Random) -> dict:
+    return {
+        "width": round(rng.uniform(0.5, 3.0), 1), "height": round(rng.uniform(0.5, 2.5), 1),
+        "quantity": rng.randint(1, 6), "product_type": rng.choice(PRODUCT_TYPES), "material": rng.choice(MATERIALS),
+    }
+
+
+async def predict_single(client, context, rng):
+    return await client.post("/predict_quote", json=_prediction_input(rng))
+
+
+async def predict_batch(client, context, rng):
+    items = [_prediction_input(rng) for _ in range(context.batch_size)]
+    return await client.post("/predict_quote/batch", json={"items": items})
+
+
+async def customer_create(client, context, rng):
+    context.created += 1
+    n = context.created
+    return await client.post("/customers/", json={
+        "full_name": f"Suite {context.run_tag} {n}", "email": f"suite-{context.run_tag}-{n}@example.com",
+        "phone_number": f"07{rng.randrange(10 ** 9):09d}", "address": f"{n} Suite Street",
+    })
+
+
+async def customer_read(client, context, rng):
+    return await client.get(f"/customers/{context.customer_id(rng)}")
+
+
+async def customer_update(client, context, rng):
+    return await client.put(f"/customers/{context.customer_id(rng)}",
+                            json={"phone_number": f"07{rng.randrange(10 ** 9):09d}"})
+
+
+async def customer_list(client, context, rng):
+    cursor = encode_cursor([context.customer_id(rng)])
+    return await client.get("/customers/", params={"limit": 100, "cursor": cursor})
+
+
+async def customer_paginate(client, context, rng):
+    response = await client.get("/customers/", params={"limit": 100})
+    for _ in range(PAGINATE_PAGES - 1):
+        cursor = response.headers.get("X-Next-Cursor")
+        if response.is_error or not cursor:
+            break
+        response = await client.get("/customers/", params={"limit": 100, "cursor": cursor})
+    return response
+
+
+async def quotation_history(client, context, rng):
+    return await client.get(f"/customers/{context.customer_id(rng)}/quotations/")
+
+
+async def quotation_summary(client, context, rng):
+    return await client.get(f"/customers/{context.customer_id(rng)}/quotations/summary")
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.__name__: scenario for scenario in (
+        predict_single, predict_batch, customer_create, customer_read, customer_update,
+        customer_list, customer_paginate, quotation_history, quotation_summary,
+    )
+}
+NEEDS_MODEL = {"predict_single", "predict_batch"}
+
+
+# --- Measurement ---
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, context: SuiteContext,
+                       concurrency: int, seconds: float, seed: int) -> dict:
+    latencies: List[float] = []
+    errors = [0]
+    stop_at = time.monotonic() + seconds
+
+    async def worker(worker_seed: int) -> None:
+        rng = random.Random(worker_seed)
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, context, rng)
+                failed = response.is_error
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(seed * 1000 + i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "operations": len(latencies),
+        "errors": errors[0],
+        "throughput_ops": len(latencies) / elapsed,
+        "mean_ms": sum(latencies) / len(latencies) * 1e3 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p95_ms": percentile(latencies, 0.95) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+    }
+
+
+def dataset_info() -> dict:
+    with database.engine.connect() as conn:
+        first, last, customers = conn.execute(select(
+            func.min(database.Customer.id), func.max(database.Customer.id), func.count(database.Customer.id),
+        )).one()
+        return {
+            "dialect": conn.dialect.name,
+            "customers": customers,
+            "quotations": conn.scalar(select(func.count(database.Quotation.id))),
+            "quotation_items": conn.scalar(select(func.count(database.QuotationItem.id))),
+            "first_customer_id": first,
+            "last_customer_id": last,
+        }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+
+
+@contextlib.asynccontextmanager
+async def open_client(url: Optional[str], concurrency: int):
+    """An httpx client for a running server at `url`, or for the app in this process."""
+    timeout = httpx.Timeout(30.0)
+    if url:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+            yield client
+        return
+    from app.main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://suite", timeout=timeout) as client:
+            yield client
+
+
+async def wait_for_model(client: httpx.AsyncClient, timeout: float) -> bool:
+    """Polls /readyz until the model is loaded; False if it is unavailable or still loading after `timeout`."""
+    deadline = time.monotonic() + timeout
+    while True:
+        response = await client.get("/readyz")
+        if response.status_code == 200:
+            return True
+        if response.json().get("status") != "loading" or time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.2)
+
+
+async def run_suite(args, dataset: dict) -> Dict[str, dict]:
+    context = SuiteContext(dataset["first_customer_id"], dataset["last_customer_id"], args.batch_size)
+    results: Dict[str, dict] = {}
+    async with open_client(args.url, args.concurrency) as client:
+        # The model loads in the background after startup.
+        model_ready = None
+        for index, name in enumerate(args.scenarios):
+            if name in NEEDS_MODEL and model_ready is None:
+                model_ready = await wait_for_model(client, args.model_timeout)
+            if name in NEEDS_MODEL and not model_ready:
+                results[name] = {"skipped": "model not loaded"}
+                print(f"{name:<20}skipped: the API has no model loaded")
+                continue
+            if args.warmup:
+                await run_scenario(client, SCENARIOS[name], context, args.concurrency, args.warmup, args.seed + index)
+            stats = await run_scenario(client, SCENARIOS[name], context, args.concurrency, args.seconds,
+                                       args.seed + index)
+            results[name] = stats
+            print(f"{name:<20}{stats['operations']:>10}{stats['errors']:>8}{stats['throughput_ops']:>10.1f}"
+                  f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    return results
+
+
+def print_comparison(baseline: dict, results: Dict[str, dict]) -> None:
+    print(f"\nChange against {baseline['meta'].get('commit') or 'baseline'} "
+          f"({baseline['meta'].get('timestamp', '?')})")
+    print(f"{'scenario':<20}{'ops/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "-"
+
+    for name, stats in results.items():
+        old = baseline["scenarios"].get(name)
+        if not old or "skipped" in old or "skipped" in stats:
+            continue
+        print(f"{name:<20}{change(stats['throughput_ops'], old['throughput_ops']):>10}"
+              f"{change(stats['p50_ms'], old['p50_ms']):>10}{change(stats['p95_ms'], old['p95_ms']):>10}"
+              f"{change(stats['p99_ms'], old['p99_ms']):>10}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server; the app runs in-process when omitted.")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients per scenario.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Measured duration per scenario.")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds before each scenario.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Inputs per predict_batch request.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model-timeout", type=float, default=120.0,
+                        help="Seconds to wait for the model to load before skipping the prediction scenarios.")
+    parser.add_argument("--output", help="Results file (default: suite-<commit>-<time>.json).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args(argv)
+
+    dataset = dataset_info()
+    if not dataset["customers"]:
+        print("ERROR:    DATABASE_URL has no customers; fill it with `python -m benchmarks.datagen` first.")
+        return 1
+    meta = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "seconds": args.seconds,
+        "batch_size": args.batch_size,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "dataset": dataset,
+        "settings": {name: getattr(settings, name) for name in (
+            "DB_POOL_SIZE", "DB_MAX_OVERFLOW", "RESPONSE_CACHE_MAX_ENTRIES", "PREDICTION_CACHE_MAX_ENTRIES",
+            "METRICS_ENABLED",
+        )},
+    }
+    print(f"{meta['target']} on {dataset['dialect']} ({dataset['customers']:,} customers, "
+          f"{dataset['quotation_items']:,} quotation items), {args.concurrency} clients, "
+          f"{args.seconds:.0f}s per scenario\n")
+    print(f"{'scenario':<20}{'ops':>10}{'errors':>8}{'ops/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}")
+    results = asyncio.run(run_suite(args, dataset))
+
+    output = args.output or f"suite-{meta['commit'] or 'nogit'}-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "scenarios": results}, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
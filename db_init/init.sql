@@ -1,4 +1,5 @@
 -- Drop everything for a clean reset, handling dependencies with CASCADE
+DROP TABLE IF EXISTS Sales_Rollup_Monthly CASCADE;
 DROP TABLE IF EXISTS Quotation_Items CASCADE;
 DROP TABLE IF EXISTS Quotations CASCADE;
 DROP TABLE IF EXISTS Products CASCADE;
@@ -29,6 +30,12 @@ CREATE TABLE Customers (
     address TEXT
 );
 
+-- Trigram indexes for case-insensitive partial search on customers (GET /customers/search)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_customers_full_name_trgm ON Customers USING gin (full_name gin_trgm_ops);
+CREATE INDEX idx_customers_email_trgm ON Customers USING gin (email gin_trgm_ops);
+CREATE INDEX idx_customers_phone_number_trgm ON Customers USING gin (phone_number gin_trgm_ops);
+
 CREATE TABLE Products (
     id SERIAL PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
@@ -43,9 +50,13 @@ CREATE TABLE Quotations (
     user_id INTEGER NOT NULL REFERENCES Users(id),
     total_price NUMERIC(10, 2),
     status VARCHAR(20) NOT NULL DEFAULT 'Draft',
-    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
+-- A customer's quotation history is read in (created_at, id) order, one page at a time.
+CREATE INDEX idx_quotations_customer_id_created_at ON Quotations (customer_id, created_at, id);
+CREATE INDEX idx_quotations_user_id ON Quotations (user_id);
+
 CREATE TABLE Quotation_Items (
     id SERIAL PRIMARY KEY,
     quotation_id INTEGER NOT NULL REFERENCES Quotations(id),
@@ -56,6 +67,129 @@ CREATE TABLE Quotation_Items (
     price NUMERIC(10, 2) NOT NULL
 );
 
+CREATE INDEX idx_quotation_items_quotation_id ON Quotation_Items (quotation_id);
+CREATE INDEX idx_quotation_items_product_id ON Quotation_Items (product_id);
+
+-- Monthly sales rollup behind GET /analytics/sales, kept current by triggers
+CREATE TABLE Sales_Rollup_Monthly (
+    month DATE NOT NULL,
+    user_id INTEGER NOT NULL,
+    product_type VARCHAR(20) NOT NULL,
+    material VARCHAR(20) NOT NULL,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    units BIGINT NOT NULL DEFAULT 0,
+    line_items BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, user_id, product_type, material)
+);
+
+-- Statement-level triggers: a multi-row INSERT of quotation items costs one
+-- aggregate and one upsert per statement, not one per row. Signed sums are
+-- added to each (month, salesperson, product type, material) key and keys left
+-- without items are dropped. Months are UTC.
+CREATE OR REPLACE FUNCTION sales_rollup_items_changed() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO Sales_Rollup_Monthly AS r (month, user_id, product_type, material, revenue, units, line_items)
+        SELECT date_trunc('month', q.created_at AT TIME ZONE 'UTC')::date, q.user_id,
+               p.product_type::text, p.material::text, -SUM(i.price), -SUM(i.quantity), -COUNT(*)
+        FROM old_items AS i JOIN Quotations AS q ON q.id = i.quotation_id JOIN Products AS p ON p.id = i.product_id
+        WHERE q.created_at IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (month, user_id, product_type, material) DO UPDATE SET
+            revenue = r.revenue + EXCLUDED.revenue,
+            units = r.units + EXCLUDED.units,
+            line_items = r.line_items + EXCLUDED.line_items;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO Sales_Rollup_Monthly AS r (month, user_id, product_type, material, revenue, units, line_items)
+        SELECT date_trunc('month', q.created_at AT TIME ZONE 'UTC')::date, q.user_id,
+               p.product_type::text, p.material::text, SUM(i.price), SUM(i.quantity), COUNT(*)
+        FROM new_items AS i JOIN Quotations AS q ON q.id = i.quotation_id JOIN Products AS p ON p.id = i.product_id
+        WHERE q.created_at IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (month, user_id, product_type, material) DO UPDATE SET
+            revenue = r.revenue + EXCLUDED.revenue,
+            units = r.units + EXCLUDED.units,
+            line_items = r.line_items + EXCLUDED.line_items;
+    END IF;
+    DELETE FROM Sales_Rollup_Monthly WHERE line_items = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Moves the items of quotations whose salesperson or date changed.
+CREATE OR REPLACE FUNCTION sales_rollup_quotations_changed() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO Sales_Rollup_Monthly AS r (month, user_id, product_type, material, revenue, units, line_items)
+    SELECT date_trunc('month', changed.created_at AT TIME ZONE 'UTC')::date, changed.user_id,
+           p.product_type::text, p.material::text,
+           SUM(changed.sign * i.price), SUM(changed.sign * i.quantity), SUM(changed.sign)
+    FROM (
+        SELECT o.id, o.user_id, o.created_at, -1 AS sign
+        FROM old_quotations AS o JOIN new_quotations AS n ON n.id = o.id
+        WHERE (o.user_id, o.created_at) IS DISTINCT FROM (n.user_id, n.created_at)
+        UNION ALL
+        SELECT n.id, n.user_id, n.created_at, 1
+        FROM old_quotations AS o JOIN new_quotations AS n ON n.id = o.id
+        WHERE (o.user_id, o.created_at) IS DISTINCT FROM (n.user_id, n.created_at)
+    ) AS changed
+    JOIN Quotation_Items AS i ON i.quotation_id = changed.id JOIN Products AS p ON p.id = i.product_id
+    WHERE changed.created_at IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (month, user_id, product_type, material) DO UPDATE SET
+        revenue = r.revenue + EXCLUDED.revenue,
+        units = r.units + EXCLUDED.units,
+        line_items = r.line_items + EXCLUDED.line_items;
+    DELETE FROM Sales_Rollup_Monthly WHERE line_items = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Moves the items of products whose type or material changed.
+CREATE OR REPLACE FUNCTION sales_rollup_products_changed() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO Sales_Rollup_Monthly AS r (month, user_id, product_type, material, revenue, units, line_items)
+    SELECT date_trunc('month', q.created_at AT TIME ZONE 'UTC')::date, q.user_id,
+           changed.product_type::text, changed.material::text,
+           SUM(changed.sign * i.price), SUM(changed.sign * i.quantity), SUM(changed.sign)
+    FROM (
+        SELECT o.id, o.product_type, o.material, -1 AS sign
+        FROM old_products AS o JOIN new_products AS n ON n.id = o.id
+        WHERE (o.product_type, o.material) IS DISTINCT FROM (n.product_type, n.material)
+        UNION ALL
+        SELECT n.id, n.product_type, n.material, 1
+        FROM old_products AS o JOIN new_products AS n ON n.id = o.id
+        WHERE (o.product_type, o.material) IS DISTINCT FROM (n.product_type, n.material)
+    ) AS changed
+    JOIN Quotation_Items AS i ON i.product_id = changed.id JOIN Quotations AS q ON q.id = i.quotation_id
+    WHERE q.created_at IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (month, user_id, product_type, material) DO UPDATE SET
+        revenue = r.revenue + EXCLUDED.revenue,
+        units = r.units + EXCLUDED.units,
+        line_items = r.line_items + EXCLUDED.line_items;
+    DELETE FROM Sales_Rollup_Monthly WHERE line_items = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger, hence three triggers on items.
+CREATE TRIGGER sales_rollup_items_insert AFTER INSERT ON Quotation_Items
+    REFERENCING NEW TABLE AS new_items
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_items_changed();
+CREATE TRIGGER sales_rollup_items_update AFTER UPDATE ON Quotation_Items
+    REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_items_changed();
+CREATE TRIGGER sales_rollup_items_delete AFTER DELETE ON Quotation_Items
+    REFERENCING OLD TABLE AS old_items
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_items_changed();
+CREATE TRIGGER sales_rollup_quotations_update AFTER UPDATE ON Quotations
+    REFERENCING OLD TABLE AS old_quotations NEW TABLE AS new_quotations
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_quotations_changed();
+CREATE TRIGGER sales_rollup_products_update AFTER UPDATE ON Products
+    REFERENCING OLD TABLE AS old_products NEW TABLE AS new_products
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_products_changed();
+
 -- Seed the tables with rich data
 -- Passwords: hr_password, manager_password, regional_password, sales_password, worker_password
 INSERT INTO Users (username, hashed_password, role) VALUES
@@ -0,0 +1,9 @@
+-- Trigram indexes behind GET /customers/search.
+-- db_init/init.sql only runs when the database volume is first created; apply
+-- this to an existing database with:
+--   docker-compose exec -T db psql -U myuser -d erp_crm_db < db_migrations/001_customer_search_trgm.sql
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_customers_full_name_trgm ON Customers USING gin (full_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_customers_email_trgm ON Customers USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_customers_phone_number_trgm ON Customers USING gin (phone_number gin_trgm_ops);
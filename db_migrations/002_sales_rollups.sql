@@ -0,0 +1,144 @@
+-- Monthly sales rollup behind GET /analytics/sales, kept current by triggers.
+-- db_init/init.sql only runs when the database volume is first created; apply
+-- this to an existing database with:
+--   docker-compose exec -T db psql -U myuser -d erp_crm_db < db_migrations/002_sales_rollups.sql
+BEGIN;
+
+-- No quotation, item or product may change between the backfill and the triggers taking over.
+LOCK TABLE Quotation_Items, Quotations, Products IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE TABLE IF NOT EXISTS Sales_Rollup_Monthly (
+    month DATE NOT NULL,
+    user_id INTEGER NOT NULL,
+    product_type VARCHAR(20) NOT NULL,
+    material VARCHAR(20) NOT NULL,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    units BIGINT NOT NULL DEFAULT 0,
+    line_items BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, user_id, product_type, material)
+);
+
+-- Statement-level triggers: a multi-row INSERT of quotation items costs one
+-- aggregate and one upsert per statement, not one per row. Signed sums are
+-- added to each (month, salesperson, product type, material) key and keys left
+-- without items are dropped. Months are UTC.
+CREATE OR REPLACE FUNCTION sales_rollup_items_changed() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO Sales_Rollup_Monthly AS r (month, user_id, product_type, material, revenue, units, line_items)
+        SELECT date_trunc('month', q.created_at AT TIME ZONE 'UTC')::date, q.user_id,
+               p.product_type::text, p.material::text, -SUM(i.price), -SUM(i.quantity), -COUNT(*)
+        FROM old_items AS i JOIN Quotations AS q ON q.id = i.quotation_id JOIN Products AS p ON p.id = i.product_id
+        WHERE q.created_at IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (month, user_id, product_type, material) DO UPDATE SET
+            revenue = r.revenue + EXCLUDED.revenue,
+            units = r.units + EXCLUDED.units,
+            line_items = r.line_items + EXCLUDED.line_items;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO Sales_Rollup_Monthly AS r (month, user_id, product_type, material, revenue, units, line_items)
+        SELECT date_trunc('month', q.created_at AT TIME ZONE 'UTC')::date, q.user_id,
+               p.product_type::text, p.material::text, SUM(i.price), SUM(i.quantity), COUNT(*)
+        FROM new_items AS i JOIN Quotations AS q ON q.id = i.quotation_id JOIN Products AS p ON p.id = i.product_id
+        WHERE q.created_at IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (month, user_id, product_type, material) DO UPDATE SET
+            revenue = r.revenue + EXCLUDED.revenue,
+            units = r.units + EXCLUDED.units,
+            line_items = r.line_items + EXCLUDED.line_items;
+    END IF;
+    DELETE FROM Sales_Rollup_Monthly WHERE line_items = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Moves the items of quotations whose salesperson or date changed.
+CREATE OR REPLACE FUNCTION sales_rollup_quotations_changed() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO Sales_Rollup_Monthly AS r (month, user_id, product_type, material, revenue, units, line_items)
+    SELECT date_trunc('month', changed.created_at AT TIME ZONE 'UTC')::date, changed.user_id,
+           p.product_type::text, p.material::text,
+           SUM(changed.sign * i.price), SUM(changed.sign * i.quantity), SUM(changed.sign)
+    FROM (
+        SELECT o.id, o.user_id, o.created_at, -1 AS sign
+        FROM old_quotations AS o JOIN new_quotations AS n ON n.id = o.id
+        WHERE (o.user_id, o.created_at) IS DISTINCT FROM (n.user_id, n.created_at)
+        UNION ALL
+        SELECT n.id, n.user_id, n.created_at, 1
+        FROM old_quotations AS o JOIN new_quotations AS n ON n.id = o.id
+        WHERE (o.user_id, o.created_at) IS DISTINCT FROM (n.user_id, n.created_at)
+    ) AS changed
+    JOIN Quotation_Items AS i ON i.quotation_id = changed.id JOIN Products AS p ON p.id = i.product_id
+    WHERE changed.created_at IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (month, user_id, product_type, material) DO UPDATE SET
+        revenue = r.revenue + EXCLUDED.revenue,
+        units = r.units + EXCLUDED.units,
+        line_items = r.line_items + EXCLUDED.line_items;
+    DELETE FROM Sales_Rollup_Monthly WHERE line_items = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Moves the items of products whose type or material changed.
+CREATE OR REPLACE FUNCTION sales_rollup_products_changed() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO Sales_Rollup_Monthly AS r (month, user_id, product_type, material, revenue, units, line_items)
+    SELECT date_trunc('month', q.created_at AT TIME ZONE 'UTC')::date, q.user_id,
+           changed.product_type::text, changed.material::text,
+           SUM(changed.sign * i.price), SUM(changed.sign * i.quantity), SUM(changed.sign)
+    FROM (
+        SELECT o.id, o.product_type, o.material, -1 AS sign
+        FROM old_products AS o JOIN new_products AS n ON n.id = o.id
+        WHERE (o.product_type, o.material) IS DISTINCT FROM (n.product_type, n.material)
+        UNION ALL
+        SELECT n.id, n.product_type, n.material, 1
+        FROM old_products AS o JOIN new_products AS n ON n.id = o.id
+        WHERE (o.product_type, o.material) IS DISTINCT FROM (n.product_type, n.material)
+    ) AS changed
+    JOIN Quotation_Items AS i ON i.product_id = changed.id JOIN Quotations AS q ON q.id = i.quotation_id
+    WHERE q.created_at IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (month, user_id, product_type, material) DO UPDATE SET
+        revenue = r.revenue + EXCLUDED.revenue,
+        units = r.units + EXCLUDED.units,
+        line_items = r.line_items + EXCLUDED.line_items;
+    DELETE FROM Sales_Rollup_Monthly WHERE line_items = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger, hence three triggers on items.
+DROP TRIGGER IF EXISTS sales_rollup_items_insert ON Quotation_Items;
+DROP TRIGGER IF EXISTS sales_rollup_items_update ON Quotation_Items;
+DROP TRIGGER IF EXISTS sales_rollup_items_delete ON Quotation_Items;
+DROP TRIGGER IF EXISTS sales_rollup_quotations_update ON Quotations;
+DROP TRIGGER IF EXISTS sales_rollup_products_update ON Products;
+
+CREATE TRIGGER sales_rollup_items_insert AFTER INSERT ON Quotation_Items
+    REFERENCING NEW TABLE AS new_items
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_items_changed();
+CREATE TRIGGER sales_rollup_items_update AFTER UPDATE ON Quotation_Items
+    REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_items_changed();
+CREATE TRIGGER sales_rollup_items_delete AFTER DELETE ON Quotation_Items
+    REFERENCING OLD TABLE AS old_items
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_items_changed();
+CREATE TRIGGER sales_rollup_quotations_update AFTER UPDATE ON Quotations
+    REFERENCING OLD TABLE AS old_quotations NEW TABLE AS new_quotations
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_quotations_changed();
+CREATE TRIGGER sales_rollup_products_update AFTER UPDATE ON Products
+    REFERENCING OLD TABLE AS old_products NEW TABLE AS new_products
+    FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_products_changed();
+
+-- Backfill from the existing history.
+TRUNCATE Sales_Rollup_Monthly;
+INSERT INTO Sales_Rollup_Monthly (month, user_id, product_type, material, revenue, units, line_items)
+SELECT date_trunc('month', q.created_at AT TIME ZONE 'UTC')::date, q.user_id, p.product_type::text, p.material::text,
+       SUM(i.price), SUM(i.quantity), COUNT(*)
+FROM Quotation_Items AS i JOIN Quotations AS q ON q.id = i.quotation_id JOIN Products AS p ON p.id = i.product_id
+WHERE q.created_at IS NOT NULL
+GROUP BY 1, 2, 3, 4;
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Indexes on the quotation foreign keys, behind customer quotation history,
+-- quotation items and the sales rollup triggers.
+-- db_init/init.sql only runs when the database volume is first created; apply
+-- this to an existing database with:
+--   docker-compose exec -T db psql -U myuser -d erp_crm_db < db_migrations/003_foreign_key_indexes.sql
+-- CONCURRENTLY builds each index without blocking writes, so this can run on a
+-- live database. It cannot run inside a transaction block; psql's default
+-- autocommit runs each statement on its own. If a build fails it leaves an
+-- INVALID index behind: drop it and run this file again.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotations_customer_id_created_at ON Quotations (customer_id, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotations_user_id ON Quotations (user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotation_items_quotation_id ON Quotation_Items (quotation_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotation_items_product_id ON Quotation_Items (product_id);
+
+ANALYZE Quotations;
+ANALYZE Quotation_Items;
@@ -0,0 +1,16 @@
+-- Quotation history is paged on (created_at, id). A NULL created_at cannot be
+-- encoded in the next-page cursor and never compares greater than a cursor,
+-- so such rows broke or dropped out of every page after the first.
+-- db_init/init.sql only runs when the database volume is first created; apply
+-- this to an existing database with:
+--   docker-compose exec -T db psql -U myuser -d erp_crm_db < db_migrations/004_quotations_created_at_not_null.sql
+-- Quotations created through the API always get the column default. Rows
+-- without a timestamp are backfilled with the Unix epoch: they sort first in
+-- a customer's history and land in the 1970-01 sales rollup, outside any real
+-- reporting range. SET NOT NULL scans the table under an exclusive lock.
+BEGIN;
+
+UPDATE Quotations SET created_at = TIMESTAMPTZ '1970-01-01 00:00:00+00' WHERE created_at IS NULL;
+ALTER TABLE Quotations ALTER COLUMN created_at SET NOT NULL;
+
+COMMIT;
@@ -0,0 +1,161 @@
+"""
+Backend access for the Streamlit app.
+
+Streamlit reruns the whole script on every widget interaction, so calling
+`requests.get` inline re-downloads the same pages and opens a fresh TCP
+connection to the backend each time. This module keeps one keep-alive
+`requests.Session` per Streamlit server process (connection pooling, default
+timeouts, and retries of idempotent requests on connection errors and 502/503/504),
+and wraps the reads the UI repeats in `st.cache_data` with a short TTL. The
+cache is shared by every browser session on the server, so the write helpers
+clear the reads they make stale; other writers (another frontend replica, the
+bulk import API) show up once the TTL runs out.
+
+Reads raise `requests.exceptions.RequestException` like `requests` itself,
+except where a 404 is an expected answer: those return None. Errors are never
+cached.
+"""
+import os
+from typing import List, Optional, Tuple
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BACKEND_URL = os.environ.get("BACKEND_URL", "http://backend:8000")
+CACHE_TTL_SECONDS = int(os.environ.get("FRONTEND_CACHE_TTL_SECONDS", "30"))
+# (connect, read) seconds; the bulk import overrides the read timeout.
+TIMEOUT = (3.05, 30)
+IMPORT_TIMEOUT = (3.05, 3600)
+POOL_SIZE = 10
+
+
+@st.cache_resource
+def _session() -> requests.Session:
+    """One pooled keep-alive session for all reruns and browser sessions of this process."""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "PUT"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _request(method: str, path: str, timeout=TIMEOUT, **kwargs) -> requests.Response:
+    return _session().request(method, f"{BACKEND_URL}{path}", timeout=timeout, **kwargs)
+
+
+def _json_or_none(response: requests.Response):
+    """The JSON body, None for a 404, or an HTTPError for any other failure."""
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+# --- Cached Reads ---
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def list_customers(cursor: Optional[str], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """A page of customers and the cursor of the next page (None on the last page)."""
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    response = _request("GET", "/customers/", params=params)
+    response.raise_for_status()
+    return response.json(), response.headers.get("X-Next-Cursor")
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def get_customer(customer_id: int) -> Optional[dict]:
+    return _json_or_none(_request("GET", f"/customers/{customer_id}"))
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def search_customers(query: str, limit: int = 50) -> List[dict]:
+    response = _request("GET", "/customers/search", params={"q": query, "limit": limit})
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def quotation_summaries(customer_id: int, cursor: Optional[str], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """A page of a customer's quotation headers (no items) and the cursor of the next page."""
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    response = _request("GET", f"/customers/{customer_id}/quotations/summary", params=params)
+    response.raise_for_status()
+    return response.json(), response.headers.get("X-Next-Cursor")
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def quotation_items(quotation_id: int) -> Optional[List[dict]]:
+    """The items of one quotation, or None if the quotation does not exist."""
+    return _json_or_none(_request("GET", f"/quotations/{quotation_id}/items"))
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def list_users(access_token: str) -> List[dict]:
+    """Keyed by the caller's token, so one administrator never sees another's cached answer."""
+    response = _request("GET", "/users/", headers={"Authorization": f"Bearer {access_token}"})
+    response.raise_for_status()
+    return response.json()
+
+
+def clear_customer_reads() -> None:
+    """Drops every cached customer read, after a write that may change any of them."""
+    for read in (list_customers, get_customer, search_customers, quotation_summaries):
+        read.clear()
+
+
+# --- Writes ---
+def create_customer(payload: dict) -> dict:
+    response = _request("POST", "/customers/", json=payload)
+    response.raise_for_status()
+    clear_customer_reads()
+    return response.json()
+
+
+def update_customer(customer_id: int, payload: dict) -> dict:
+    response = _request("PUT", f"/customers/{customer_id}", json=payload)
+    response.raise_for_status()
+    clear_customer_reads()
+    return response.json()
+
+
+def import_customers(file, import_format: str, on_conflict: str) -> dict:
+    response = _request("POST", "/customers/import", timeout=IMPORT_TIMEOUT,
+                        params={"format": import_format, "on_conflict": on_conflict}, data=file)
+    response.raise_for_status()
+    clear_customer_reads()
+    return response.json()
+
+
+def update_role(target_user_id: int, new_role: str, access_token: str) -> dict:
+    response = _request("PUT", "/users/update-role",
+                        json={"target_user_id": target_user_id, "new_role": new_role},
+                        headers={"Authorization": f"Bearer {access_token}"})
+    response.raise_for_status()
+    list_users.clear()
+    return response.json()
+
+
+def login(username: str, password: str) -> str:
+    """The access token for an administrator's credentials."""
+    response = _request("POST", "/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def predict_price(payload: dict) -> float:
+    response = _request("POST", "/predict_quote", json=payload)
+    response.raise_for_status()
+    return response.json().get("predicted_price", 0)
@@ -3,8 +3,10 @@ import requests
 import pandas as pd
 from datetime import datetime
 
-# Define the base URL for the backend API
-BACKEND_URL = "http://backend:8000"
+import api_client
+
+CUSTOMER_PAGE_SIZE = 100
+QUOTATION_PAGE_SIZE = 20
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -16,6 +18,17 @@ st.set_page_config(
 # --- Initialize session state for editing ---
 if 'customer_to_edit' not in st.session_state:
     st.session_state.customer_to_edit = None
+# Access token and username of the signed-in administrator (User Management tab).
+if 'admin_token' not in st.session_state:
+    st.session_state.admin_token = None
+    st.session_state.admin_username = None
+# Cursors of the customer list pages visited so far; None is the first page.
+if 'customer_page_cursors' not in st.session_state:
+    st.session_state.customer_page_cursors = [None]
+# Customer whose quotation history is shown, and the cursors of its pages visited so far.
+if 'history_customer' not in st.session_state:
+    st.session_state.history_customer = None
+    st.session_state.quotation_page_cursors = [None]
 
 # --- Main Application UI ---
 st.title("Reliant Windows ERP/CRM Prototype")
@@ -50,10 +63,7 @@ with tab1:
         }
         try:
             with st.spinner("Getting AI prediction..."):
-                response = requests.post(f"{BACKEND_URL}/predict_quote", json=payload)
-                response.raise_for_status()
-                prediction = response.json()
-                price = prediction.get("predicted_price", 0)
+                price = api_client.predict_price(payload)
                 st.success(f"**Predicted Price:** £{price:,.2f}")
         except requests.exceptions.RequestException as e:
             st.error("Failed to communicate with the backend API.")
@@ -82,8 +92,7 @@ with tab2:
                 "phone_number": new_phone, "address": new_address
             }
             try:
-                response = requests.post(f"{BACKEND_URL}/customers/", json=payload)
-                response.raise_for_status()
+                api_client.create_customer(payload)
                 st.success(f"Customer '{new_name}' added successfully!")
                 st.balloons()
             except requests.exceptions.RequestException as e:
@@ -91,6 +100,28 @@ with tab2:
         else:
             st.warning("Please fill in all required fields (*).")
 
+    with st.expander("Bulk Import Customers"):
+        st.write("Upload a CSV (with a `full_name,email,phone_number,address` header) or an NDJSON file, "
+                 "such as a customer export from the old system.")
+        import_file = st.file_uploader("Customer file", type=["csv", "ndjson", "jsonl"], key="customer_import_file")
+        on_conflict = st.radio("When an email already exists:", ("skip", "update"), horizontal=True,
+                               format_func=lambda policy: "Skip the row" if policy == "skip" else "Update the customer")
+        if st.button("Import Customers", disabled=import_file is None):
+            import_format = "csv" if import_file.name.lower().endswith(".csv") else "ndjson"
+            try:
+                with st.spinner(f"Importing {import_file.name}..."):
+                    result = api_client.import_customers(import_file, import_format, on_conflict)
+                st.success(f"Imported {result['inserted']} new and updated {result['updated']} existing customer(s) "
+                           f"from {result['total_rows']} row(s).")
+                if result["report"]:
+                    st.warning(f"{result['skipped']} row(s) skipped and {result['invalid']} row(s) invalid.")
+                    st.dataframe(pd.DataFrame(result["report"]), use_container_width=True)
+                    if result["report_truncated"]:
+                        st.caption("Only the first rows of the report are shown.")
+            except requests.exceptions.RequestException as e:
+                detail = e.response.json().get('detail', 'Unknown error') if e.response is not None else str(e)
+                st.error(f"Import failed: {detail}")
+
     st.divider()
     
     # --- CORRECTED: This section has been restored ---
@@ -102,9 +133,8 @@ with tab2:
         if st.button("Search by ID"):
             try:
                 with st.spinner(f"Searching for customer with ID {search_id}..."):
-                    response = requests.get(f"{BACKEND_URL}/customers/{search_id}")
-                    if response.status_code == 200:
-                        customer = response.json()
+                    customer = api_client.get_customer(search_id)
+                    if customer:
                         st.success("Customer found!")
                         st.json(customer)
                     else:
@@ -113,16 +143,13 @@ with tab2:
                 st.error("Failed to communicate with the backend.")
 
     elif search_method == "Full Name":
-        search_name = st.text_input("Enter Full Name (or part of it)", key="search_name_input")
+        search_name = st.text_input("Enter name, email or phone (at least 3 characters)", key="search_name_input")
         if st.button("Search by Name"):
-            if search_name:
+            if len(search_name.strip()) >= 3:
                 try:
-                    with st.spinner(f"Searching for customers named '{search_name}'..."):
-                        response = requests.get(f"{BACKEND_URL}/customers/")
-                        response.raise_for_status()
-                        customers = response.json()
-                        results = [c for c in customers if search_name.lower() in c['full_name'].lower()]
-                        
+                    with st.spinner(f"Searching for customers matching '{search_name}'..."):
+                        results = api_client.search_customers(search_name.strip(), limit=50)
+
                         if results:
                             st.success(f"Found {len(results)} matching customer(s).")
                             st.dataframe(pd.DataFrame(results), use_container_width=True)
@@ -131,7 +158,7 @@ with tab2:
                 except requests.exceptions.RequestException:
                     st.error("Failed to communicate with the backend.")
             else:
-                st.warning("Please enter a name to search.")
+                st.warning("Please enter at least 3 characters to search.")
 
     st.divider()
 
@@ -142,11 +169,8 @@ with tab2:
         if update_id:
             try:
                 with st.spinner(f"Finding customer {update_id}..."):
-                    response = requests.get(f"{BACKEND_URL}/customers/{update_id}")
-                    if response.status_code == 200:
-                        st.session_state.customer_to_edit = response.json()
-                    else:
-                        st.session_state.customer_to_edit = None
+                    st.session_state.customer_to_edit = api_client.get_customer(update_id)
+                    if not st.session_state.customer_to_edit:
                         st.warning(f"No customer found with ID {update_id}.")
             except requests.exceptions.RequestException:
                 st.session_state.customer_to_edit = None
@@ -169,8 +193,7 @@ with tab2:
                 }
                 try:
                     with st.spinner("Updating customer..."):
-                        response = requests.put(f"{BACKEND_URL}/customers/{customer['id']}", json=payload)
-                        response.raise_for_status()
+                        api_client.update_customer(customer['id'], payload)
                         st.success("Customer details updated successfully!")
                         st.balloons()
                         st.session_state.customer_to_edit = None
@@ -179,15 +202,26 @@ with tab2:
 
     st.divider()
     st.subheader("Current Customer List")
+    page_cursors = st.session_state.customer_page_cursors
     try:
-        response = requests.get(f"{BACKEND_URL}/customers/")
-        response.raise_for_status()
-        customers = response.json()
+        customers, next_cursor = api_client.list_customers(page_cursors[-1], CUSTOMER_PAGE_SIZE)
         if customers:
             df = pd.DataFrame(customers)
             st.dataframe(df[['id', 'full_name', 'email', 'phone_number', 'address']], use_container_width=True)
         else:
             st.info("No customers found in the database yet.")
+
+        col_prev, col_page, col_next = st.columns([1, 4, 1])
+        with col_prev:
+            if st.button("◀ Previous", disabled=len(page_cursors) == 1, key="customers_prev_page"):
+                page_cursors.pop()
+                st.rerun()
+        with col_page:
+            st.caption(f"Page {len(page_cursors)} ({CUSTOMER_PAGE_SIZE} customers per page)")
+        with col_next:
+            if st.button("Next ▶", disabled=not next_cursor, key="customers_next_page"):
+                page_cursors.append(next_cursor)
+                st.rerun()
     except requests.exceptions.RequestException:
         st.error("Could not fetch customer list from the backend.")
 
@@ -199,79 +233,123 @@ with tab3:
     
     if st.button("Fetch Quotation History"):
         if customer_id_input:
-            with st.spinner(f"Fetching history for customer ID {customer_id_input}..."):
-                try:
-                    quote_response = requests.get(f"{BACKEND_URL}/customers/{customer_id_input}/quotations/")
-                    
-                    if quote_response.status_code == 404:
-                         st.warning(f"No customer found with ID {customer_id_input}.")
+            st.session_state.history_customer = customer_id_input
+            st.session_state.quotation_page_cursors = [None]
+
+    # Only one page of quotation headers is fetched and drawn at a time; a
+    # quotation's items are loaded when it is chosen below the table.
+    history_customer = st.session_state.history_customer
+    if history_customer:
+        quotation_cursors = st.session_state.quotation_page_cursors
+        try:
+            with st.spinner(f"Fetching history for customer ID {history_customer}..."):
+                quotes, next_quotation_cursor = api_client.quotation_summaries(
+                    history_customer, quotation_cursors[-1], QUOTATION_PAGE_SIZE)
+
+            if not quotes:
+                st.warning(f"No quotations found for customer ID {history_customer}.")
+            else:
+                st.success(f"Quotation history for Customer ID {history_customer}.")
+                quotes_df = pd.DataFrame(quotes)
+                quotes_df['created_at'] = pd.to_datetime(quotes_df['created_at']).dt.strftime('%d %B %Y')
+                st.dataframe(
+                    quotes_df[['id', 'status', 'created_at', 'item_count', 'total_price']],
+                    column_config={
+                        "id": "Quotation ID", "status": "Status", "created_at": "Created on", "item_count": "Items",
+                        "total_price": st.column_config.NumberColumn("Total", format="£%.2f"),
+                    },
+                    hide_index=True, use_container_width=True,
+                )
+
+                selected_quote = st.selectbox(
+                    "Show the items of quotation", options=[quote['id'] for quote in quotes], index=None,
+                    placeholder="Choose a quotation on this page",
+                )
+                if selected_quote is not None:
+                    items = api_client.quotation_items(selected_quote)
+                    if items:
+                        items_df = pd.DataFrame(items)
+                        st.dataframe(items_df[['product_id', 'width', 'height', 'quantity', 'price']], use_container_width=True)
                     else:
-                        quote_response.raise_for_status()
-                        quotes = quote_response.json()
-                        
-                        if not quotes:
-                            st.warning("No quotations found for this customer.")
-                        else:
-                            st.success(f"Found {len(quotes)} quotations for Customer ID {customer_id_input}.")
-                            for quote in quotes:
-                                total_price = float(quote.get('total_price', 0) or 0)
-                                created_date = pd.to_datetime(quote['created_at']).strftime('%d %B %Y')
-                                
-                                with st.expander(f"Quotation ID: {quote['id']} - Status: {quote['status']} - Total: £{total_price:,.2f}"):
-                                    st.write(f"Created on: {created_date}")
-                                    st.write("**Items in this Quotation:**")
-                                    if quote['items']:
-                                        items_df = pd.DataFrame(quote['items'])
-                                        st.dataframe(items_df[['product_id', 'width', 'height', 'quantity', 'price']], use_container_width=True)
-                                    else:
-                                        st.write("No items found for this quotation.")
-                except requests.exceptions.RequestException:
-                    st.error("Failed to communicate with the backend. Please ensure all services are running correctly.")
+                        st.write("No items found for this quotation.")
+
+            col_prev, col_page, col_next = st.columns([1, 4, 1])
+            with col_prev:
+                if st.button("◀ Previous", disabled=len(quotation_cursors) == 1, key="quotations_prev_page"):
+                    quotation_cursors.pop()
+                    st.rerun()
+            with col_page:
+                st.caption(f"Page {len(quotation_cursors)} ({QUOTATION_PAGE_SIZE} quotations per page)")
+            with col_next:
+                if st.button("Next ▶", disabled=not next_quotation_cursor, key="quotations_next_page"):
+                    quotation_cursors.append(next_quotation_cursor)
+                    st.rerun()
+        except requests.exceptions.RequestException:
+            st.error("Failed to communicate with the backend. Please ensure all services are running correctly.")
 
 # --- Tab 4: User Management ---
 with tab4:
     st.header("👤 User Management")
     st.write("This section is for authorized administrators to manage user roles.")
 
-    with st.form("role_update_form", clear_on_submit=True):
-        st.subheader("Change a User's Role")
-        
-        st.info("You must provide your administrator credentials to perform this action.", icon="🔐")
-        
-        col1, col2 = st.columns(2)
-        with col1:
+    # Admins sign in once; later requests send the short-lived access token instead of the password.
+    if st.session_state.admin_token:
+        col_status, col_signout = st.columns([4, 1])
+        with col_status:
+            st.success(f"Signed in as {st.session_state.admin_username}.", icon="🔐")
+        with col_signout:
+            if st.button("Sign Out"):
+                st.session_state.admin_token = None
+                st.session_state.admin_username = None
+                st.rerun()
+    else:
+        with st.form("admin_login_form"):
+            st.subheader("Administrator Sign-in")
+            st.info("You must sign in with your administrator credentials to manage users.", icon="🔐")
             admin_username = st.text_input("Your Admin Username")
             admin_password = st.text_input("Your Admin Password", type="password")
-        with col2:
-            target_user_id = st.number_input("Target User ID to Modify", min_value=1, step=1)
-            new_role = st.selectbox("New Role to Assign", 
-                                    options=[
-                                        "Manager", "Regional Manager", "Sales", 
-                                        "Construction Worker", "Human Resources Head", 
-                                        "Human Resources Associate"
-                                    ])
+            submit_login = st.form_submit_button("Sign In")
+
+        if submit_login:
+            if not admin_username or not admin_password:
+                st.warning("Please enter your admin username and password.")
+            else:
+                try:
+                    st.session_state.admin_token = api_client.login(admin_username, admin_password)
+                    st.session_state.admin_username = admin_username
+                    st.rerun()
+                except requests.exceptions.RequestException as e:
+                    if e.response is not None and e.response.status_code == 401:
+                        st.error("Authentication failed. Please check your admin username and password.")
+                    else:
+                        st.error("Failed to communicate with the backend.")
+
+    with st.form("role_update_form", clear_on_submit=True):
+        st.subheader("Change a User's Role")
+
+        target_user_id = st.number_input("Target User ID to Modify", min_value=1, step=1)
+        new_role = st.selectbox("New Role to Assign", 
+                                options=[
+                                    "Manager", "Regional Manager", "Sales", 
+                                    "Construction Worker", "Human Resources Head", 
+                                    "Human Resources Associate"
+                                ])
 
-        submit_role_change = st.form_submit_button("Update Role")
+        submit_role_change = st.form_submit_button("Update Role", disabled=not st.session_state.admin_token)
 
     if submit_role_change:
-        if not all([admin_username, admin_password, target_user_id, new_role]):
+        if not all([target_user_id, new_role]):
             st.warning("Please fill in all fields.")
         else:
-            payload = {
-                "admin_username": admin_username,
-                "admin_password": admin_password,
-                "target_user_id": target_user_id,
-                "new_role": new_role
-            }
             try:
                 with st.spinner(f"Attempting to change role for user {target_user_id}..."):
-                    response = requests.put(f"{BACKEND_URL}/users/update-role", json=payload)
-                    response.raise_for_status()
+                    api_client.update_role(target_user_id, new_role, st.session_state.admin_token)
                     st.success(f"Successfully updated role for user ID {target_user_id}!")
                     st.balloons()
             except requests.exceptions.RequestException as e:
                 if e.response.status_code == 401:
-                    st.error("Authentication failed. Please check your admin username and password.")
+                    st.session_state.admin_token = None
+                    st.error("Your session has expired. Please sign in again.")
                 elif e.response.status_code == 403:
                     st.error("Authorization failed. You do not have the required 'Human Resources Head' privileges.")
                 elif e.response.status_code == 404:
@@ -281,24 +359,16 @@ with tab4:
 
     st.divider()
     st.subheader("Current User List")
-    
-    st.write("Enter your admin credentials to view the full list of users.")
-    with st.form("view_users_form"):
-        view_admin_user = st.text_input("Your Admin Username", key="view_user_admin_name")
-        view_admin_pass = st.text_input("Your Admin Password", type="password", key="view_user_admin_pass")
-        view_users_button = st.form_submit_button("View All Users")
-        
-    if view_users_button:
-        if view_admin_user and view_admin_pass:
-            try:
-                with st.spinner("Fetching user list..."):
-                    params = {"admin_username": view_admin_user, "admin_password": view_admin_pass}
-                    response = requests.get(f"{BACKEND_URL}/users/", params=params)
-                    response.raise_for_status()
-                    users = response.json()
-                    st.dataframe(pd.DataFrame(users), use_container_width=True)
-            except requests.exceptions.RequestException as e:
+
+    if st.button("View All Users", disabled=not st.session_state.admin_token):
+        try:
+            with st.spinner("Fetching user list..."):
+                users = api_client.list_users(st.session_state.admin_token)
+                st.dataframe(pd.DataFrame(users), use_container_width=True)
+        except requests.exceptions.RequestException as e:
+            if e.response is not None and e.response.status_code == 401:
+                st.session_state.admin_token = None
+                st.error("Your session has expired. Please sign in again.")
+            else:
                 st.error(f"Failed to fetch users: {e.response.json().get('detail', 'Access denied or invalid credentials.')}")
-        else:
-            st.warning("Please provide admin credentials to view the user list.")
 